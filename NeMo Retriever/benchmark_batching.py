@@ -0,0 +1,66 @@
+"""Benchmark for the query-embedding micro-batcher against a stand-in endpoint.
+
+Serves the OpenAI-compatible stand-in from benchmark_concurrency.py and drives
+QueryEmbedder through the real AsyncOpenAI client, embedding concurrent queries
+with and without batching. tests/test_embedding_batcher.py covers per-caller
+vectors, coalescing, duplicate texts, the max_wait_ms flush and errors:
+
+    python benchmark_batching.py
+    python benchmark_batching.py --embed-latency 0.05 --queries 256
+"""
+import argparse
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from openai import AsyncOpenAI
+
+from benchmark_concurrency import create_embedding_server, serve
+from embedding_cache import QueryEmbeddingCache
+from retriever_core import EMBED_MODEL, QueryEmbedder
+
+DIM = 64
+
+
+@asynccontextmanager
+async def create_embedder(url: str, max_batch_size: int, max_wait_ms: float):
+    """QueryEmbedder against the stand-in, with a fresh cache; closes its client on exit."""
+    client = AsyncOpenAI(api_key='benchmark', base_url=url, max_retries=0)
+    try:
+        yield QueryEmbedder(client, QueryEmbeddingCache(EMBED_MODEL, dim=DIM), max_batch_size=max_batch_size,
+                            max_wait_ms=max_wait_ms)
+    finally:
+        await client.close()
+
+
+async def measure(url, server, queries: int, max_batch_size: int, max_wait_ms: float):
+    async with create_embedder(url, max_batch_size, max_wait_ms) as embedder:
+        calls = server.state.calls
+        start = time.perf_counter()
+        await asyncio.gather(*(embedder.embed(f"load {max_batch_size} {i}") for i in range(queries)))
+        return time.perf_counter() - start, server.state.calls - calls
+
+
+async def run(args, url, server):
+    print(f"{args.queries} concurrent queries, {args.embed_latency * 1000:.0f} ms per embedding call")
+    print(f"{'batch size':>10} {'calls':>6} {'seconds':>8}")
+    for max_batch_size in (1, args.batch_size):
+        elapsed, calls = await measure(url, server, args.queries, max_batch_size, args.wait_ms)
+        print(f"{max_batch_size:>10} {calls:>6} {elapsed:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="seconds per stand-in embedding call")
+    parser.add_argument("--queries", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    server = create_embedding_server(DIM, args.embed_latency)
+    url = serve(server)
+    asyncio.run(run(args, url, server))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Throughput of a retriever service as the number of in-flight requests grows.
+
+Runs a stand-in embeddings endpoint (fixed latency per call) and a synthetic
+local index, serves one of the *_embed.py services against them, and sends
+distinct queries at increasing concurrency. With the async embedding client
+and the vector search off the event loop, throughput should scale with the
+number of in-flight requests until the search itself saturates:
+
+    python benchmark_concurrency.py
+    python benchmark_concurrency.py --service strength_embed --embed-latency 0.2 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmark_index import build_synthetic_index
+
+SERVICE_DOMAINS = {'nutrition_embed': 'nutrition', 'strength_embed': 'strength', 'mindset_embed': 'mindset'}
+
+
+def stand_in_vector(text: str, dim: int) -> np.ndarray:
+    """The vector the stand-in endpoint returns for a text."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def create_embedding_server(dim: int, latency: float) -> FastAPI:
+    """OpenAI-compatible /embeddings endpoint returning deterministic vectors after ``latency`` seconds.
+
+    ``state.batches`` records the inputs of every call; setting ``state.fail`` makes
+    it answer with a 500.
+    """
+    server = FastAPI()
+    server.state.calls = 0
+    server.state.inputs = 0
+    server.state.batches = []
+    server.state.fail = False
+
+    @server.post('/embeddings')
+    async def embeddings(request: Request):
+        body = await request.json()
+        texts = body['input'] if isinstance(body['input'], list) else [body['input']]
+        server.state.calls += 1
+        server.state.inputs += len(texts)
+        server.state.batches.append(texts)
+        await asyncio.sleep(latency)
+        if server.state.fail:
+            return JSONResponse(status_code=500, content={'error': {'message': 'stand-in failure'}})
+        data = [
+            {'object': 'embedding', 'index': i, 'embedding': stand_in_vector(text, dim).tolist()}
+            for i, text in enumerate(texts)
+        ]
+        return {'object': 'list', 'data': data, 'model': body.get('model'),
+                'usage': {'prompt_tokens': 0, 'total_tokens': 0}}
+
+    return server
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve(app: FastAPI) -> str:
+    """Run an app with uvicorn on a background thread and return its base URL."""
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f'http://127.0.0.1:{port}'
+
+
+async def run_level(url: str, concurrency: int, requests: int, label: str):
+    """Send ``requests`` distinct queries with at most ``concurrency`` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(f'{url}/search', json={'query_text': f'{label} query {i}'})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+    return requests / elapsed, statistics.median(latencies), float(np.percentile(latencies, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", default="nutrition_embed", choices=sorted(SERVICE_DOMAINS))
+    parser.add_argument("--embed-latency", type=float, default=0.1, help="seconds per stand-in embedding call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=128, help="requests per concurrency level")
+    parser.add_argument("--vectors", type=int, default=20000, help="vectors in the synthetic index")
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+
+    embedding_server = create_embedding_server(args.dim, args.embed_latency)
+    index_dir = tempfile.mkdtemp(prefix="concurrency-benchmark-")
+    build_synthetic_index(os.path.join(index_dir, SERVICE_DOMAINS[args.service]), args.vectors, args.dim)
+
+    # Point the service at the stand-ins before it reads its configuration
+    os.environ.update(
+        NVIDIA_API_BASE_URL=serve(embedding_server),
+        NVIDIA_API_KEY='benchmark',
+        VECTOR_STORE='local',
+        VECTOR_INDEX_DIR=index_dir,
+        QUERY_EMBED_DIM=str(args.dim)
+    )
+    os.environ.pop('QUERY_EMBED_CACHE_DIR', None)
+    service = importlib.import_module(args.service)
+    url = serve(service.app)
+
+    print(f"{args.service}: {args.embed_latency * 1000:.0f} ms per embedding call, "
+          f"{args.vectors} x {args.dim} local index, {args.requests} distinct queries per level")
+    print(f"{'in flight':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'embed calls':>12} {'texts/call':>11}")
+    for concurrency in args.concurrency:
+        calls, inputs = embedding_server.state.calls, embedding_server.state.inputs
+        throughput, p50, p95 = asyncio.run(run_level(url, concurrency, args.requests, f'c{concurrency}'))
+        calls = embedding_server.state.calls - calls
+        inputs = embedding_server.state.inputs - inputs
+        print(f"{concurrency:>9} {throughput:>8.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} "
+              f"{calls:>12} {inputs / max(calls, 1):>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
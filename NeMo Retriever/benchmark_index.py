@@ -0,0 +1,118 @@
+"""Recall@k, memory and latency of the local index first-stage options.
+
+Compares an exact float32 scan with int8, float16 and reduced-dimension
+(projection) first stages plus full-precision rerank. Runs against an exported index, or a synthetic one:
+
+    python benchmark_index.py indexes/nutrition
+    python benchmark_index.py --synthetic 50000 --dim 4096
+
+An exported index is copied to a temporary directory first, since building the
+compact copies and the projection rewrites its meta.json; pass --in-place to
+write them into the index itself.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from vector_index import IndexWriter, LocalVectorIndex, add_projection, quantize_index
+
+
+def build_synthetic_index(path: str, count: int, dim: int, seed: int = 0):
+    """Clustered random vectors, so neighbours are closer than in uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(count // 100, 1), dim)).astype(np.float32)
+    writer = IndexWriter(path, dim, source="synthetic")
+    for start in range(0, count, 4096):
+        rows = min(4096, count - start)
+        vectors = centers[rng.integers(0, len(centers), rows)] + 0.5 * rng.standard_normal((rows, dim)).astype(np.float32)
+        writer.add([f"chunk {start + i}" for i in range(rows)], vectors)
+    writer.close()
+
+
+def sample_queries(index: LocalVectorIndex, count: int, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of random corpus vectors."""
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(index), size=min(count, len(index)), replace=False))
+    base = np.asarray(index.vectors[rows], dtype=np.float32)
+    return base + 0.5 * base.std() * rng.standard_normal(base.shape).astype(np.float32)
+
+
+def measure(index: LocalVectorIndex, queries: np.ndarray, k: int):
+    ids = []
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        row_ids, _ = index.top_k(query, k)
+        timings.append(time.perf_counter() - start)
+        ids.append(row_ids[0])
+    return np.asarray(ids), np.asarray(timings)
+
+
+def run(args, path: str):
+    """Add the compact first stages to the index at ``path`` and print the comparison table."""
+    exact = LocalVectorIndex(path)
+    kinds = ["int8", "float16"]
+    for kind in kinds:
+        if kind not in exact.meta.get("first_stage", {}):
+            quantize_index(path, kind)
+    if args.reduce:
+        projection = exact.meta.get("first_stage", {}).get("projection")
+        if not projection or projection["dim"] != args.reduce:
+            add_projection(path, args.reduce)
+        kinds.append("projection")
+    queries = sample_queries(exact, args.queries)
+
+    truth, timings = measure(exact, queries, args.k)
+    full_bytes = exact.vectors.nbytes
+    print(f"{len(exact)} vectors x {exact.vectors.shape[1]} dims, {len(queries)} queries, recall@{args.k}")
+    print(f"{'first stage':<12} {'rerank':>6} {'recall':>7} {'scan MB':>8} {'p50 ms':>7} {'p95 ms':>7}")
+    print(f"{exact.vectors.dtype.name:<12} {'-':>6} {1.0:>7.3f} {full_bytes / 2**20:>8.1f} "
+          f"{np.percentile(timings, 50) * 1000:>7.2f} {np.percentile(timings, 95) * 1000:>7.2f}")
+
+    for kind in kinds:
+        for rerank in args.rerank:
+            index = LocalVectorIndex(path, first_stage=kind, rerank_candidates=rerank)
+            ids, timings = measure(index, queries, args.k)
+            recall = np.mean([len(np.intersect1d(found, expected)) / args.k for found, expected in zip(ids, truth)])
+            print(f"{kind:<12} {rerank:>6} {recall:>7.3f} {index.first_stage_vectors.nbytes / 2**20:>8.1f} "
+                  f"{np.percentile(timings, 50) * 1000:>7.2f} {np.percentile(timings, 95) * 1000:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("index", nargs="?", help="exported index directory")
+    parser.add_argument("--synthetic", type=int, help="build a synthetic index with this many vectors")
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--rerank", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--reduce", type=int, default=256, help="projection dimensions (0 to skip)")
+    parser.add_argument("--in-place", action="store_true",
+                        help="add the compact copies and projection to the index instead of a temporary copy")
+    args = parser.parse_args()
+
+    if not args.index and not args.synthetic:
+        parser.error("pass an index directory or --synthetic N")
+    path = args.index
+    scratch = None
+    if args.synthetic:
+        path = tempfile.mkdtemp(prefix="index-benchmark-")
+        build_synthetic_index(path, args.synthetic, args.dim)
+    elif not args.in_place:
+        scratch = tempfile.mkdtemp(prefix="index-benchmark-")
+        path = shutil.copytree(args.index, os.path.join(scratch, "index"))
+    try:
+        run(args, path)
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+    if args.synthetic:
+        print(f"Synthetic index left in {path}")
+
+
+if __name__ == '__main__':
+    main()
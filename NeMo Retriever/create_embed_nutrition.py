@@ -9,6 +9,7 @@ from sentence_transformers import SentenceTransformer
 import numpy as np
 from typing import List, Optional
 from pydantic import PrivateAttr
+from projection import reduce_collection
 
 class CustomNVEmbedding(BaseEmbedding):
     model_name: str
@@ -120,3 +121,16 @@ for filename in os.listdir(docs_dir):
 
 print("Indexing complete. All documents have been processed and stored in MongoDB Atlas.")
 print("Please ensure you have created the appropriate Atlas Search index in your MongoDB Atlas cluster.")
+
+# Optionally store reduced-dimension vectors for first-stage search (a new projection version each run)
+reduced_dim = int(os.environ.get('EMBED_REDUCED_DIM', '0'))
+if reduced_dim:
+    db = mongodb_client[db_name]
+    projection = reduce_collection(
+        db[collection_name],
+        db["projections"],
+        reduced_dim,
+        method=os.environ.get('EMBED_PROJECTION', 'pca')
+    )
+    print(f"Stored {reduced_dim}-dim {projection.method} vectors (projection v{projection.version}).")
+    print("Index 'embedding_reduced' (knnVector, cosine) and 'projection_version' (number) in Atlas Search.")
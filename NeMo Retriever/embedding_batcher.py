@@ -0,0 +1,79 @@
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, List
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into batched calls.
+
+    Texts submitted via ``embed`` queue up until ``max_batch_size`` distinct texts
+    are waiting or ``max_wait_ms`` has passed since the first one arrived; the whole
+    batch is then sent as one ``embed_batch`` call and each caller gets its own
+    vector back. Concurrent requests for the same text share one slot.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # Number of batches sent, by batch size
+        self.batch_sizes = Counter()
+        # text -> futures of the callers waiting for it
+        self._pending = {}
+        self._full = None
+        self._flusher = None
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Queue texts for the next batch and wait for their embeddings."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._pending.setdefault(text, []).append(future)
+            futures.append(future)
+
+        if self._flusher is None:
+            self._full = asyncio.Event()
+            self._flusher = asyncio.ensure_future(self._flush_after_wait())
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return list(await asyncio.gather(*futures))
+
+    async def _flush_after_wait(self):
+        try:
+            await asyncio.wait_for(self._full.wait(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+
+        # Take everything queued so far; oversized queues go out in several requests
+        pending, self._pending, self._flusher = list(self._pending.items()), {}, None
+        batches = [pending[i:i + self.max_batch_size] for i in range(0, len(pending), self.max_batch_size)]
+        await asyncio.gather(*(self._send(batch) for batch in batches))
+
+    async def _send(self, batch):
+        texts = [text for text, _ in batch]
+        self.batch_sizes[len(texts)] += 1
+        try:
+            vectors = await self.embed_batch(texts)
+            for (_, futures), vector in zip(batch, vectors):
+                for future in futures:
+                    if not future.done():
+                        future.set_result(vector)
+        except Exception as e:
+            for _, futures in batch:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self) -> dict:
+        batches = sum(self.batch_sizes.values())
+        texts = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "batches": batches,
+            "texts": texts,
+            "mean_batch_size": texts / batches if batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+KEY_SIZE = 20
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace so trivially different spellings of a query share an entry."""
+    return " ".join(text.split())
+
+
+class QueryEmbeddingCache:
+    """LRU cache of query embeddings keyed on normalized text plus model name.
+
+    Vectors live in fixed slots of a ``(max_entries, dim)`` float32 array. With a
+    ``path`` the array, slot keys and last-use times are memory-mapped files, so a
+    restarted service starts warm; without one the cache is in-process only. A
+    ``<path>.meta.json`` sidecar records the model, dim and slot count the files
+    were created for; if any of them changed, all three files start empty.
+    """
+
+    def __init__(self, model: str, dim: int = 4096, max_entries: int = 4096, path: Optional[str] = None):
+        self.model = model
+        self.dim = dim
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> slot, least recently used first
+        self._slots = OrderedDict()
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            files = {
+                "vectors": (f"{path}.vectors", np.float32, (max_entries, dim)),
+                "keys": (f"{path}.keys", np.uint8, (max_entries, KEY_SIZE)),
+                "stamps": (f"{path}.stamps", np.float64, (max_entries,))
+            }
+            mode = "r+" if self._files_match(files.values()) else "w+"
+            self._vectors, self._keys, self._stamps = (
+                np.memmap(filename, dtype=dtype, mode=mode, shape=shape) for filename, dtype, shape in files.values()
+            )
+            if mode == "w+":
+                self._write_meta()
+            self._load()
+        else:
+            self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+            self._keys = np.zeros((max_entries, KEY_SIZE), dtype=np.uint8)
+            self._stamps = np.zeros(max_entries, dtype=np.float64)
+        # A zero last-use time marks an empty slot
+        self._free = [slot for slot in range(max_entries - 1, -1, -1) if self._stamps[slot] == 0]
+
+    def _meta(self) -> dict:
+        return {"model": self.model, "dim": self.dim, "max_entries": self.max_entries, "key_size": KEY_SIZE}
+
+    def _files_match(self, files) -> bool:
+        """Whether the cache files on disk were written with these settings and are all intact."""
+        try:
+            with open(f"{self.path}.meta.json") as f:
+                if json.load(f) != self._meta():
+                    return False
+        except (OSError, ValueError):
+            return False
+        for filename, dtype, shape in files:
+            expected = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            if not os.path.exists(filename) or os.path.getsize(filename) != expected:
+                return False
+        return True
+
+    def _write_meta(self):
+        # Written after the fresh files exist; a crash before this just recreates them next time
+        tmp = f"{self.path}.meta.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._meta(), f)
+        os.replace(tmp, f"{self.path}.meta.json")
+
+    def _load(self):
+        used = np.flatnonzero(self._stamps > 0)
+        for slot in used[np.argsort(self._stamps[used])]:
+            self._slots[self._keys[slot].tobytes()] = int(slot)
+
+    def key(self, text: str) -> bytes:
+        payload = f"{self.model}\0{normalize_query(text)}".encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=KEY_SIZE).digest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = self.key(text)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._slots.move_to_end(key)
+            self._stamps[slot] = time.time()
+            return self._vectors[slot].tolist()
+
+    def put(self, text: str, embedding: List[float]):
+        if len(embedding) != self.dim:
+            return
+        key = self.key(text)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    _, slot = self._slots.popitem(last=False)
+                self._slots[key] = slot
+            self._slots.move_to_end(key)
+            self._vectors[slot] = embedding
+            self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+            self._stamps[slot] = time.time()
+
+    def flush(self):
+        """Write memory-mapped entries to disk."""
+        if self.path:
+            with self._lock:
+                for array in (self._vectors, self._keys, self._stamps):
+                    array.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._slots),
+                "max_entries": self.max_entries,
+                "persistent": bool(self.path)
+            }
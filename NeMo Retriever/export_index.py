@@ -0,0 +1,85 @@
+"""Snapshot a MongoDB embeddings collection into a local vector index.
+
+Usage:
+    python export_index.py nutrition indexes/nutrition [--dtype float16] [--quantize int8] [--reduce 256]
+    python export_index.py --uri mongodb+srv://... indexes/custom
+"""
+import argparse
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from retriever_core import DOMAIN_URI_VARS
+from projection import PROJECTION_METHODS
+from vector_index import QUANTIZATION_KINDS, IndexWriter, add_projection, quantize_index
+
+
+def export_collection(collection, out_dir: str, dtype: str = "float32", metric: str = "cosine",
+                      batch_size: int = 256, source: str = None) -> int:
+    """Stream every document with text and embedding into ``out_dir``; returns the count."""
+    writer = None
+    texts, vectors = [], []
+    skipped = 0
+    for doc in collection.find({}, {"_id": 0, "text": 1, "embedding": 1}, batch_size=batch_size):
+        if not doc.get("text") or not doc.get("embedding"):
+            skipped += 1
+            continue
+        if writer is None:
+            writer = IndexWriter(out_dir, len(doc["embedding"]), dtype=dtype, metric=metric, source=source)
+        texts.append(doc["text"])
+        vectors.append(doc["embedding"])
+        if len(texts) >= batch_size:
+            writer.add(texts, np.asarray(vectors, dtype=np.float32))
+            texts, vectors = [], []
+
+    if writer is None:
+        raise ValueError("Collection has no documents with both text and embedding")
+    if texts:
+        writer.add(texts, np.asarray(vectors, dtype=np.float32))
+    writer.close()
+    if skipped:
+        print(f"Skipped {skipped} documents without text or embedding")
+    return writer.count
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export a MongoDB embeddings collection to a local index")
+    parser.add_argument("domain", nargs="?", choices=sorted(DOMAIN_URI_VARS), help="domain whose URI to read from the environment")
+    parser.add_argument("out_dir", help="index directory to write")
+    parser.add_argument("--uri", help="MongoDB URI (overrides the domain's environment variable)")
+    parser.add_argument("--db", default="docs")
+    parser.add_argument("--collection", default="embeddings")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--metric", default="cosine", choices=["cosine", "dot"])
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--quantize", action="append", default=[], choices=QUANTIZATION_KINDS,
+                        help="also build a compact first-stage copy (repeatable)")
+    parser.add_argument("--reduce", type=int, help="also fit a projection to this many dimensions")
+    parser.add_argument("--projection", default="pca", choices=PROJECTION_METHODS)
+    args = parser.parse_args()
+
+    uri = args.uri or (os.environ.get(DOMAIN_URI_VARS[args.domain]) if args.domain else None)
+    if not uri:
+        parser.error("pass a domain with its MONGODB_ATLAS_URI_* set, or --uri")
+
+    tls_allow_invalid = os.environ.get('TLS_ALLOW_INVALID_CERTS', 'false').lower() == 'true'
+    client = MongoClient(uri, tls=True, tlsAllowInvalidCertificates=tls_allow_invalid)
+    collection = client[args.db][args.collection]
+    count = export_collection(
+        collection, args.out_dir, dtype=args.dtype, metric=args.metric,
+        batch_size=args.batch_size, source=f"{args.db}.{args.collection}"
+    )
+    print(f"Exported {count} chunks to {args.out_dir}")
+    for kind in args.quantize:
+        quantize_index(args.out_dir, kind)
+        print(f"Added {kind} first stage")
+    if args.reduce:
+        projection = add_projection(args.out_dir, args.reduce, args.projection)
+        print(f"Added {args.projection} projection v{projection.version} to {args.reduce} dims")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Dimensionality reduction for first-stage vector search.
+
+A projection maps 4096-dim embeddings to a few hundred dimensions, either by
+PCA fitted on a sample of the corpus or by a seeded Gaussian random
+projection. Reduced vectors are L2-normalized so cosine and dot-product
+search agree. Each fitted projection carries a version so reduced vectors,
+stored next to the full ones, can be matched to the projection that
+produced them.
+"""
+import numpy as np
+
+PROJECTION_METHODS = ("pca", "random")
+
+
+class Projection:
+    def __init__(self, mean: np.ndarray, components: np.ndarray, method: str, version: int = 1):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.method = method
+        self.version = version
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    def project(self, vectors) -> np.ndarray:
+        """Reduce ``(n, d)`` vectors to ``(n, dim)``, L2-normalized."""
+        reduced = (np.atleast_2d(np.asarray(vectors, dtype=np.float32)) - self.mean) @ self.components.T
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return reduced / norms
+
+    def save(self, filename: str):
+        np.savez(filename, mean=self.mean, components=self.components,
+                 method=np.array(self.method), version=np.array(self.version))
+
+    @classmethod
+    def load(cls, filename: str) -> "Projection":
+        data = np.load(filename)
+        return cls(data["mean"], data["components"], str(data["method"]), int(data["version"]))
+
+    def to_document(self) -> dict:
+        """MongoDB document form; the matrices are stored as raw float32 bytes."""
+        return {
+            "version": self.version,
+            "method": self.method,
+            "dim": self.dim,
+            "input_dim": self.components.shape[1],
+            "mean": self.mean.tobytes(),
+            "components": self.components.tobytes()
+        }
+
+    @classmethod
+    def from_document(cls, doc: dict) -> "Projection":
+        mean = np.frombuffer(doc["mean"], dtype=np.float32)
+        components = np.frombuffer(doc["components"], dtype=np.float32).reshape(doc["dim"], doc["input_dim"])
+        return cls(mean, components, doc["method"], doc["version"])
+
+
+def fit_projection(sample: np.ndarray, dim: int, method: str = "pca", version: int = 1,
+                   seed: int = 0) -> Projection:
+    """Fit a projection to ``dim`` dimensions on a ``(n, d)`` sample of corpus vectors."""
+    sample = np.asarray(sample, dtype=np.float32)
+    if method not in PROJECTION_METHODS:
+        raise ValueError(f"method must be one of {PROJECTION_METHODS}")
+    if method == "random":
+        rng = np.random.default_rng(seed)
+        components = rng.standard_normal((dim, sample.shape[1])).astype(np.float32) / np.sqrt(dim)
+        return Projection(np.zeros(sample.shape[1], dtype=np.float32), components, method, version)
+
+    if dim > min(sample.shape):
+        raise ValueError(f"PCA to {dim} dims needs at least {dim} sample vectors")
+    mean = sample.mean(axis=0)
+    # Top principal directions via the SVD of the centered sample
+    _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+    return Projection(mean, vt[:dim], method, version)
+
+
+def reduce_collection(collection, projections, dim: int, method: str = "pca", sample_size: int = 20000,
+                      batch_size: int = 500, field: str = "embedding_reduced") -> Projection:
+    """Fit a new projection version on a MongoDB collection and store reduced vectors.
+
+    Reduced vectors are first written to a staging field; once every document
+    with an ``embedding`` has one, they are moved to ``field`` and
+    ``projection_version`` in a single update, and only then is the projection
+    saved in the ``projections`` collection. A failed run leaves the previous
+    version's vectors and projection untouched.
+    """
+    from pymongo import UpdateOne
+
+    sample = [doc["embedding"] for doc in collection.aggregate([
+        {"$match": {"embedding": {"$exists": True}}},
+        {"$sample": {"size": sample_size}},
+        {"$project": {"_id": 0, "embedding": 1}}
+    ])]
+    if not sample:
+        raise ValueError("Collection has no embeddings to fit a projection on")
+
+    latest = projections.find_one(sort=[("version", -1)])
+    version = (latest["version"] + 1) if latest else 1
+    projection = fit_projection(np.asarray(sample, dtype=np.float32), dim, method, version)
+    staging = f"{field}_v{version}"
+
+    expected = updated = 0
+    updates = []
+    for doc in collection.find({"embedding": {"$exists": True}}, {"embedding": 1}):
+        reduced = projection.project(doc["embedding"])[0]
+        updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {staging: reduced.tolist()}}))
+        if len(updates) >= batch_size:
+            expected += len(updates)
+            updated += collection.bulk_write(updates, ordered=False).matched_count
+            updates = []
+    if updates:
+        expected += len(updates)
+        updated += collection.bulk_write(updates, ordered=False).matched_count
+    if updated != expected:
+        collection.update_many({staging: {"$exists": True}}, {"$unset": {staging: ""}})
+        raise RuntimeError(f"Only {updated} of {expected} documents took projection v{version}; not saved")
+
+    # Switch every document to the new version at once, then publish the projection
+    collection.update_many(
+        {staging: {"$exists": True}},
+        [{"$set": {field: f"${staging}", "projection_version": version}}, {"$unset": staging}]
+    )
+    projections.insert_one(projection.to_document())
+    return projection
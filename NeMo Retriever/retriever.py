@@ -0,0 +1,110 @@
+import asyncio
+import os
+from typing import Dict, List, Optional
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from dotenv import load_dotenv
+from retriever_core import (
+    DOMAIN_URI_VARS,
+    create_metrics,
+    create_query_embedder,
+    create_vector_store,
+    domain_configured
+)
+
+# Load environment variables from .env file
+load_dotenv()
+
+app = FastAPI()
+
+# One vector store per domain with a configured MongoDB URI (or local index)
+stores = {domain: create_vector_store(domain) for domain in DOMAIN_URI_VARS if domain_configured(domain)}
+
+# Query embeddings go through the cache, then a micro-batcher shared by concurrent requests
+embedder = create_query_embedder('retriever')
+
+# Request counts, stage latencies and result sizes, served at /metrics
+metrics = create_metrics(app)
+
+# Seconds each collection search may take before that domain is reported as an error
+DOMAIN_SEARCH_TIMEOUT = float(os.environ.get('RETRIEVER_DOMAIN_TIMEOUT', '8'))
+
+class SearchRequest(BaseModel):
+    domains: List[str]
+    # Per-domain query texts; domains without one use query_text
+    queries: Dict[str, str] = {}
+    query_text: Optional[str] = None
+
+async def search_domain(domain: str, embedding: List[float]) -> List[str]:
+    return await asyncio.wait_for(stores[domain].search(embedding), timeout=DOMAIN_SEARCH_TIMEOUT)
+
+@app.post('/search')
+async def search(request: SearchRequest):
+    """Search several domains with one embedding call and concurrent collection searches.
+
+    Returns ``{"results": {domain: [text, ...]}, "errors": {domain: message}}``; a domain
+    that is unconfigured, has no query, fails or times out is reported in ``errors``
+    without affecting the others.
+    """
+    errors = {}
+    domains, texts = [], []
+    for domain in dict.fromkeys(request.domains):
+        text = request.queries.get(domain) or request.query_text
+        if domain not in stores:
+            errors[domain] = 'Unknown or unconfigured domain'
+        elif not text:
+            errors[domain] = 'A query is required'
+        else:
+            domains.append(domain)
+            texts.append(text)
+    
+    results = {}
+    if domains:
+        try:
+            with metrics.timer('embedding'):
+                embeddings = await embedder.embed_many(texts)
+        except Exception as e:
+            print(f"Error embedding queries: {e}")
+            errors.update({domain: f'Embedding failed: {e}' for domain in domains})
+            domains, embeddings = [], []
+        
+        with metrics.timer('vector_search'):
+            outcomes = await asyncio.gather(*(
+                search_domain(domain, embedding) for domain, embedding in zip(domains, embeddings)
+            ), return_exceptions=True)
+        for domain, outcome in zip(domains, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                errors[domain] = f'Search timed out after {DOMAIN_SEARCH_TIMEOUT}s'
+            elif isinstance(outcome, Exception):
+                print(f"Error searching {domain}: {outcome}")
+                errors[domain] = f'Search failed: {outcome}'
+            else:
+                metrics.record_results(outcome)
+                results[domain] = outcome
+    
+    with metrics.timer('serialization'):
+        response = JSONResponse(content={'results': results, 'errors': errors})
+    return response
+
+@app.get('/metrics')
+async def get_metrics():
+    # Sampled results are tokenized while taking the snapshot; keep that off the event loop
+    snapshot = await asyncio.to_thread(metrics.snapshot)
+    return {**snapshot, 'embeddings': embedder.stats()}
+
+@app.get('/cache/stats')
+async def cache_stats():
+    return embedder.cache.stats()
+
+@app.get('/embeddings/stats')
+async def embedding_stats():
+    return embedder.stats()
+
+@app.on_event('shutdown')
+def flush_embedding_cache():
+    embedder.cache.flush()
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('RETRIEVER_PORT', '5004')))
@@ -0,0 +1,270 @@
+import asyncio
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+from openai import AsyncOpenAI
+from pymongo import MongoClient
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import QueryEmbeddingCache, normalize_query
+from projection import Projection
+from retriever_metrics import RetrieverMetrics
+from vector_index import LocalVectorIndex
+
+try:
+    # Native async driver (PyMongo >= 4.9); older drivers run queries on a worker thread
+    from pymongo import AsyncMongoClient
+except ImportError:
+    AsyncMongoClient = None
+
+EMBED_MODEL = "nvidia/nv-embed-v1"
+
+# Environment variable holding each domain's MongoDB Atlas URI
+DOMAIN_URI_VARS = {
+    "nutrition": "MONGODB_ATLAS_URI_NUTRITION",
+    "strength": "MONGODB_ATLAS_URI_STRENGTH",
+    "mindset": "MONGODB_ATLAS_URI_MINDSET"
+}
+
+
+def create_openai_client() -> AsyncOpenAI:
+    """Async OpenAI client for the NVIDIA API, so embedding calls don't block the event loop."""
+    return AsyncOpenAI(
+        api_key=os.environ.get('NVIDIA_API_KEY'),
+        base_url=os.environ.get('NVIDIA_API_BASE_URL') or "https://integrate.api.nvidia.com/v1"
+    )
+
+
+def create_embedding_cache(name: str) -> QueryEmbeddingCache:
+    """Query-embedding cache; set QUERY_EMBED_CACHE_DIR to persist it across restarts."""
+    cache_dir = os.environ.get('QUERY_EMBED_CACHE_DIR')
+    return QueryEmbeddingCache(
+        EMBED_MODEL,
+        dim=int(os.environ.get('QUERY_EMBED_DIM', '4096')),
+        max_entries=int(os.environ.get('QUERY_EMBED_CACHE_SIZE', '4096')),
+        path=os.path.join(cache_dir, f'{name}_query_embeddings') if cache_dir else None
+    )
+
+
+def create_metrics(app) -> RetrieverMetrics:
+    """Metrics for a service; RESULT_TOKEN_SAMPLE_RATE enables sampled exact token counts."""
+    metrics = RetrieverMetrics(token_sample_rate=float(os.environ.get('RESULT_TOKEN_SAMPLE_RATE', '0')))
+    metrics.instrument(app)
+    return metrics
+
+
+class QueryEmbedder:
+    """Embeds query texts with nv-embed-v1, consulting the cache first.
+
+    With ``max_batch_size`` above 1, cache misses from concurrent requests are
+    micro-batched into shared embedding calls.
+    """
+
+    def __init__(self, client: AsyncOpenAI, cache: QueryEmbeddingCache, model: str = EMBED_MODEL,
+                 max_batch_size: int = 1, max_wait_ms: float = 0):
+        self.client = client
+        self.cache = cache
+        self.model = model
+        self.batcher = None
+        if max_batch_size > 1:
+            self.batcher = EmbeddingBatcher(self._create_embeddings, max_batch_size, max_wait_ms)
+
+    async def embed(self, text: str) -> List[float]:
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in one request, sending each distinct uncached text only once."""
+        vectors = {}
+        missing = []
+        for text in texts:
+            key = normalize_query(text)
+            if key in vectors:
+                continue
+            vectors[key] = self.cache.get(text)
+            if vectors[key] is None:
+                missing.append(key)
+
+        if missing:
+            if self.batcher is not None:
+                embeddings = await self.batcher.embed(missing)
+            else:
+                embeddings = await self._create_embeddings(missing)
+            for key, embedding in zip(missing, embeddings):
+                vectors[key] = embedding
+                self.cache.put(key, embedding)
+
+        return [vectors[normalize_query(text)] for text in texts]
+
+
+    async def _create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        response = await self.client.embeddings.create(
+            input=texts,
+            model=self.model,
+            encoding_format="float",
+            extra_body={"input_type": "query", "truncate": "NONE"}
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def stats(self) -> dict:
+        return {
+            "cache": self.cache.stats(),
+            "batching": self.batcher.stats() if self.batcher is not None else None
+        }
+
+
+def create_query_embedder(name: str) -> QueryEmbedder:
+    """Query embedder configured from the environment; EMBED_BATCH_SIZE=1 disables batching."""
+    return QueryEmbedder(
+        create_openai_client(),
+        create_embedding_cache(name),
+        max_batch_size=int(os.environ.get('EMBED_BATCH_SIZE', '32')),
+        max_wait_ms=float(os.environ.get('EMBED_BATCH_WAIT_MS', '5'))
+    )
+
+
+class MongoVectorStore:
+    """Atlas Search knnBeta over one domain's embeddings collection.
+
+    With ``reduced`` set, the knnBeta stage searches the ``embedding_reduced``
+    field written by ``projection.reduce_collection`` (the query is projected
+    with the newest projection version, re-checked every ``projection_ttl``
+    seconds) and the ``rerank_candidates`` hits are rescored against their full
+    embeddings. Without a stored projection, or when no document carries the
+    current version, it searches the full embeddings instead.
+    """
+
+    def __init__(self, uri: str, k: int = 20, reduced: bool = False, rerank_candidates: int = 100,
+                 projection_ttl: float = 60):
+        tls_allow_invalid = os.environ.get('TLS_ALLOW_INVALID_CERTS', 'false').lower() == 'true'
+        client_class = AsyncMongoClient or MongoClient
+        self.client = client_class(uri, tls=True, tlsAllowInvalidCertificates=tls_allow_invalid)
+        self.collection = self.client.docs.embeddings
+        self.k = k
+        self.reduced = reduced
+        self.rerank_candidates = rerank_candidates
+        self.projection_ttl = projection_ttl
+        self.projection = None
+        self._projection_checked = None
+
+    async def _aggregate(self, pipeline: List[dict]) -> List[dict]:
+        if AsyncMongoClient is not None:
+            cursor = await self.collection.aggregate(pipeline)
+            return [result async for result in cursor]
+        return await asyncio.to_thread(lambda: list(self.collection.aggregate(pipeline)))
+
+    async def _latest_projection(self, fields: dict = None) -> Optional[dict]:
+        projections = self.client.docs.projections
+        if AsyncMongoClient is not None:
+            return await projections.find_one({}, fields, sort=[('version', -1)])
+        return await asyncio.to_thread(projections.find_one, {}, fields, sort=[('version', -1)])
+
+    async def _load_projection(self) -> Optional[Projection]:
+        """The newest stored projection, re-read only when its version has changed."""
+        now = time.monotonic()
+        if self._projection_checked is not None and now - self._projection_checked < self.projection_ttl:
+            return self.projection
+        self._projection_checked = now
+        # Check the version alone; the matrices are only fetched when it moved
+        latest = await self._latest_projection({'version': 1})
+        if latest is None:
+            if self.projection is not None:
+                print("Stored projection removed; searching full embeddings")
+            self.projection = None
+        elif self.projection is None or latest['version'] != self.projection.version:
+            doc = await self._latest_projection()
+            if doc is not None:
+                self.projection = Projection.from_document(doc)
+        return self.projection
+
+    async def search(self, query_embedding: List[float]) -> List[str]:
+        if self.reduced:
+            return await self._search_reduced(query_embedding)
+        return await self._search_full(query_embedding)
+
+    async def _search_full(self, query_embedding: List[float]) -> List[str]:
+        pipeline = [
+            {
+                '$search': {
+                    'knnBeta': {
+                        'path': 'embedding',
+                        'vector': query_embedding,
+                        'k': self.k
+                    }
+                }
+            },
+            # Only the text is needed; don't ship the stored embeddings back
+            {'$project': {'_id': 0, 'text': 1}}
+        ]
+        return [result['text'] for result in await self._aggregate(pipeline)]
+
+    async def _search_reduced(self, query_embedding: List[float]) -> List[str]:
+        projection = await self._load_projection()
+        if projection is None:
+            return await self._search_full(query_embedding)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        pipeline = [
+            {
+                '$search': {
+                    'knnBeta': {
+                        'path': 'embedding_reduced',
+                        'vector': projection.project(query)[0].tolist(),
+                        'k': max(self.k, self.rerank_candidates),
+                        # Vectors reduced by another projection version aren't comparable
+                        'filter': {'equals': {'path': 'projection_version', 'value': projection.version}}
+                    }
+                }
+            },
+            {'$project': {'_id': 0, 'text': 1, 'embedding': 1}}
+        ]
+        candidates = await self._aggregate(pipeline)
+        if not candidates:
+            # No document reduced with this version (yet); don't return an empty answer
+            return await self._search_full(query_embedding)
+        full = np.asarray([candidate['embedding'] for candidate in candidates], dtype=np.float32)
+        scores = full @ query / np.maximum(np.linalg.norm(full, axis=1), 1e-12)
+        return [candidates[i]['text'] for i in np.argsort(-scores)[:self.k]]
+
+
+class LocalVectorStore:
+    """Search over a local index exported with export_index.py (no network hop).
+
+    VECTOR_INDEX_FIRST_STAGE=int8|float16|projection scans the compact copy and
+    reranks the top VECTOR_INDEX_RERANK candidates at full precision.
+    """
+
+    def __init__(self, path: str, k: int = 20):
+        self.index = LocalVectorIndex(
+            path,
+            first_stage=os.environ.get('VECTOR_INDEX_FIRST_STAGE') or None,
+            rerank_candidates=int(os.environ.get('VECTOR_INDEX_RERANK', '200'))
+        )
+        self.k = k
+
+    async def search(self, query_embedding: List[float]) -> List[str]:
+        # NumPy releases the GIL in the matrix multiply, so this runs off the event loop
+        return await asyncio.to_thread(self.index.search, query_embedding, self.k)
+
+
+def domain_index_path(domain: str) -> str:
+    return os.path.join(os.environ.get('VECTOR_INDEX_DIR', 'indexes'), domain)
+
+
+def domain_configured(domain: str) -> bool:
+    """Whether a domain has a MongoDB URI, or an exported index when VECTOR_STORE=local."""
+    if os.environ.get('VECTOR_STORE', 'atlas').lower() == 'local':
+        return os.path.exists(os.path.join(domain_index_path(domain), 'meta.json'))
+    return bool(os.environ.get(DOMAIN_URI_VARS[domain]))
+
+
+def create_vector_store(domain: str):
+    """Atlas knnBeta search by default; VECTOR_STORE=local searches VECTOR_INDEX_DIR/<domain>."""
+    if os.environ.get('VECTOR_STORE', 'atlas').lower() == 'local':
+        return LocalVectorStore(domain_index_path(domain))
+    return MongoVectorStore(
+        os.environ.get(DOMAIN_URI_VARS[domain]),
+        reduced=os.environ.get('ATLAS_REDUCED_SEARCH', 'false').lower() == 'true',
+        rerank_candidates=int(os.environ.get('ATLAS_RERANK_CANDIDATES', '100')),
+        projection_ttl=float(os.environ.get('ATLAS_PROJECTION_TTL', '60'))
+    )
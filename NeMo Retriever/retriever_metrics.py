@@ -0,0 +1,137 @@
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import List
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, ms: float):
+        for i, bound in enumerate(self.buckets_ms):
+            if ms <= bound:
+                break
+        else:
+            i = len(self.buckets_ms)
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ms += ms
+
+    def snapshot(self) -> dict:
+        """Cumulative counts per upper bound, Prometheus style."""
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(list(self.buckets_ms) + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "buckets_ms": buckets
+        }
+
+
+class RetrieverMetrics:
+    """Request counts, per-stage latency histograms and result-size estimates.
+
+    Result tokens are estimated from character counts on every request. Exact
+    tiktoken counts are only taken for a ``token_sample_rate`` fraction of
+    requests, and only when the metrics are read, so tokenization never runs
+    on the request path.
+    """
+
+    def __init__(self, token_sample_rate: float = 0.0, max_samples: int = 256):
+        self.token_sample_rate = token_sample_rate
+        self.requests = Counter()
+        self.stages = {}
+        self.result_chunks = 0
+        self.result_chars = 0
+        self.token_samples = 0
+        self.sampled_tokens = 0
+        self.sampled_chars = 0
+        self._pending_samples = deque(maxlen=max_samples)
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000)
+
+    def observe(self, stage: str, ms: float):
+        with self._lock:
+            self.stages.setdefault(stage, LatencyHistogram()).observe(ms)
+
+    def count_request(self, path: str, status: int):
+        with self._lock:
+            self.requests[f"{path} {status}"] += 1
+
+    def record_results(self, texts: List[str]):
+        chars = sum(len(text) for text in texts)
+        with self._lock:
+            self.result_chunks += len(texts)
+            self.result_chars += chars
+            if self.token_sample_rate > 0 and random.random() < self.token_sample_rate:
+                self._pending_samples.append(texts)
+
+    def instrument(self, app):
+        """Count every request by path and status code, and time it end to end."""
+        @app.middleware("http")
+        async def record_request(request, call_next):
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = await call_next(request)
+                status = response.status_code
+                return response
+            finally:
+                self.count_request(request.url.path, status)
+                self.observe("request", (time.perf_counter() - start) * 1000)
+
+    def _count_tokens(self, samples: List[List[str]]):
+        if self._tokenizer is None:
+            import tiktoken
+            self._tokenizer = tiktoken.get_encoding("cl100k_base")
+        tokens = sum(len(self._tokenizer.encode(text)) for texts in samples for text in texts)
+        chars = sum(len(text) for texts in samples for text in texts)
+        return tokens, chars
+
+    def snapshot(self) -> dict:
+        # Sampled results are tokenized here, when metrics are read, outside the lock
+        with self._lock:
+            samples = list(self._pending_samples)
+            self._pending_samples.clear()
+        if samples:
+            tokens, chars = self._count_tokens(samples)
+
+        with self._lock:
+            if samples:
+                self.token_samples += len(samples)
+                self.sampled_tokens += tokens
+                self.sampled_chars += chars
+            # Chars per token from the samples when there are any, else the usual ~4
+            chars_per_token = self.sampled_chars / self.sampled_tokens if self.sampled_tokens else 4.0
+            return {
+                "requests": dict(self.requests),
+                "latency": {stage: histogram.snapshot() for stage, histogram in self.stages.items()},
+                "results": {
+                    "chunks": self.result_chunks,
+                    "chars": self.result_chars,
+                    "estimated_tokens": int(self.result_chars / chars_per_token),
+                    "token_samples": self.token_samples,
+                    "chars_per_token": chars_per_token
+                }
+            }
@@ -1,44 +1,23 @@
-import os
+import asyncio
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from pymongo import MongoClient
 from dotenv import load_dotenv
-from openai import OpenAI
-import tiktoken
+from retriever_core import create_metrics, create_query_embedder, create_vector_store
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = FastAPI()
 
-# MongoDB connection
-uri = os.environ.get('MONGODB_ATLAS_URI_STRENGTH')
-tls_allow_invalid = os.environ.get('TLS_ALLOW_INVALID_CERTS', 'false').lower() == 'true'
-client = MongoClient(uri, tls=True, tlsAllowInvalidCertificates=tls_allow_invalid)
-db = client.docs
-collection = db.embeddings
+# MongoDB Atlas connection, or a local index with VECTOR_STORE=local
+store = create_vector_store('strength')
 
-# NVIDIA API key
-api_key = os.environ.get('NVIDIA_API_KEY')
+# NVIDIA embeddings with the query-embedding cache and micro-batching in front
+embedder = create_query_embedder('strength')
 
-# Create OpenAI client for NVIDIA API
-openai_client = OpenAI(
-    api_key=api_key,
-    base_url="https://integrate.api.nvidia.com/v1"
-)
-
-# Initialize the tokenizer for token counting
-tokenizer = tiktoken.get_encoding("cl100k_base")
-
-def get_embedding(text):
-    response = openai_client.embeddings.create(
-        input=[text],
-        model="nvidia/nv-embed-v1",
-        encoding_format="float",
-        extra_body={"input_type": "query", "truncate": "NONE"}
-    )
-    return response.data[0].embedding
+# Request counts, stage latencies and result sizes, served at /metrics
+metrics = create_metrics(app)
 
 class Query(BaseModel):
     query_text: str
@@ -48,29 +27,33 @@ async def search(query: Query):
     if not query.query_text:
         raise HTTPException(status_code=400, detail='query_text is required')
     
-    query_embedding = get_embedding(query.query_text)
+    with metrics.timer('embedding'):
+        query_embedding = await embedder.embed(query.query_text)
+    with metrics.timer('vector_search'):
+        result_texts = await store.search(query_embedding)
+    metrics.record_results(result_texts)
     
-    results = collection.aggregate([
-        {
-            '$search': {
-                'knnBeta': {
-                    'path': 'embedding',
-                    'vector': query_embedding,
-                    'k': 20
-                }
-            }
-        }
-    ])
-
-    result_texts = [result['text'] for result in results]
-    print(result_texts)
-
-    # Calculate token counts using the tokenizer
-    token_counts = [len(tokenizer.encode(text)) for text in result_texts]
-    total_tokens = sum(token_counts)
-    print('Token count:', total_tokens)
-
-    return JSONResponse(content=result_texts)
+    with metrics.timer('serialization'):
+        response = JSONResponse(content=result_texts)
+    return response
+
+@app.get('/metrics')
+async def get_metrics():
+    # Sampled results are tokenized while taking the snapshot; keep that off the event loop
+    snapshot = await asyncio.to_thread(metrics.snapshot)
+    return {**snapshot, 'embeddings': embedder.stats()}
+
+@app.get('/cache/stats')
+async def cache_stats():
+    return embedder.cache.stats()
+
+@app.get('/embeddings/stats')
+async def embedding_stats():
+    return embedder.stats()
+
+@app.on_event('shutdown')
+def flush_embedding_cache():
+    embedder.cache.flush()
 
 if __name__ == '__main__':
     import uvicorn
@@ -0,0 +1,49 @@
+"""nutrition_embed serves concurrent requests against a slow stand-in embeddings endpoint."""
+import asyncio
+import importlib
+import os
+
+import httpx
+import pytest
+
+from benchmark_concurrency import create_embedding_server, run_level, serve
+from benchmark_index import build_synthetic_index
+
+DIM = 32
+EMBED_LATENCY = 0.2
+
+
+@pytest.fixture(scope='module')
+def service(tmp_path_factory):
+    embedding_server = create_embedding_server(DIM, EMBED_LATENCY)
+    index_dir = tmp_path_factory.mktemp('indexes')
+    build_synthetic_index(str(index_dir / 'nutrition'), 2000, DIM)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('NVIDIA_API_BASE_URL', serve(embedding_server))
+        mp.setenv('NVIDIA_API_KEY', 'test')
+        mp.setenv('VECTOR_STORE', 'local')
+        mp.setenv('VECTOR_INDEX_DIR', str(index_dir))
+        mp.setenv('QUERY_EMBED_DIM', str(DIM))
+        # One text per embedding call, so only request concurrency can hide the latency
+        mp.setenv('EMBED_BATCH_SIZE', '1')
+        mp.delenv('QUERY_EMBED_CACHE_DIR', raising=False)
+        module = importlib.import_module('nutrition_embed')
+        yield serve(module.app), embedding_server
+
+
+def test_search_returns_results(service):
+    url, _ = service
+    response = httpx.post(f'{url}/search', json={'query_text': 'protein after training'}, timeout=10)
+    response.raise_for_status()
+    assert response.json()
+
+
+def test_concurrent_requests_overlap_embedding_calls(service):
+    url, embedding_server = service
+    requests = 16
+    calls = embedding_server.state.calls
+    throughput, _, _ = asyncio.run(run_level(url, requests, requests, 'overlap'))
+
+    assert embedding_server.state.calls - calls == requests
+    # Serving the requests one at a time would take requests * EMBED_LATENCY = 3.2s
+    assert requests / throughput < 4 * EMBED_LATENCY
@@ -0,0 +1,96 @@
+"""QueryEmbedder micro-batching against the stand-in embeddings endpoint."""
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from benchmark_batching import DIM, create_embedder
+from benchmark_concurrency import create_embedding_server, serve, stand_in_vector
+from embedding_cache import normalize_query
+
+EMBED_LATENCY = 0.02
+
+
+@pytest.fixture(scope='module')
+def endpoint():
+    server = create_embedding_server(DIM, EMBED_LATENCY)
+    return serve(server), server
+
+
+@pytest.fixture
+def server(endpoint):
+    _, server = endpoint
+    server.state.batches.clear()
+    server.state.fail = False
+    return server
+
+
+@pytest.fixture
+def url(endpoint):
+    return endpoint[0]
+
+
+def test_each_caller_gets_its_own_vector(url, server):
+    texts = [f"query {i % 24}" + "  " * (i % 3) for i in range(64)]
+
+    async def embed_all():
+        async with create_embedder(url, max_batch_size=8, max_wait_ms=20) as embedder:
+            return await asyncio.gather(*(embedder.embed(text) for text in texts))
+
+    for text, vector in zip(texts, asyncio.run(embed_all())):
+        assert np.allclose(vector, stand_in_vector(normalize_query(text), DIM)), text
+
+
+def test_concurrent_texts_are_coalesced_up_to_max_batch_size(url, server):
+    async def embed_all():
+        async with create_embedder(url, max_batch_size=16, max_wait_ms=50) as embedder:
+            await asyncio.gather(*(embedder.embed(f"coalesce {i}") for i in range(40)))
+            return embedder.stats()
+
+    stats = asyncio.run(embed_all())
+
+    assert sorted((len(batch) for batch in server.state.batches), reverse=True) == [16, 16, 8]
+    assert all(len(set(batch)) == len(batch) for batch in server.state.batches)
+    assert stats["batching"]["batch_size_histogram"] == {"8": 1, "16": 2}
+
+
+def test_duplicate_texts_share_a_slot(url, server):
+    async def embed_all():
+        async with create_embedder(url, max_batch_size=8, max_wait_ms=50) as embedder:
+            await asyncio.gather(*(embedder.embed(f"duplicate {i % 8}") for i in range(32)))
+
+    asyncio.run(embed_all())
+
+    assert [len(batch) for batch in server.state.batches] == [8]
+
+
+def test_lone_request_is_sent_after_max_wait_ms(url, server):
+    async def embed_one():
+        async with create_embedder(url, max_batch_size=8, max_wait_ms=30) as embedder:
+            start = time.perf_counter()
+            await embedder.embed("lonely query")
+            return time.perf_counter() - start
+
+    elapsed = asyncio.run(embed_one())
+
+    assert 0.03 <= elapsed < 0.03 + EMBED_LATENCY + 0.2
+    assert [len(batch) for batch in server.state.batches] == [1]
+
+
+def test_failed_call_fails_every_waiting_caller(url, server):
+    async def embed_all():
+        async with create_embedder(url, max_batch_size=8, max_wait_ms=10) as embedder:
+            server.state.fail = True
+            try:
+                outcomes = await asyncio.gather(*(embedder.embed(f"failing {i}") for i in range(5)),
+                                                return_exceptions=True)
+            finally:
+                server.state.fail = False
+            # The batcher keeps going once the endpoint recovers
+            return outcomes, await embedder.embed("after failure")
+
+    outcomes, vector = asyncio.run(embed_all())
+
+    assert all(isinstance(outcome, Exception) for outcome in outcomes), outcomes
+    assert np.allclose(vector, stand_in_vector(normalize_query("after failure"), DIM))
@@ -0,0 +1,55 @@
+"""Persistent QueryEmbeddingCache files stay consistent across restarts and setting changes."""
+import os
+
+import pytest
+
+from embedding_cache import QueryEmbeddingCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'cache' / 'queries')
+
+
+def warm_cache(path, **settings):
+    cache = QueryEmbeddingCache(**{'model': 'model-a', 'dim': 8, 'max_entries': 4, 'path': path, **settings})
+    cache.put('protein intake', [0.5] * cache.dim)
+    cache.flush()
+    return cache
+
+
+def test_restart_keeps_entries(path):
+    warm_cache(path)
+    cache = QueryEmbeddingCache('model-a', dim=8, max_entries=4, path=path)
+    assert cache.get('protein   intake') == [0.5] * 8
+
+
+@pytest.mark.parametrize('settings', [
+    {'dim': 16},
+    {'model': 'model-b'},
+    {'max_entries': 8}
+])
+def test_changed_settings_start_every_file_empty(path, settings):
+    warm_cache(path)
+    options = {'model': 'model-a', 'dim': 8, 'max_entries': 4, **settings}
+    cache = QueryEmbeddingCache(path=path, **options)
+
+    assert cache.stats()['entries'] == 0
+    assert not cache._stamps.any() and not cache._keys.any() and not cache._vectors.any()
+    cache.put('protein intake', [0.25] * options['dim'])
+    assert cache.get('protein intake') == [0.25] * options['dim']
+
+
+def test_missing_sidecar_recreates_the_files(path):
+    warm_cache(path)
+    os.remove(f"{path}.meta.json")
+    assert QueryEmbeddingCache('model-a', dim=8, max_entries=4, path=path).stats()['entries'] == 0
+
+
+def test_truncated_file_recreates_the_files(path):
+    warm_cache(path)
+    with open(f"{path}.stamps", 'r+b') as f:
+        f.truncate(8)
+    cache = QueryEmbeddingCache('model-a', dim=8, max_entries=4, path=path)
+    assert cache.get('protein intake') is None
+    assert os.path.getsize(f"{path}.stamps") == 4 * 8
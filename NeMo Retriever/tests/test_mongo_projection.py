@@ -0,0 +1,153 @@
+"""MongoVectorStore picks up new projection versions and falls back to full-dimension search."""
+import asyncio
+import types
+
+import numpy as np
+import pytest
+
+import retriever_core
+from projection import fit_projection, reduce_collection
+from retriever_core import MongoVectorStore
+
+DIM = 16
+
+
+class FakeProjections:
+    def __init__(self):
+        self.docs = []
+        self.full_reads = 0
+
+    def insert_one(self, doc):
+        self.docs.append(doc)
+
+    def find_one(self, filter=None, fields=None, sort=None):
+        if not self.docs:
+            return None
+        doc = max(self.docs, key=lambda d: d['version'])
+        if fields is None:
+            self.full_reads += 1
+            return doc
+        return {'version': doc['version']}
+
+
+class FakeEmbeddings:
+    """Answers knnBeta on ``embedding_reduced`` only for documents at ``version``."""
+
+    def __init__(self, version):
+        self.version = version
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        knn = pipeline[0]['$search']['knnBeta']
+        if knn['path'] == 'embedding':
+            return [{'text': 'full'}]
+        if knn['filter']['equals']['value'] != self.version:
+            return []
+        return [{'text': 'reduced', 'embedding': np.ones(DIM).tolist()}]
+
+
+def projection_doc(version):
+    sample = np.random.default_rng(version).standard_normal((32, DIM))
+    return fit_projection(sample, 4, 'random', version).to_document()
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(retriever_core, 'AsyncMongoClient', None)
+    store = MongoVectorStore.__new__(MongoVectorStore)
+    store.client = types.SimpleNamespace(docs=types.SimpleNamespace(projections=FakeProjections()))
+    store.collection = FakeEmbeddings(version=1)
+    store.k = 5
+    store.reduced = True
+    store.rerank_candidates = 10
+    store.projection_ttl = 0
+    store.projection = None
+    store._projection_checked = None
+    return store
+
+
+def search(store):
+    return asyncio.run(store.search(np.ones(DIM).tolist()))
+
+
+def test_new_projection_version_is_picked_up(store):
+    projections = store.client.docs.projections
+    projections.docs.append(projection_doc(1))
+    assert search(store) == ['reduced']
+    assert store.projection.version == 1
+
+    projections.docs.append(projection_doc(2))
+    store.collection.version = 2
+    assert search(store) == ['reduced']
+    assert store.projection.version == 2
+
+
+def test_unchanged_version_is_not_reloaded(store):
+    projections = store.client.docs.projections
+    projections.docs.append(projection_doc(1))
+    search(store)
+    search(store)
+    assert projections.full_reads == 1
+
+
+def test_projection_is_rechecked_only_after_ttl(store):
+    projections = store.client.docs.projections
+    projections.docs.append(projection_doc(1))
+    store.projection_ttl = 3600
+    search(store)
+    projections.docs.append(projection_doc(2))
+    search(store)
+    assert store.projection.version == 1
+
+
+def test_falls_back_to_full_search_when_no_document_has_the_version(store):
+    store.client.docs.projections.docs.append(projection_doc(1))
+    store.collection.version = 0
+    assert search(store) == ['full']
+    assert store.collection.pipelines[-1][0]['$search']['knnBeta']['path'] == 'embedding'
+
+
+def test_falls_back_to_full_search_without_a_projection(store):
+    assert search(store) == ['full']
+
+
+class FakeCorpus:
+    """Enough of a collection for reduce_collection; ``lost`` updates match nothing."""
+
+    def __init__(self, size, lost=0):
+        rng = np.random.default_rng(0)
+        self.docs = [{'_id': i, 'embedding': rng.standard_normal(DIM).tolist()} for i in range(size)]
+        self.lost = lost
+        self.switched = False
+
+    def aggregate(self, pipeline):
+        return [{'embedding': doc['embedding']} for doc in self.docs]
+
+    def find(self, filter, fields):
+        return iter(self.docs)
+
+    def bulk_write(self, updates, ordered=True):
+        lost = min(self.lost, len(updates))
+        self.lost -= lost
+        return types.SimpleNamespace(matched_count=len(updates) - lost)
+
+    def update_many(self, filter, update):
+        self.switched = isinstance(update, list)
+
+
+def test_projection_is_saved_after_every_document_is_updated():
+    corpus, projections = FakeCorpus(20), FakeProjections()
+    projection = reduce_collection(corpus, projections, 4, method='random', batch_size=8)
+
+    assert corpus.switched
+    assert [doc['version'] for doc in projections.docs] == [projection.version]
+
+
+def test_projection_is_not_saved_when_an_update_is_lost():
+    corpus, projections = FakeCorpus(20, lost=1), FakeProjections()
+    with pytest.raises(RuntimeError):
+        reduce_collection(corpus, projections, 4, method='random', batch_size=8)
+
+    assert not corpus.switched
+    assert projections.docs == []
@@ -0,0 +1,296 @@
+import json
+import os
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from projection import Projection, fit_projection
+
+INDEX_FORMAT_VERSION = 1
+SUPPORTED_DTYPES = ("float32", "float16")
+QUANTIZATION_KINDS = ("int8", "float16")
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def merge_top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the ``k`` best-scoring columns of each row, best first."""
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        ids = np.take_along_axis(ids, keep, axis=1)
+        scores = np.take_along_axis(scores, keep, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(ids, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def read_meta(path: str) -> dict:
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+def write_meta(path: str, meta: dict):
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def quantize_index(path: str, kind: str, block_rows: int = 16384):
+    """Add a compact first-stage copy of an index's vectors.
+
+    ``int8`` stores per-dimension scalar-quantized codes (4x smaller than float32)
+    with the per-dimension scale and offset; ``float16`` stores a half-precision
+    copy. The full-precision ``vectors.npy`` stays for reranking.
+    """
+    if kind not in QUANTIZATION_KINDS:
+        raise ValueError(f"kind must be one of {QUANTIZATION_KINDS}")
+    meta = read_meta(path)
+    vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+    count, dim = vectors.shape
+    entry = {"file": f"vectors_{kind}.npy"}
+
+    if kind == "int8":
+        low = np.full(dim, np.inf, dtype=np.float32)
+        high = np.full(dim, -np.inf, dtype=np.float32)
+        for start in range(0, count, block_rows):
+            block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+            low = np.minimum(low, block.min(axis=0))
+            high = np.maximum(high, block.max(axis=0))
+        scale = np.maximum(high - low, 1e-12) / 255.0
+        np.savez(os.path.join(path, "int8_params.npz"), scale=scale, offset=low)
+        entry["params"] = "int8_params.npz"
+
+    compact = np.lib.format.open_memmap(
+        os.path.join(path, entry["file"]), mode="w+", dtype=np.int8 if kind == "int8" else np.float16,
+        shape=(count, dim)
+    )
+    for start in range(0, count, block_rows):
+        block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+        if kind == "int8":
+            codes = np.rint((block - low) / scale) - 128
+            compact[start:start + block_rows] = np.clip(codes, -128, 127).astype(np.int8)
+        else:
+            compact[start:start + block_rows] = block.astype(np.float16)
+    compact.flush()
+    del compact
+
+    meta.setdefault("first_stage", {})[kind] = entry
+    write_meta(path, meta)
+
+
+def add_projection(path: str, dim: int, method: str = "pca", sample_size: int = 20000,
+                   block_rows: int = 16384, seed: int = 0) -> Projection:
+    """Fit a new projection version on an index and store its reduced vectors.
+
+    Older versions' files are kept; meta.json points the ``projection`` first
+    stage at the newest one.
+    """
+    meta = read_meta(path)
+    vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+    count = vectors.shape[0]
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(count, size=min(sample_size, count), replace=False))
+    previous = meta.get("first_stage", {}).get("projection")
+    version = previous["version"] + 1 if previous else 1
+    projection = fit_projection(np.asarray(vectors[rows], dtype=np.float32), dim, method, version, seed)
+
+    entry = {
+        "file": f"vectors_projection_v{version}.npy",
+        "projection": f"projection_v{version}.npz",
+        "version": version,
+        "method": method,
+        "dim": dim
+    }
+    projection.save(os.path.join(path, entry["projection"]))
+    reduced = np.lib.format.open_memmap(
+        os.path.join(path, entry["file"]), mode="w+", dtype=np.float32, shape=(count, dim)
+    )
+    for start in range(0, count, block_rows):
+        reduced[start:start + block_rows] = projection.project(vectors[start:start + block_rows])
+    reduced.flush()
+    del reduced
+
+    meta.setdefault("first_stage", {})["projection"] = entry
+    write_meta(path, meta)
+    return projection
+
+
+class TextStore:
+    """Chunk texts as one UTF-8 blob plus an offsets array, both memory-mapped."""
+
+    def __init__(self, path: str):
+        self.offsets = np.load(os.path.join(path, "text_offsets.npy"), mmap_mode="r")
+        self.blob = np.memmap(os.path.join(path, "texts.bin"), dtype=np.uint8, mode="r") \
+            if self.offsets[-1] > 0 else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+
+class IndexWriter:
+    """Streams (text, embedding) pairs into a local index directory.
+
+    Vectors are appended to a raw scratch file and converted to ``vectors.npy``
+    on ``close``, so collections larger than memory can be exported.
+    """
+
+    def __init__(self, path: str, dim: int, dtype: str = "float32", metric: str = "cosine",
+                 source: str = None):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}")
+        if metric not in ("cosine", "dot"):
+            raise ValueError("metric must be 'cosine' or 'dot'")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dim = dim
+        self.dtype = dtype
+        self.metric = metric
+        self.source = source
+        self.count = 0
+        self._offsets = [0]
+        self._texts = open(os.path.join(path, "texts.bin"), "wb")
+        self._raw_path = os.path.join(path, "vectors.raw")
+        self._raw = open(self._raw_path, "wb")
+
+    def add(self, texts: Sequence[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dim)
+        if self.metric == "cosine":
+            vectors = normalize_rows(vectors)
+        self._raw.write(vectors.astype(self.dtype).tobytes())
+        for text in texts:
+            encoded = text.encode("utf-8")
+            self._texts.write(encoded)
+            self._offsets.append(self._offsets[-1] + len(encoded))
+        self.count += len(texts)
+
+    def close(self):
+        self._texts.close()
+        self._raw.close()
+        np.save(os.path.join(self.path, "text_offsets.npy"), np.asarray(self._offsets, dtype=np.int64))
+
+        vectors = np.lib.format.open_memmap(
+            os.path.join(self.path, "vectors.npy"), mode="w+", dtype=self.dtype, shape=(self.count, self.dim)
+        )
+        if self.count:
+            raw = np.memmap(self._raw_path, dtype=self.dtype, mode="r", shape=(self.count, self.dim))
+            for start in range(0, self.count, 16384):
+                vectors[start:start + 16384] = raw[start:start + 16384]
+            del raw
+        vectors.flush()
+        del vectors
+        os.remove(self._raw_path)
+
+        write_meta(self.path, {
+            "version": INDEX_FORMAT_VERSION,
+            "count": self.count,
+            "dim": self.dim,
+            "dtype": self.dtype,
+            "metric": self.metric,
+            "source": self.source,
+            "first_stage": {}
+        })
+
+
+class LocalVectorIndex:
+    """Exact top-k search over a memory-mapped embedding matrix.
+
+    The matrix is scanned in blocks of ``block_rows``; each block is one BLAS
+    matrix multiply against all queries in the batch, and ``argpartition`` keeps
+    the running top-k without sorting every score.
+
+    With ``first_stage`` set to a representation added by ``quantize_index``
+    (``int8``/``float16``) or ``add_projection`` (``projection``), the scan runs
+    over the compact matrix and only the best ``rerank_candidates`` rows are
+    rescored against the full-precision vectors.
+    """
+
+    def __init__(self, path: str, block_rows: int = 4096, first_stage: str = None,
+                 rerank_candidates: int = 200):
+        self.meta = read_meta(path)
+        if self.meta.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index version {self.meta.get('version')} in {path}")
+        self.path = path
+        self.block_rows = block_rows
+        self.metric = self.meta["metric"]
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.texts = TextStore(path)
+        self.rerank_candidates = rerank_candidates
+
+        self.first_stage = first_stage
+        self.first_stage_vectors = None
+        self.int8_scale = None
+        self.projection = None
+        if first_stage:
+            entry = self.meta.get("first_stage", {}).get(first_stage)
+            if entry is None:
+                raise ValueError(f"Index {path} has no {first_stage} first stage; run quantize_index first")
+            self.first_stage_vectors = np.load(os.path.join(path, entry["file"]), mmap_mode="r")
+            if first_stage == "int8":
+                self.int8_scale = np.load(os.path.join(path, entry["params"]))["scale"]
+            elif first_stage == "projection":
+                self.projection = Projection.load(os.path.join(path, entry["projection"]))
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def prepare_queries(self, queries) -> np.ndarray:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        return normalize_rows(queries) if self.metric == "cosine" else queries
+
+    def top_k(self, queries, k: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(ids, scores)`` of shape ``(len(queries), k)``, best first."""
+        queries = self.prepare_queries(queries)
+        if self.first_stage_vectors is None:
+            return self._scan(self.vectors, queries, k)
+
+        stage_queries = self._first_stage_queries(queries)
+        candidates, _ = self._scan(self.first_stage_vectors, stage_queries, max(k, self.rerank_candidates))
+        return self._rerank(queries, candidates, k)
+
+    def _first_stage_queries(self, queries: np.ndarray) -> np.ndarray:
+        if self.projection is not None:
+            return self.projection.project(queries)
+        if self.int8_scale is not None:
+            # x ~ (code + 128) * scale + offset, so ranking by code @ (scale * q) matches
+            # ranking by x @ q; the remaining term is constant per query.
+            return queries * self.int8_scale
+        return queries
+
+    def _rerank(self, queries: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rescore candidate rows against the full-precision vectors."""
+        ids = np.unique(candidates)
+        full = np.asarray(self.vectors[ids], dtype=np.float32)
+        scores = queries @ full.T
+        # Only each query's own candidates compete
+        position = np.searchsorted(ids, candidates)
+        candidate_scores = np.take_along_axis(scores, position, axis=1)
+        return merge_top_k(candidates, candidate_scores, k)
+
+    def _scan(self, matrix: np.ndarray, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, matrix.shape[0], self.block_rows):
+            block = matrix[start:start + self.block_rows]
+            if block.dtype != np.float32:
+                block = block.astype(np.float32)
+            scores = queries @ block.T
+            ids = np.broadcast_to(np.arange(start, start + block.shape[0]), scores.shape)
+            best_ids, best_scores = merge_top_k(
+                np.concatenate([best_ids, ids], axis=1),
+                np.concatenate([best_scores, scores], axis=1),
+                k
+            )
+        return best_ids, best_scores
+
+    def search(self, query: Sequence[float], k: int = 20) -> List[str]:
+        return self.search_batch([query], k)[0]
+
+    def search_batch(self, queries: Iterable[Sequence[float]], k: int = 20) -> List[List[str]]:
+        """Search several queries with one matrix-matrix multiply per block."""
+        ids, _ = self.top_k(list(queries), k)
+        return [[self.texts[int(i)] for i in row] for row in ids]
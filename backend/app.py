@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import os
@@ -10,9 +10,37 @@ import traceback
 import numpy as np
 import pytz
 import concurrent.futures
+import time
 import json
-from llm_backend import perform_combined_vector_searches, process_rag_response
-from whoop_processor import WhoopDataProcessor
+from llm_backend import (
+    embed_query,
+    generate_follow_up_questions,
+    iter_combined_vector_searches,
+    perform_combined_vector_searches,
+    process_rag_response,
+    stream_rag_response,
+    summarize_conversation
+)
+from whoop_processor import IncrementalWhoopProcessor, WhoopDataProcessor
+from whoop_aggregation import aggregate_workouts, calculate_daily_sleep
+from whoop_store import WhoopRecordStore
+from follow_ups import FollowUpStore
+from processed_cache import ProcessedDataCache, hash_payload
+from chat_history import ConversationHistoryManager
+from summary_log import SummaryLogger
+from chat_sessions import (
+    InMemorySessionStore,
+    SQLiteSessionStore,
+    append_message,
+    new_session,
+    replace_whoop_data
+)
+from response_cache import (
+    InMemoryCacheBackend,
+    SemanticResponseCache,
+    SQLiteCacheBackend,
+    hash_whoop_data
+)
 import sys
 
 load_dotenv()
@@ -24,7 +52,7 @@ cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
 CORS(app, resources={
     r"/*": {
         "origins": cors_origins,
-        "methods": ["GET", "POST", "OPTIONS"],
+        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         "allow_headers": ["Content-Type"]
     }
 })
@@ -32,6 +60,8 @@ CORS(app, resources={
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 
+WHOOP_COLLECTIONS = ('recovery', 'sleep', 'cycle', 'workout')
+
 class WhoopService:
     def __init__(self):
         username = os.getenv("WHOOP_USERNAME")
@@ -41,7 +71,68 @@ class WhoopService:
             raise ValueError("WHOOP_USERNAME and WHOOP_PASSWORD must be set in .env file")
         
         self.client = WhoopClient(username, password)
+        self.user_id = username
         self.sport_names = self.get_sport_names()
+        self.store = self.create_store()
+        self.fetch_timeout = float(os.getenv("WHOOP_FETCH_TIMEOUT", "20"))
+        self.fetch_retries = int(os.getenv("WHOOP_FETCH_RETRIES", "2"))
+        self.fetch_backoff = float(os.getenv("WHOOP_FETCH_BACKOFF", "0.5"))
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=int(os.getenv("WHOOP_FETCH_WORKERS", "8")),
+            thread_name_prefix="whoop-fetch"
+        )
+
+    def create_store(self):
+        """Open the local Whoop record store, or return None if disabled."""
+        if os.getenv("WHOOP_STORE", "true").lower() != "true":
+            return None
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'whoop_store.db')
+        return WhoopRecordStore(
+            os.getenv("WHOOP_STORE_PATH") or default_path,
+            mutable_days=int(os.getenv("WHOOP_STORE_MUTABLE_DAYS", "2"))
+        )
+
+    def get_collection(self, collection, start_date, end_date):
+        """Fetch one Whoop collection for ``[start_date, end_date)``, served from the local store when possible."""
+        fetch = getattr(self.client, f"get_{collection}_collection")
+        if self.store is None:
+            return fetch(start_date.isoformat(), end_date.isoformat())
+        return self.store.get_collection(self.user_id, collection, start_date, end_date, fetch)
+
+    def fetch_collections(self, start_date, end_date):
+        """Fetch all Whoop collections concurrently, with per-call timeouts and retry-with-backoff.
+
+        Collections that fail or miss the timeout are retried together after an
+        exponential backoff; the last error is raised once retries are exhausted.
+        """
+        results = {}
+        errors = {}
+        pending = list(WHOOP_COLLECTIONS)
+        for attempt in range(self.fetch_retries + 1):
+            futures = {
+                collection: self.executor.submit(self.get_collection, collection, start_date, end_date)
+                for collection in pending
+            }
+            deadline = time.monotonic() + self.fetch_timeout
+            pending = []
+            for collection, future in futures.items():
+                try:
+                    results[collection] = future.result(timeout=max(0, deadline - time.monotonic()))
+                except concurrent.futures.TimeoutError:
+                    errors[collection] = TimeoutError(
+                        f"Fetching {collection} collection timed out after {self.fetch_timeout}s"
+                    )
+                    pending.append(collection)
+                except Exception as e:
+                    errors[collection] = e
+                    pending.append(collection)
+            if not pending:
+                return results
+            app.logger.warning(f"Whoop fetch attempt {attempt + 1} failed for {pending}: "
+                               f"{[str(errors[c]) for c in pending]}")
+            if attempt < self.fetch_retries:
+                time.sleep(self.fetch_backoff * (2 ** attempt))
+        raise errors[pending[0]]
 
     def get_sport_names(self):
         return {
@@ -76,7 +167,6 @@ class WhoopService:
     def get_last_7_days_summary(self, start_date=None, end_date=None):
         # Use UTC timezone for consistent calculations
         tz = pytz.timezone('UTC')
-        local_tz = pytz.timezone('America/New_York')
         
         if start_date:
             end_date = start_date + timedelta(days=7)
@@ -87,11 +177,35 @@ class WhoopService:
         
         app.logger.debug(f"Start date: {start_date}, End date: {end_date} (UTC)")
         
+        return self.get_daily_summary(start_date, end_date)
+
+    def iter_daily_summary(self, start_date, end_date, chunk_days=7):
+        """Yield per-day summaries for ``[start_date, end_date)`` in ascending date order.
+
+        The range is fetched and processed one chunk at a time so memory stays flat
+        for long ranges. Each chunk also loads the day before it, so sleep carrying
+        over midnight into the chunk's first day is counted, and that day is dropped.
+        """
+        chunk_start = start_date
+        while chunk_start < end_date:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days), end_date)
+            chunk = self.get_daily_summary(chunk_start - timedelta(days=1), chunk_end)
+            first_day = chunk_start.isoformat()
+            for day in reversed(chunk):
+                if day['date'] >= first_day:
+                    yield day
+            chunk_start = chunk_end
+
+    def get_daily_summary(self, start_date, end_date):
+        """Return formatted per-day summaries for ``[start_date, end_date)``, newest first."""
+        local_tz = pytz.timezone('America/New_York')
+        
         # Fetch data from Whoop API
-        recovery_data = self.client.get_recovery_collection(start_date.isoformat(), end_date.isoformat())
-        sleep_data = self.client.get_sleep_collection(start_date.isoformat(), end_date.isoformat())
-        cycle_data = self.client.get_cycle_collection(start_date.isoformat(), end_date.isoformat())
-        workout_data = self.client.get_workout_collection(start_date.isoformat(), end_date.isoformat())
+        collections = self.fetch_collections(start_date, end_date)
+        recovery_data = collections['recovery']
+        sleep_data = collections['sleep']
+        cycle_data = collections['cycle']
+        workout_data = collections['workout']
         
         # Normalize and process data
         recovery_df = pd.json_normalize(recovery_data)
@@ -101,6 +215,9 @@ class WhoopService:
         
         # Process dates for each metric, handling missing fields and timezones
         def safe_convert_timezone(dt_series, target_tz):
+            if dt_series is None:
+                # Empty collection (e.g. days before the user joined): align as all-missing
+                return pd.Series(dtype=pd.DatetimeTZDtype(tz=target_tz))
             return pd.to_datetime(dt_series).apply(
                 lambda dt: dt.tz_convert(target_tz) if dt.tzinfo else dt.tz_localize('UTC').tz_convert(target_tz)
             )
@@ -115,7 +232,7 @@ class WhoopService:
             workout_df['start_time'] = safe_convert_timezone(workout_df['start'], local_tz)
             workout_df['end_time'] = safe_convert_timezone(workout_df['end'], local_tz)
             workout_df['date'] = workout_df['start_time'].dt.date
-            workout_summary = workout_df.groupby('date').apply(self.aggregate_workouts).reset_index()
+            workout_summary = self.aggregate_workouts(workout_df)
         else:
             app.logger.warning("No workout data or 'start' column missing in workout data")
             workout_summary = pd.DataFrame(columns=['date', 'workouts'])
@@ -126,62 +243,18 @@ class WhoopService:
         cycle_df['date'] = cycle_df['timestamp'].dt.date
         
         # Calculate sleep duration in minutes, considering overlaps and cross-midnight sleeps
-        def calculate_daily_sleep(sleep_df):
-            sleep_data = []
-            for date, group in sleep_df.groupby('date'):
-                sorted_sleeps = group.sort_values('start_time')
-                total_sleep = 0
-                last_end = None
-                sleep_metrics = {
-                    'disturbance_count': 0,
-                    'efficiency_percentage': 0,
-                    'awake_time': 0,
-                    'light_sleep_time': 0,
-                    'slow_wave_sleep_time': 0,
-                    'rem_sleep_time': 0,
-                    'sleep_cycle_count': 0
-                }
-                for _, sleep in sorted_sleeps.iterrows():
-                    start = sleep['start_time']
-                    end = sleep['end_time']
-                    if last_end is None or start > last_end:
-                        total_sleep += (end - start).total_seconds() / 60
-                    elif end > last_end:
-                        total_sleep += (end - last_end).total_seconds() / 60
-                    last_end = max(end, last_end) if last_end else end
-                    
-                    # Aggregate sleep metrics
-                    sleep_metrics['disturbance_count'] += sleep.get('score.stage_summary.disturbance_count', 0)
-                    sleep_metrics['efficiency_percentage'] = max(sleep_metrics['efficiency_percentage'], sleep.get('score.sleep_efficiency_percentage', 0))
-                    sleep_metrics['awake_time'] += sleep.get('score.stage_summary.total_awake_time_milli', 0) / 60000  # Convert to minutes
-                    sleep_metrics['light_sleep_time'] += sleep.get('score.stage_summary.total_light_sleep_time_milli', 0) / 60000
-                    sleep_metrics['slow_wave_sleep_time'] += sleep.get('score.stage_summary.total_slow_wave_sleep_time_milli', 0) / 60000
-                    sleep_metrics['rem_sleep_time'] += sleep.get('score.stage_summary.total_rem_sleep_time_milli', 0) / 60000
-                    sleep_metrics['sleep_cycle_count'] += sleep.get('score.stage_summary.sleep_cycle_count', 0)
-                
-                # Check for sleep that started the previous day
-                previous_day = date - timedelta(days=1)
-                previous_sleeps = sleep_df[sleep_df['date'] == previous_day]
-                for _, sleep in previous_sleeps.iterrows():
-                    if sleep['end_time'].date() == date:
-                        sleep_in_this_day = (sleep['end_time'] - sleep['end_time'].replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds() / 60
-                        total_sleep += sleep_in_this_day
-
-                sleep_data.append({
-                    'date': date,
-                    'sleep_duration': total_sleep,
-                    **sleep_metrics
-                })
-            return pd.DataFrame(sleep_data)
-
         sleep_summary = calculate_daily_sleep(sleep_df)
-        sleep_summary.columns = ['date', 'sleep_duration', 'disturbance_count', 'efficiency_percentage', 'awake_time', 'light_sleep_time', 'slow_wave_sleep_time', 'rem_sleep_time', 'sleep_cycle_count']
         
         # Aggregate data by date
-        recovery_summary = recovery_df.groupby('date')['score.recovery_score'].last().reset_index()
-        strain_summary = cycle_df.groupby('date')['score.strain'].last().reset_index()
+        def last_by_date(df, column):
+            if column not in df.columns:
+                return pd.DataFrame(columns=['date', column])
+            return df.groupby('date')[column].last().reset_index()
+
+        recovery_summary = last_by_date(recovery_df, 'score.recovery_score')
+        strain_summary = last_by_date(cycle_df, 'score.strain')
         
-        # Create a base date range for the specified 7 days
+        # Create a base date range for the requested days
         date_range = pd.date_range(start=start_date, end=end_date - timedelta(days=1), freq='D').date
         
         # Base DataFrame to ensure all days are included
@@ -234,36 +307,110 @@ class WhoopService:
         app.logger.debug(f"Formatted summary (sorted): {formatted_summary}")
         return formatted_summary
 
-    def aggregate_workouts(self, group):
-        workouts = []
-        for _, workout in group.iterrows():
-            if pd.notnull(workout.get('start_time')) and pd.notnull(workout.get('end_time')):
-                duration_minutes = (workout['end_time'] - workout['start_time']).total_seconds() / 60
-            else:
-                duration_minutes = None
-            workout_info = {
-                'sport': self.sport_names.get(workout.get('sport_id', -1), 'Unknown'),
-                'strain': round(workout['score.strain'], 2) if pd.notnull(workout.get('score.strain')) else None,
-                'average_hr': workout['score.average_heart_rate'] if pd.notnull(workout.get('score.average_heart_rate')) else None,
-                'max_hr': workout['score.max_heart_rate'] if pd.notnull(workout.get('score.max_heart_rate')) else None,
-                'duration': round(duration_minutes) if duration_minutes is not None else None,
-                'zone_duration': {
-                    'zone_zero_milli': workout.get('score.zone_duration.zone_zero_milli'),
-                    'zone_one_milli': workout.get('score.zone_duration.zone_one_milli'),
-                    'zone_two_milli': workout.get('score.zone_duration.zone_two_milli'),
-                    'zone_three_milli': workout.get('score.zone_duration.zone_three_milli'),
-                    'zone_four_milli': workout.get('score.zone_duration.zone_four_milli'),
-                    'zone_five_milli': workout.get('score.zone_duration.zone_five_milli'),
-                }
-            }
-            workouts.append(workout_info)
-        return pd.Series({'workouts': workouts})
+    def aggregate_workouts(self, workout_df):
+        """Return one row per date with that day's list of workout summaries."""
+        return aggregate_workouts(workout_df, self.sport_names)
 
 whoop_service = WhoopService()
+follow_up_store = FollowUpStore(
+    generate_follow_up_questions,
+    max_workers=int(os.getenv("FOLLOW_UP_WORKERS", "2")),
+    ttl_seconds=float(os.getenv("FOLLOW_UP_TTL_SECONDS", "900"))
+)
+
+def create_response_cache():
+    """Build the chat response cache from environment settings, or None if disabled."""
+    if os.getenv("RESPONSE_CACHE", "true").lower() != "true":
+        return None
+    if os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower() == "sqlite":
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'response_cache.db')
+        backend = SQLiteCacheBackend(os.getenv("RESPONSE_CACHE_PATH") or default_path)
+    else:
+        backend = InMemoryCacheBackend()
+    return SemanticResponseCache(
+        embed_query,
+        backend=backend,
+        threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95")),
+        ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+    )
+
+response_cache = create_response_cache()
+
+# Processed Whoop data memoized by payload hash across chat turns
+processed_data_cache = ProcessedDataCache(
+    lambda whoop_data: WhoopDataProcessor(whoop_data).get_processed_data(),
+    max_entries=int(os.getenv("PROCESSED_DATA_CACHE_SIZE", "64"))
+)
+
+summary_logger = SummaryLogger(
+    os.getenv("SUMMARY_LOG_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'whoop_summary.log'),
+    max_bytes=int(os.getenv("SUMMARY_LOG_MAX_BYTES", str(5 * 1024 * 1024))),
+    backup_count=int(os.getenv("SUMMARY_LOG_BACKUP_COUNT", "3")),
+    queue_size=int(os.getenv("SUMMARY_LOG_QUEUE_SIZE", "256")),
+    sample_rate=float(os.getenv("SUMMARY_LOG_SAMPLE_RATE", "1.0")),
+    include_processed=os.getenv("SUMMARY_LOG_PROCESSED", "false").lower() == "true"
+)
+
+def create_session_store():
+    """Build the server-side chat session store from environment settings."""
+    idle_seconds = float(os.getenv("CHAT_SESSION_IDLE_SECONDS", "1800"))
+    max_bytes = int(os.getenv("CHAT_SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+    if os.getenv("CHAT_SESSION_BACKEND", "memory").lower() == "sqlite":
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chat_sessions.db')
+        return SQLiteSessionStore(os.getenv("CHAT_SESSION_PATH") or default_path, idle_seconds, max_bytes)
+    return InMemorySessionStore(idle_seconds, max_bytes)
+
+session_store = create_session_store()
+
+# Conversation history kept under a token budget, older turns folded into a background summary
+history_manager = ConversationHistoryManager(
+    summarize_conversation,
+    token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "1500")),
+    keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", "3")),
+    max_workers=int(os.getenv("HISTORY_SUMMARY_WORKERS", "1"))
+)
+
+def stream_whoop_summary(start_date, end_date):
+    """Stream per-day summaries for an inclusive date range as NDJSON."""
+    today = datetime.now(pytz.UTC).date()
+    max_days = int(os.getenv("WHOOP_SUMMARY_MAX_DAYS", "366"))
+    chunk_days = int(os.getenv("WHOOP_SUMMARY_CHUNK_DAYS", "7"))
+    
+    try:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({"error": "start_date and end_date must be YYYY-MM-DD"}), 400
+    
+    # Ensure we're not requesting future data
+    end_date = min(end_date, today)
+    if start_date > end_date:
+        return jsonify({"error": "start_date must not be after end_date"}), 400
+    if (end_date - start_date).days + 1 > max_days:
+        return jsonify({"error": f"Date range cannot exceed {max_days} days"}), 400
+    
+    app.logger.debug(f"Streaming summary from {start_date} to {end_date} (UTC)")
+    
+    def generate():
+        try:
+            for day in whoop_service.iter_daily_summary(start_date, end_date + timedelta(days=1), chunk_days):
+                yield json.dumps(day) + "\n"
+        except Exception as e:
+            logging.error(f"Error streaming Whoop summary: {str(e)}")
+            logging.error(traceback.format_exc())
+            yield json.dumps({"error": str(e)}) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @app.route('/api/whoop/summary', methods=['GET'])
 def get_whoop_summary():
     logging.debug("Received request for /api/whoop/summary")
+    
+    # An explicit end_date selects the long-range view, streamed as NDJSON
+    if request.args.get('end_date'):
+        return stream_whoop_summary(request.args.get('start_date', ''), request.args['end_date'])
+    
     try:
         start_date = request.args.get('start_date')
         today = datetime.now(pytz.UTC).date()
@@ -286,33 +433,11 @@ def get_whoop_summary():
         app.logger.debug(f"Adjusted Start date: {start_date}, End date: {end_date} (UTC)")
         summary = whoop_service.get_last_7_days_summary(start_date, end_date)
         
-        # Log the summary data
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        log_path = os.path.join(current_dir, 'log.txt')
-        
-        try:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(f"\n\n=== Whoop Summary Generated {timestamp} ===\n")
-                f.write("Raw Summary Data:\n")
-                f.write(json.dumps(summary, indent=2))
-                f.write("\n" + "="*50 + "\n")
-                
-                # Process and log the preprocessed data
-                processor = WhoopDataProcessor(summary)
-                processed_data = processor.get_processed_data()
-                
-                f.write(f"\n=== Preprocessed Summary Data {timestamp} ===\n")
-                f.write(json.dumps(processed_data, indent=2))
-                f.write("\n" + "="*50 + "\n")
-                f.flush()
-                
-            print(f"Successfully logged summary and preprocessed data to {log_path}")
-            
-        except Exception as log_error:
-            print(f"Error writing to log file: {str(log_error)}")
-            print(f"Current working directory: {os.getcwd()}")
-            logging.error(f"Logging error: {str(log_error)}")
+        # Log the summary data on the background writer (processed on that thread if enabled)
+        summary_logger.log_summary(
+            start_date, end_date, summary,
+            process_fn=lambda days: WhoopDataProcessor(days).get_processed_data()
+        )
         
         logging.debug("Successfully generated summary")
         return jsonify(summary)
@@ -321,40 +446,140 @@ def get_whoop_summary():
         logging.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
+def prepare_whoop_context(whoop_data):
+    """Return the processed Whoop data, its prompt serialization and the payload hash."""
+    if whoop_data:
+        return processed_data_cache.get(whoop_data)
+    return None, "", None
+
+def prepare_session_whoop_context(whoop_data, session=None):
+    """Process Whoop data for a session, applying only the days that changed.
+
+    Days are matched by date against the session's current data and fed to its
+    IncrementalWhoopProcessor; if days were dropped (or there is no session yet) the
+    processor is rebuilt from scratch. Returns the ``prepare_whoop_context`` triple
+    plus the processor state to keep in the session.
+    """
+    if not whoop_data:
+        return None, "", None, None
+    digest = hash_payload(whoop_data)
+    if session is not None and session.get('digest') == digest and session.get('processor_state'):
+        return session['processed'], session['context'], digest, session['processor_state']
+    
+    previous = None
+    if session is not None and session.get('processor_state'):
+        previous = {day.get('date'): day for day in session['whoop_data']}
+    current = {day.get('date'): day for day in whoop_data}
+    if previous is not None and previous.keys() <= current.keys():
+        processor = IncrementalWhoopProcessor.restore({**session['processor_state'], 'days': previous})
+        for date in sorted((date for date in current if current[date] != previous.get(date)), key=lambda d: d or ''):
+            processor.update_day(current[date])
+    else:
+        processor = IncrementalWhoopProcessor(whoop_data)
+    
+    processed = processor.get_processed_data()
+    processor_state = processor.snapshot()
+    del processor_state['days']
+    return processed, json.dumps(processed, indent=2), digest, processor_state
+
+def format_conversation_history(conversation_history, key=None):
+    """Format prior user/assistant messages for the prompt, excluding the current one.
+
+    ``key`` identifies the conversation for its rolling summary; stateless requests
+    have no stable identity, so their older messages are not summarized.
+    """
+    if not conversation_history:
+        return ""
+    return history_manager.format_history(key, conversation_history[:-1])
+
+def load_chat_turn(data):
+    """Resolve the Whoop context and history for a chat request.
+
+    Requests carrying a ``sessionId`` use the server-side session, updated with any
+    ``whoopData`` sent along; others fall back to the ``whoopData``/``conversationHistory``
+    sent with the request. Returns None for an unknown or expired session.
+    """
+    user_query = data.get('query')
+    session_id = data.get('sessionId')
+    if session_id:
+        # Fresh Whoop data sent alongside a session updates it day by day
+        whoop_data = data.get('whoopData')
+        if whoop_data:
+            session = session_store.update(session_id, lambda session: replace_whoop_data(
+                session, whoop_data, *prepare_session_whoop_context(whoop_data, session)
+            ))
+        else:
+            session = session_store.get(session_id)
+        if session is None:
+            return None
+        history = session['history'] + [{'type': 'user', 'text': user_query}]
+        return session_id, session['processed'], session['context'], session['digest'], history
+    
+    processed_whoop_data, whoop_context, whoop_digest = prepare_whoop_context(data.get('whoopData'))
+    history = data.get('conversationHistory', [])
+    return None, processed_whoop_data, whoop_context, whoop_digest, history
+
+def record_chat_turn(session_id, user_query, answer):
+    """Append a completed turn to its session, if the request used one.
+
+    The session is re-read under its lock, so a turn that finished meanwhile is kept.
+    """
+    if session_id:
+        def append_turn(session):
+            append_message(session, {'type': 'user', 'text': user_query})
+            append_message(session, {'type': 'ai', 'response': answer})
+        session_store.update(session_id, append_turn)
+
+def format_sse(event, data):
+    """Encode one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     try:
         data = request.json
         user_query = data.get('query')
-        whoop_data = data.get('whoopData')
-        conversation_history = data.get('conversationHistory', [])
         
-        # Process Whoop data if available
-        if whoop_data:
-            processor = WhoopDataProcessor(whoop_data)
-            processed_whoop_data = processor.get_processed_data()
-            whoop_context = json.dumps(processed_whoop_data, indent=2)
-        else:
-            processed_whoop_data = None
-            whoop_context = ""
+        # Process Whoop data if available (or reuse the session's)
+        turn = load_chat_turn(data)
+        if turn is None:
+            return jsonify({'error': 'Unknown or expired session'}), 404
+        session_id, processed_whoop_data, whoop_context, whoop_digest, conversation_history = turn
         
-        # Get combined context with Whoop data
-        combined_context = perform_combined_vector_searches(user_query, processed_whoop_data)
+        # Serve near-identical questions against the same Whoop data from the cache
+        cached_answer = None
+        if response_cache:
+            data_hash = whoop_digest or hash_whoop_data(processed_whoop_data)
+            if conversation_history[:-1]:
+                # Follow-up answers depend on the conversation so far; only reuse them for the same history
+                data_hash = hash_payload([data_hash, conversation_history[:-1]])
+            query_embedding = response_cache.embed(user_query)
+            cached_answer = response_cache.lookup(query_embedding, data_hash)
         
-        # Format conversation history
-        formatted_history = ""
-        if conversation_history:
-            formatted_history = "Previous conversation:\n"
-            for msg in conversation_history[:-1]:
-                if msg.get('type') == 'user':
-                    formatted_history += f"User: {msg.get('text', '')}\n"
-                elif msg.get('type') == 'ai':
-                    formatted_history += f"Assistant: {msg.get('response', '')}\n"
-            formatted_history += "\nCurrent question:\n"
+        if cached_answer is not None:
+            response = {'response': cached_answer, 'follow_up_questions': []}
+        else:
+            # Get combined context with Whoop data
+            combined_context = perform_combined_vector_searches(user_query, processed_whoop_data)
+            
+            # Format conversation history
+            formatted_history = format_conversation_history(conversation_history, session_id)
+            
+            # Combine contexts; the relevance scores and context stats go in the API response, not the prompt
+            full_context = f"{formatted_history}\n{combined_context['response']}\n\n{whoop_context}"
+            response = process_rag_response(user_query, full_context, include_follow_ups=False)
+            
+            if response_cache:
+                response_cache.store(query_embedding, data_hash, response['response'])
+            response['domain_relevance'] = combined_context['domain_relevance']
+            response['context_stats'] = combined_context.get('context_stats')
+        
+        record_chat_turn(session_id, user_query, response['response'])
         
-        # Combine contexts
-        full_context = f"{formatted_history}\n{combined_context}\n\n{whoop_context}"
-        response = process_rag_response(user_query, full_context)
+        # Follow-up questions are generated in the background and fetched separately
+        turn_id = follow_up_store.submit(response['response'])
+        response['turn_id'] = turn_id
+        response['follow_ups_url'] = f"/api/chat/{turn_id}/followups"
         
         return jsonify({'response': response})
     except Exception as e:
@@ -362,6 +587,137 @@ def chat():
         logging.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/chat/cache/stats', methods=['GET'])
+def get_response_cache_stats():
+    """Return hit/miss counters for the chat response and processed-data caches."""
+    processed_stats = processed_data_cache.stats()
+    if not response_cache:
+        return jsonify({'enabled': False, 'processed_data': processed_stats})
+    return jsonify({'enabled': True, **response_cache.stats(), 'processed_data': processed_stats})
+
+@app.route('/api/chat/session', methods=['POST'])
+def create_chat_session():
+    """Start a server-side chat session holding the Whoop data and history.
+
+    Later ``/api/chat`` requests send only ``sessionId`` and ``query``.
+    """
+    try:
+        data = request.json or {}
+        whoop_data = data.get('whoopData') or []
+        processed_whoop_data, whoop_context, whoop_digest, processor_state = prepare_session_whoop_context(whoop_data)
+        session = new_session(
+            whoop_data, processed_whoop_data, whoop_context, whoop_digest,
+            history=data.get('conversationHistory', []), processor_state=processor_state
+        )
+        return jsonify({'session_id': session_store.create(session)}), 201
+    except Exception as e:
+        logging.error(f"Error creating chat session: {str(e)}")
+        logging.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/chat/session/<session_id>', methods=['PUT'])
+def update_chat_session(session_id):
+    """Replace a session's Whoop data, keeping its conversation history.
+
+    Only days that are new or changed since the last update are reprocessed.
+    """
+    try:
+        whoop_data = (request.json or {}).get('whoopData') or []
+        session = session_store.update(session_id, lambda session: replace_whoop_data(
+            session, whoop_data, *prepare_session_whoop_context(whoop_data, session)
+        ))
+        if session is None:
+            return jsonify({'error': 'Unknown or expired session'}), 404
+        return jsonify({'session_id': session_id})
+    except Exception as e:
+        logging.error(f"Error updating chat session: {str(e)}")
+        logging.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/chat/session/<session_id>', methods=['DELETE'])
+def delete_chat_session(session_id):
+    history_manager.forget(session_id)
+    if not session_store.delete(session_id):
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    return '', 204
+
+@app.route('/api/chat/sessions/stats', methods=['GET'])
+def get_chat_session_stats():
+    return jsonify(session_store.stats())
+
+@app.route('/api/chat/<turn_id>/followups', methods=['GET'])
+def get_follow_ups(turn_id):
+    """Return follow-up questions for a chat turn; 202 while still generating.
+
+    The optional ``wait`` query parameter long-polls for up to 30 seconds.
+    """
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), 30)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    
+    status, questions = follow_up_store.get(turn_id, wait=wait)
+    if status == 'unknown':
+        return jsonify({'error': 'Unknown or expired turn id'}), 404
+    if status == 'pending':
+        return jsonify({'turn_id': turn_id, 'status': status}), 202
+    return jsonify({'turn_id': turn_id, 'status': status, 'follow_up_questions': questions})
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream a chat turn as server-sent events.
+
+    Emits ``status`` events while planning and retrieval run, ``token`` events as the
+    answer is generated, then ``follow_up_questions`` and a final ``done`` event.
+    """
+    data = request.json or {}
+    user_query = data.get('query')
+    if data.get('sessionId') and session_store.get(data['sessionId']) is None:
+        return jsonify({'error': 'Unknown or expired session'}), 404
+    
+    def generate():
+        try:
+            yield format_sse('status', {'stage': 'processing_whoop_data'})
+            turn = load_chat_turn(data)
+            if turn is None:
+                yield format_sse('error', {'error': 'Unknown or expired session'})
+                return
+            session_id, processed_whoop_data, whoop_context, _, conversation_history = turn
+            
+            combined_context = None
+            for event, payload in iter_combined_vector_searches(user_query, processed_whoop_data):
+                if event == 'result':
+                    combined_context = payload
+                else:
+                    yield format_sse('status', {'stage': event, **payload})
+            
+            # Relevance scores and context stats were already sent as status events
+            formatted_history = format_conversation_history(conversation_history, session_id)
+            full_context = f"{formatted_history}\n{combined_context['response']}\n\n{whoop_context}"
+            
+            yield format_sse('status', {'stage': 'generating'})
+            chunks = []
+            for token in stream_rag_response(user_query, full_context):
+                chunks.append(token)
+                yield format_sse('token', {'text': token})
+            
+            answer = ''.join(chunks)
+            record_chat_turn(session_id, user_query, answer)
+            
+            follow_up_questions = generate_follow_up_questions(answer)
+            yield format_sse('follow_up_questions', {'follow_up_questions': follow_up_questions})
+            yield format_sse('done', {})
+        except Exception as e:
+            logging.error(f"Error in chat stream endpoint: {str(e)}")
+            logging.error(traceback.format_exc())
+            yield format_sse('error', {'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 if __name__ == '__main__':
     debug_mode = os.getenv("FLASK_DEBUG", "false").lower() == "true"
     app.run(debug=debug_mode, port=5050)
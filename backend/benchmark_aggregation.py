@@ -0,0 +1,151 @@
+"""Benchmark for the vectorized calculate_daily_sleep.
+
+Times whoop_aggregation.calculate_daily_sleep against the previous row-by-row
+implementation on synthetic sleeps (naps, overlapping sleeps, sleeps crossing
+local midnight and records without a score). tests/test_whoop_aggregation.py
+checks that both produce the same summary:
+
+    python benchmark_aggregation.py
+    python benchmark_aggregation.py --days 730 --repeat 5
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from whoop_aggregation import SLEEP_SUMMARY_COLUMNS, calculate_daily_sleep
+
+
+def legacy_calculate_daily_sleep(sleep_df):
+    """The iterrows implementation calculate_daily_sleep replaced, kept as the reference."""
+    sleep_data = []
+    for date, group in sleep_df.groupby('date'):
+        sorted_sleeps = group.sort_values('start_time')
+        total_sleep = 0
+        last_end = None
+        sleep_metrics = {
+            'disturbance_count': 0,
+            'efficiency_percentage': 0,
+            'awake_time': 0,
+            'light_sleep_time': 0,
+            'slow_wave_sleep_time': 0,
+            'rem_sleep_time': 0,
+            'sleep_cycle_count': 0
+        }
+        for _, sleep in sorted_sleeps.iterrows():
+            start = sleep['start_time']
+            end = sleep['end_time']
+            if last_end is None or start > last_end:
+                total_sleep += (end - start).total_seconds() / 60
+            elif end > last_end:
+                total_sleep += (end - last_end).total_seconds() / 60
+            last_end = max(end, last_end) if last_end else end
+
+            sleep_metrics['disturbance_count'] += sleep.get('score.stage_summary.disturbance_count', 0)
+            sleep_metrics['efficiency_percentage'] = max(sleep_metrics['efficiency_percentage'], sleep.get('score.sleep_efficiency_percentage', 0))
+            sleep_metrics['awake_time'] += sleep.get('score.stage_summary.total_awake_time_milli', 0) / 60000
+            sleep_metrics['light_sleep_time'] += sleep.get('score.stage_summary.total_light_sleep_time_milli', 0) / 60000
+            sleep_metrics['slow_wave_sleep_time'] += sleep.get('score.stage_summary.total_slow_wave_sleep_time_milli', 0) / 60000
+            sleep_metrics['rem_sleep_time'] += sleep.get('score.stage_summary.total_rem_sleep_time_milli', 0) / 60000
+            sleep_metrics['sleep_cycle_count'] += sleep.get('score.stage_summary.sleep_cycle_count', 0)
+
+        previous_day = date - timedelta(days=1)
+        previous_sleeps = sleep_df[sleep_df['date'] == previous_day]
+        for _, sleep in previous_sleeps.iterrows():
+            if sleep['end_time'].date() == date:
+                sleep_in_this_day = (sleep['end_time'] - sleep['end_time'].replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds() / 60
+                total_sleep += sleep_in_this_day
+
+        sleep_data.append({
+            'date': date,
+            'sleep_duration': total_sleep,
+            **sleep_metrics
+        })
+    return pd.DataFrame(sleep_data, columns=SLEEP_SUMMARY_COLUMNS)
+
+
+def synthetic_sleeps(days: int, seed: int = 0, missing_score_rate: float = 0.05,
+                     timezone: str = 'America/New_York') -> pd.DataFrame:
+    """Sleep records shaped like the app's normalized Whoop sleep collection."""
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1, tzinfo=pytz.UTC)
+    records = []
+    for day in range(days):
+        # Mostly one sleep a day, sometimes a nap or an overlapping second record
+        for _ in range(rng.choice([1, 1, 1, 2, 3])):
+            start = base + timedelta(days=day, hours=rng.uniform(-3, 20))
+            end = start + timedelta(minutes=rng.uniform(20, 600))
+            record = {
+                'id': len(records),
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'score': {
+                    'sleep_efficiency_percentage': rng.uniform(60, 99),
+                    'stage_summary': {
+                        'disturbance_count': rng.randint(0, 20),
+                        'total_awake_time_milli': rng.randint(0, 3600000),
+                        'total_light_sleep_time_milli': rng.randint(0, 18000000),
+                        'total_slow_wave_sleep_time_milli': rng.randint(0, 7000000),
+                        'total_rem_sleep_time_milli': rng.randint(0, 7000000),
+                        'sleep_cycle_count': rng.randint(0, 6)
+                    }
+                }
+            }
+            if rng.random() < missing_score_rate:
+                del record['score']
+            records.append(record)
+
+    sleep_df = pd.json_normalize(records)
+    tz = pytz.timezone(timezone)
+    sleep_df['start_time'] = pd.to_datetime(sleep_df['start']).dt.tz_convert(tz)
+    sleep_df['end_time'] = pd.to_datetime(sleep_df['end']).dt.tz_convert(tz)
+    sleep_df['date'] = sleep_df['start_time'].dt.date
+    return sleep_df
+
+
+def compare(expected: pd.DataFrame, actual: pd.DataFrame) -> list:
+    """Return a description of every column that differs, empty if equivalent."""
+    if list(expected.columns) != list(actual.columns):
+        return [f"columns {list(expected.columns)} != {list(actual.columns)}"]
+    if list(expected['date']) != list(actual['date']):
+        return ["dates differ"]
+    mismatches = []
+    for column in SLEEP_SUMMARY_COLUMNS[1:]:
+        x = expected[column].astype(float).to_numpy()
+        y = actual[column].astype(float).to_numpy()
+        if not np.allclose(x, y, equal_nan=True, atol=1e-6):
+            mismatches.append(column)
+    return mismatches
+
+
+def best_of(fn, sleep_df: pd.DataFrame, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(sleep_df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="days of synthetic sleeps to benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sleep_df = synthetic_sleeps(args.days, seed=args.seed)
+    legacy = best_of(legacy_calculate_daily_sleep, sleep_df, args.repeat)
+    vectorized = best_of(calculate_daily_sleep, sleep_df, args.repeat)
+    print(f"{len(sleep_df)} sleeps over {args.days} days, best of {args.repeat}")
+    print(f"{'implementation':<16} {'ms':>9}")
+    print(f"{'row-by-row':<16} {legacy * 1000:>9.1f}")
+    print(f"{'vectorized':<16} {vectorized * 1000:>9.1f}   {legacy / vectorized:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Wall-clock time of the concurrent Whoop collection fetch against a mock client.
+
+Swaps WhoopClient for a mock whose collection calls sleep for a configurable
+latency, then compares fetching the four collections one after another with
+WhoopService.fetch_collections and the full get_last_7_days_summary. The
+concurrent fetch should take roughly as long as the slowest single call:
+
+    python benchmark_whoop_fetch.py
+    python benchmark_whoop_fetch.py --latency 0.2 0.8 0.4 0.6 --fail-once sleep
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import types
+from datetime import date, datetime, timedelta
+
+import pytz
+
+COLLECTIONS = ('recovery', 'sleep', 'cycle', 'workout')
+
+
+class MockWhoopClient:
+    """Stands in for whoop.WhoopClient; each collection call sleeps for its latency.
+
+    Collections listed in ``fail_once`` raise a ConnectionError on their first call
+    after each ``reset()``, to exercise the retry path.
+    """
+
+    def __init__(self, username=None, password=None):
+        self.latencies = {}
+        self.fail_once = set()
+        self.calls = 0
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self._failed = set()
+
+    def get_recovery_collection(self, start_date, end_date):
+        return self._collection('recovery', start_date, end_date)
+
+    def get_sleep_collection(self, start_date, end_date):
+        return self._collection('sleep', start_date, end_date)
+
+    def get_cycle_collection(self, start_date, end_date):
+        return self._collection('cycle', start_date, end_date)
+
+    def get_workout_collection(self, start_date, end_date):
+        return self._collection('workout', start_date, end_date)
+
+    def _collection(self, collection, start_date, end_date):
+        time.sleep(self.latencies.get(collection, 0))
+        with self._lock:
+            self.calls += 1
+            if collection in self.fail_once and collection not in self._failed:
+                self._failed.add(collection)
+                raise ConnectionError(f"mock {collection} request failed")
+        return synthetic_records(collection, start_date, end_date)
+
+
+def synthetic_records(collection, start_date, end_date):
+    """One record per day in ``[start_date, end_date)``, shaped like the Whoop API."""
+    start = datetime.fromisoformat(start_date).replace(tzinfo=pytz.UTC)
+    end = datetime.fromisoformat(end_date).replace(tzinfo=pytz.UTC)
+    rng = random.Random(f"{collection}{start_date}")
+    records = []
+    day = start
+    while day < end:
+        began = day + timedelta(hours=rng.uniform(2, 20))
+        ended = began + timedelta(hours=rng.uniform(0.5, 8))
+        record = {
+            'id': f"{collection}-{day.date()}",
+            'start': began.isoformat(),
+            'end': ended.isoformat(),
+            'created_at': began.isoformat()
+        }
+        if collection == 'recovery':
+            record['score'] = {'recovery_score': rng.uniform(1, 99)}
+        elif collection == 'cycle':
+            record['score'] = {'strain': rng.uniform(1, 20)}
+        elif collection == 'sleep':
+            record['score'] = {
+                'sleep_efficiency_percentage': rng.uniform(70, 99),
+                'stage_summary': {
+                    'disturbance_count': rng.randint(0, 15),
+                    'total_awake_time_milli': rng.randint(0, 3600000),
+                    'total_light_sleep_time_milli': rng.randint(0, 14400000),
+                    'total_slow_wave_sleep_time_milli': rng.randint(0, 7200000),
+                    'total_rem_sleep_time_milli': rng.randint(0, 7200000),
+                    'sleep_cycle_count': rng.randint(1, 6)
+                }
+            }
+        else:
+            record['sport_id'] = rng.choice([0, 1, 45, 44])
+            record['score'] = {'strain': rng.uniform(1, 18), 'average_heart_rate': rng.randint(100, 150),
+                               'max_heart_rate': rng.randint(150, 195)}
+        records.append(record)
+        day += timedelta(days=1)
+    return records
+
+
+def load_service():
+    """Import the app with MockWhoopClient in place of the real client."""
+    sys.modules['whoop'] = types.SimpleNamespace(WhoopClient=MockWhoopClient)
+    os.environ.setdefault('WHOOP_USERNAME', 'benchmark')
+    os.environ.setdefault('WHOOP_PASSWORD', 'benchmark')
+    # Measure the API path, not the local record store
+    os.environ['WHOOP_STORE'] = 'false'
+    import app
+    return app.whoop_service
+
+
+def median_time(fn, repeat, client):
+    timings = []
+    for _ in range(repeat):
+        client.reset()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, nargs=4, default=[0.3, 0.5, 0.2, 0.4],
+                        metavar=("RECOVERY", "SLEEP", "CYCLE", "WORKOUT"), help="seconds per collection call")
+    parser.add_argument("--fail-once", nargs="*", default=[], choices=COLLECTIONS,
+                        help="collections whose first call fails and is retried")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    service = load_service()
+    client = service.client
+    client.latencies = dict(zip(COLLECTIONS, args.latency))
+    client.fail_once = set(args.fail_once)
+    start_date = date.today() - timedelta(days=7)
+    end_date = date.today()
+
+    def sequential():
+        for collection in COLLECTIONS:
+            try:
+                service.get_collection(collection, start_date, end_date)
+            except ConnectionError:
+                service.get_collection(collection, start_date, end_date)
+
+    slowest = max(args.latency)
+    rows = [
+        ("sequential", median_time(sequential, args.repeat, client)),
+        ("concurrent", median_time(lambda: service.fetch_collections(start_date, end_date), args.repeat, client)),
+        ("7-day summary", median_time(lambda: service.get_last_7_days_summary(start_date), args.repeat, client))
+    ]
+    print(f"latency per call: {dict(client.latencies)}, slowest {slowest:.2f}s, sum {sum(args.latency):.2f}s")
+    if args.fail_once:
+        print(f"first call fails for {args.fail_once}, retried after {service.fetch_backoff}s backoff")
+    print(f"{'fetch':<14} {'median s':>9} {'x slowest':>10}")
+    for name, seconds in rows:
+        print(f"{name:<14} {seconds:>9.3f} {seconds / slowest:>10.2f}")
+
+    # Without injected failures the concurrent fetch should cost about one slowest call
+    if not args.fail_once and rows[1][1] > slowest * 1.5:
+        print("Concurrent fetch took well over the slowest single call")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+import tiktoken
+
+
+def message_line(message: Dict[str, Any]) -> Optional[str]:
+    """Render one stored user/assistant message as a prompt line."""
+    if message.get('type') == 'user':
+        return f"User: {message.get('text', '')}"
+    if message.get('type') == 'ai':
+        response = message.get('response', '')
+        if isinstance(response, dict):
+            response = response.get('response', '')
+        return f"Assistant: {response}"
+    return None
+
+
+class ConversationHistoryManager:
+    """Keeps the prompt's conversation history under a token budget.
+
+    The last ``keep_turns`` user/assistant exchanges are kept verbatim. Older
+    messages are folded into a rolling summary per conversation key, which is
+    regenerated on a background worker; until it catches up, the not yet
+    summarized messages are included verbatim as far as the budget allows.
+    Conversations without a stable key are never summarized.
+    """
+
+    HEADER = "Previous conversation:\n"
+    FOOTER = "\nCurrent question:\n"
+
+    def __init__(self, summarize_fn: Callable[[str, str], str], token_budget: int = 1500,
+                 keep_turns: int = 3, max_workers: int = 1, max_entries: int = 1000,
+                 encoding: str = "cl100k_base"):
+        self.summarize_fn = summarize_fn
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.max_entries = max_entries
+        self._encoding = tiktoken.get_encoding(encoding)
+        self._count = lru_cache(maxsize=4096)(lambda text: len(self._encoding.encode(text)))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="history-summary")
+        # key -> (summary text, number of older lines it covers, digest of those lines)
+        self._summaries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def count_tokens(self, text: str) -> int:
+        return self._count(text)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most ``max_tokens`` tokens."""
+        if max_tokens <= 0:
+            return ""
+        tokens = self._encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return self._encoding.decode(tokens[:max_tokens])
+
+    def format_history(self, key: Optional[str], messages: List[Dict[str, Any]]) -> str:
+        """Format prior messages (excluding the current question) within the token budget.
+
+        Without a ``key`` older messages are only included verbatim as the budget allows.
+        """
+        lines = [line for line in map(message_line, messages) if line is not None]
+        if not lines:
+            return ""
+
+        keep = self.keep_turns * 2
+        older, recent = (lines[:-keep], lines[-keep:]) if keep else (lines, [])
+        summary, covered = "", 0
+        if key is not None:
+            summary, covered = self._current_summary(key, older)
+            if covered < len(older):
+                self._schedule_summary(key, summary, older[covered:], older)
+
+        budget = self.token_budget - self.count_tokens(self.HEADER + self.FOOTER)
+
+        # Recent turns take priority, newest first; the latest message is always kept
+        kept_recent = []
+        for line in reversed(recent):
+            tokens = self.count_tokens(line) + 1
+            if tokens > budget:
+                if not kept_recent:
+                    kept_recent.append(self.truncate(line, budget - 1))
+                    budget = 0
+                break
+            kept_recent.append(line)
+            budget -= tokens
+        kept_recent.reverse()
+
+        summary_line = ""
+        if summary and budget > 0:
+            summary_line = self.truncate(f"Summary of earlier conversation: {summary}", budget - 1)
+            budget -= self.count_tokens(summary_line) + 1
+
+        # Messages the summary does not cover yet fill whatever budget is left
+        kept_older = []
+        for line in reversed(older[covered:]):
+            tokens = self.count_tokens(line) + 1
+            if tokens > budget:
+                break
+            kept_older.append(line)
+            budget -= tokens
+        kept_older.reverse()
+
+        body = [summary_line] if summary_line else []
+        body += kept_older + kept_recent
+        return self.HEADER + "".join(f"{line}\n" for line in body) + self.FOOTER
+
+    def forget(self, key: str):
+        """Drop the rolling summary for a conversation."""
+        with self._lock:
+            self._summaries.pop(key, None)
+
+    @staticmethod
+    def _digest(lines: List[str]) -> str:
+        return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+    def _current_summary(self, key: str, older: List[str]):
+        with self._lock:
+            entry = self._summaries.get(key)
+            if entry is None:
+                return "", 0
+            self._summaries.move_to_end(key)
+            summary, covered, digest = entry
+        # The conversation was reset or rewritten: start over
+        if covered > len(older) or self._digest(older[:covered]) != digest:
+            with self._lock:
+                if self._summaries.get(key) is entry:
+                    del self._summaries[key]
+            return "", 0
+        return summary, covered
+
+    def _schedule_summary(self, key: str, summary: str, new_lines: List[str], older: List[str]):
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending[key] = self._executor.submit(
+                self._summarize, key, summary, new_lines, len(older), self._digest(older))
+
+    def _summarize(self, key: str, summary: str, new_lines: List[str], covered: int, digest: str):
+        try:
+            updated = self.summarize_fn(summary, "\n".join(new_lines))
+            with self._lock:
+                self._summaries[key] = (updated, covered, digest)
+                self._summaries.move_to_end(key)
+                while len(self._summaries) > self.max_entries:
+                    self._summaries.popitem(last=False)
+        except Exception as e:
+            print(f"Error summarizing conversation history: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
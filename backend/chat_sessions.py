@@ -0,0 +1,241 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+
+def new_session(whoop_data: List[Dict[str, Any]], processed: Optional[Dict[str, Any]], context: str,
+                digest: Optional[str], history: List[Dict[str, Any]] = None,
+                processor_state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build a session holding the Whoop data, its processed form and the chat history.
+
+    ``processor_state`` is the IncrementalWhoopProcessor snapshot (without its days,
+    which are the session's ``whoop_data``) used to apply later updates day by day.
+    """
+    session = {"history": [], "history_size": 0}
+    replace_whoop_data(session, whoop_data, processed, context, digest, processor_state)
+    for message in history or []:
+        append_message(session, message)
+    return session
+
+
+def replace_whoop_data(session: Dict[str, Any], whoop_data: List[Dict[str, Any]],
+                       processed: Optional[Dict[str, Any]], context: str, digest: Optional[str],
+                       processor_state: Optional[Dict[str, Any]] = None):
+    """Swap the session's Whoop data (e.g. after a week change), keeping the history."""
+    session.update(whoop_data=whoop_data, processed=processed, context=context, digest=digest,
+                   processor_state=processor_state)
+    session["data_size"] = (len(json.dumps(whoop_data, separators=(',', ':'))) + len(context)
+                            + len(json.dumps(processor_state, separators=(',', ':'))))
+
+
+def append_message(session: Dict[str, Any], message: Dict[str, Any]):
+    """Append a user or assistant message, storing assistant replies as plain text."""
+    if message.get('type') == 'user':
+        stored = {'type': 'user', 'text': message.get('text', '')}
+    elif message.get('type') == 'ai':
+        response = message.get('response', '')
+        if isinstance(response, dict):
+            response = response.get('response', '')
+        stored = {'type': 'ai', 'response': response}
+    else:
+        return
+    session["history"].append(stored)
+    session["history_size"] += len(stored.get('text') or stored.get('response') or '')
+
+
+def session_size(session: Dict[str, Any]) -> int:
+    """Approximate memory footprint of a session in bytes."""
+    return session["data_size"] + session["history_size"]
+
+
+class SessionLocks:
+    """One lock per session id, dropped once no thread holds or waits for it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # session_id -> [lock, threads holding or waiting]
+        self._locks = {}
+
+    @contextmanager
+    def hold(self, session_id: str):
+        with self._lock:
+            entry = self._locks.setdefault(session_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[session_id]
+
+
+class SessionStore:
+    """Shared create/update on top of a store's get and save."""
+
+    def __init__(self):
+        self._session_locks = SessionLocks()
+
+    def create(self, session: Dict[str, Any]) -> str:
+        session_id = uuid.uuid4().hex
+        self.save(session_id, session)
+        return session_id
+
+    def update(self, session_id: str, mutate: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+        """Load, ``mutate`` and save a session under its lock, so concurrent turns don't drop each
+        other's changes. Returns the updated session, or None for an unknown or expired one."""
+        with self._session_locks.hold(session_id):
+            session = self.get(session_id)
+            if session is None:
+                return None
+            mutate(session)
+            self.save(session_id, session)
+            return session
+
+
+class InMemorySessionStore(SessionStore):
+    """Chat sessions in process memory with idle eviction and a total size cap."""
+
+    def __init__(self, idle_seconds: float = 1800, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__()
+        self.idle_seconds = idle_seconds
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        # session_id -> (session, last_access), least recently used first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._evict()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def save(self, session_id: str, session: Dict[str, Any]):
+        with self._lock:
+            self._sessions[session_id] = (session, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            self._evict(keep=session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict(self, keep: str = None):
+        """Drop idle sessions, then least recently used ones beyond the size cap."""
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if last_access >= cutoff:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+        total = sum(session_size(session) for session, _ in self._sessions.values())
+        for session_id in list(self._sessions):
+            if total <= self.max_bytes:
+                break
+            if session_id == keep:
+                continue
+            total -= session_size(self._sessions.pop(session_id)[0])
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "bytes": sum(session_size(session) for session, _ in self._sessions.values()),
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Chat sessions persisted in SQLite with idle eviction and a total size cap."""
+
+    def __init__(self, path: str, idle_seconds: float = 1800, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__()
+        self.idle_seconds = idle_seconds
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS chat_sessions (
+                    id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.commit()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._evict()
+            row = self._conn.execute("SELECT data FROM chat_sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE chat_sessions SET last_access = ? WHERE id = ?", (time.time(), session_id))
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def save(self, session_id: str, session: Dict[str, Any]):
+        data = json.dumps(session, separators=(',', ':'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (id, data, size, last_access) VALUES (?, ?, ?, ?)",
+                (session_id, data, len(data), time.time())
+            )
+            self._evict(keep=session_id)
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def _evict(self, keep: str = None):
+        """Drop idle sessions, then least recently used ones beyond the size cap."""
+        cursor = self._conn.execute(
+            "DELETE FROM chat_sessions WHERE last_access < ?", (time.time() - self.idle_seconds,)
+        )
+        self.evictions += cursor.rowcount
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM chat_sessions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT id, size FROM chat_sessions WHERE id != ? ORDER BY last_access", (keep or '',)
+        ).fetchall()
+        for session_id, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+            total -= size
+            self.evictions += 1
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM chat_sessions"
+            ).fetchone()
+            return {
+                "sessions": count,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,125 @@
+import hashlib
+from typing import Callable, Dict, List, Tuple
+
+
+def normalize_chunk(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def shingles(text: str, size: int = 3) -> frozenset:
+    """Word n-grams of a normalized chunk, used for near-duplicate detection."""
+    words = text.split()
+    if len(words) <= size:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextAssembler:
+    """Packs retrieved chunks from several domains into a single token budget.
+
+    Chunks are scored by domain relevance and retrieval rank. Identical and
+    near-identical chunks (word-shingle Jaccard similarity at or above
+    ``near_duplicate_threshold``) are dropped across domains, keeping the
+    highest-scoring copy. Each domain gets a share of ``token_budget`` in
+    proportion to its relevance; budget a domain leaves unused goes to the
+    highest-scoring remaining chunks of any domain.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], token_budget: int = 6000,
+                 near_duplicate_threshold: float = 0.9):
+        self.count_tokens = count_tokens
+        self.token_budget = token_budget
+        self.near_duplicate_threshold = near_duplicate_threshold
+
+    def assemble(self, results: Dict[str, List[str]],
+                 relevance: Dict[str, float]) -> Tuple[Dict[str, List[str]], Dict]:
+        """Return ``(selected chunks per domain in rank order, stats)``."""
+        chunks = []
+        for domain, texts in results.items():
+            weight = max(relevance.get(domain, 0.0), 0.0)
+            for rank, text in enumerate(texts):
+                if not isinstance(text, str) or not text.strip():
+                    continue
+                chunks.append({
+                    "domain": domain,
+                    "rank": rank,
+                    "text": text,
+                    "score": weight / (1 + rank),
+                    "tokens": self.count_tokens(text)
+                })
+        chunks.sort(key=lambda chunk: -chunk["score"])
+
+        unique, duplicate_tokens = self._deduplicate(chunks)
+        budgets = self._domain_budgets(unique, relevance)
+
+        # Fill each domain's share first, then hand out what is left by score
+        remaining = dict(budgets)
+        kept = []
+        leftover = []
+        for chunk in unique:
+            if chunk["tokens"] <= remaining[chunk["domain"]]:
+                remaining[chunk["domain"]] -= chunk["tokens"]
+                kept.append(chunk)
+            else:
+                leftover.append(chunk)
+        pool = self.token_budget - sum(chunk["tokens"] for chunk in kept)
+        for chunk in leftover:
+            if chunk["tokens"] <= pool:
+                pool -= chunk["tokens"]
+                kept.append(chunk)
+
+        selected = {domain: [] for domain in results}
+        for chunk in sorted(kept, key=lambda chunk: (chunk["domain"], chunk["rank"])):
+            selected[chunk["domain"]].append(chunk["text"])
+
+        input_tokens = sum(chunk["tokens"] for chunk in chunks)
+        used_tokens = sum(chunk["tokens"] for chunk in kept)
+        stats = {
+            "token_budget": self.token_budget,
+            "domain_budgets": budgets,
+            "input_chunks": len(chunks),
+            "kept_chunks": {domain: len(texts) for domain, texts in selected.items()},
+            "duplicate_chunks": len(chunks) - len(unique),
+            "input_tokens": input_tokens,
+            "used_tokens": used_tokens,
+            "dropped_tokens": input_tokens - used_tokens,
+            "duplicate_tokens": duplicate_tokens,
+            "over_budget_tokens": input_tokens - used_tokens - duplicate_tokens
+        }
+        return selected, stats
+
+    def _deduplicate(self, chunks: List[Dict]) -> Tuple[List[Dict], int]:
+        """Drop exact and near duplicates of higher-scoring chunks; chunks arrive sorted by score."""
+        seen_hashes = set()
+        kept_shingles = []
+        unique = []
+        duplicate_tokens = 0
+        for chunk in chunks:
+            normalized = normalize_chunk(chunk["text"])
+            digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+            chunk_shingles = shingles(normalized)
+            if digest in seen_hashes or any(
+                jaccard(chunk_shingles, other) >= self.near_duplicate_threshold for other in kept_shingles
+            ):
+                duplicate_tokens += chunk["tokens"]
+                continue
+            seen_hashes.add(digest)
+            kept_shingles.append(chunk_shingles)
+            unique.append(chunk)
+        return unique, duplicate_tokens
+
+    def _domain_budgets(self, chunks: List[Dict], relevance: Dict[str, float]) -> Dict[str, int]:
+        """Split the token budget across domains with results, in proportion to relevance."""
+        domains = sorted({chunk["domain"] for chunk in chunks})
+        weights = {domain: max(relevance.get(domain, 0.0), 0.0) for domain in domains}
+        total = sum(weights.values())
+        if total <= 0:
+            weights = {domain: 1.0 for domain in domains}
+            total = float(len(domains))
+        return {domain: int(self.token_budget * weights[domain] / total) for domain in domains}
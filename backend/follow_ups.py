@@ -0,0 +1,63 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, List, Optional, Tuple
+
+
+class FollowUpStore:
+    """Generates follow-up questions on a worker pool, keyed by chat turn id.
+
+    The chat endpoint submits the finished answer and returns the turn id right
+    away; clients fetch the questions later. Finished entries expire after
+    ``ttl_seconds`` and the oldest are dropped beyond ``max_entries``.
+    """
+
+    def __init__(self, generate_fn: Callable[[str], List[str]], max_workers: int = 2,
+                 ttl_seconds: float = 900, max_entries: int = 1000):
+        self.generate_fn = generate_fn
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="follow-ups")
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, response_text: str) -> str:
+        """Queue follow-up generation for a response and return its turn id."""
+        turn_id = uuid.uuid4().hex
+        future = self._executor.submit(self.generate_fn, response_text)
+        with self._lock:
+            self._evict()
+            self._entries[turn_id] = (time.monotonic(), future)
+        return turn_id
+
+    def get(self, turn_id: str, wait: float = 0) -> Tuple[str, Optional[List[str]]]:
+        """Return ``(status, questions)`` where status is ready, pending or unknown.
+
+        ``wait`` blocks up to that many seconds for a pending entry to finish.
+        """
+        with self._lock:
+            entry = self._entries.get(turn_id)
+        if entry is None:
+            return "unknown", None
+
+        _, future = entry
+        try:
+            return "ready", future.result(timeout=wait)
+        except FutureTimeoutError:
+            return "pending", None
+        except Exception as e:
+            print(f"Error generating follow-up questions for turn {turn_id}: {e}")
+            return "ready", []
+
+    def _evict(self):
+        """Drop expired entries and trim to max_entries. Caller holds the lock."""
+        now = time.monotonic()
+        while self._entries:
+            turn_id, (created, future) = next(iter(self._entries.items()))
+            expired = now - created > self.ttl_seconds and future.done()
+            if not expired and len(self._entries) < self.max_entries:
+                break
+            future.cancel()
+            del self._entries[turn_id]
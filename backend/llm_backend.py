@@ -1,14 +1,19 @@
 import os
 import sys
+import time
 import requests
-from typing import List
-from pydantic import BaseModel
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List
+from pydantic import BaseModel, ValidationError
 import json
+import tiktoken
 
 from langchain_community.chat_models import ChatOllama
+from langchain_community.embeddings import OllamaEmbeddings
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
+from context_assembly import ContextAssembler
 
 # Load environment variables from .env file
 load_dotenv()
@@ -17,6 +22,16 @@ load_dotenv()
 class SearchQuery(BaseModel):
     search_query: str
 
+# Define query planner schema
+class DomainPlan(BaseModel):
+    relevance: float = 0.5
+    search_query: str = ""
+
+class QueryPlan(BaseModel):
+    nutrition: DomainPlan = DomainPlan()
+    strength: DomainPlan = DomainPlan()
+    mindset: DomainPlan = DomainPlan()
+
 # Define search instructions
 search_instructions = """
 You are an assistant that extracts search queries from conversation messages.
@@ -34,6 +49,13 @@ base_url1 = os.getenv("OLLAMA_BASE_URL_A6000")
 base_url2 = os.getenv("OLLAMA_BASE_URL_4090")
 # Initialize the language model
 model_local = ChatOllama(model="mistral-nemo:latest", base_url=base_url2)
+# Same model constrained to JSON output for the query planner
+planner_model = ChatOllama(model="mistral-nemo:latest", base_url=base_url2, format="json")
+# Embedding model used to match near-identical queries in the response cache
+query_embeddings = OllamaEmbeddings(
+    model=os.getenv("QUERY_EMBED_MODEL", "nomic-embed-text"),
+    base_url=base_url2
+)
 
 # Initialize LangChain components
 print("Welcome!")
@@ -43,9 +65,97 @@ NUTRITION_DB_URL = os.getenv("NUTRITION_DB_URL")
 STRENGTH_DB_URL = os.getenv("STRENGTH_DB_URL")
 MINDSET_DB_URL = os.getenv("MINDSET_DB_URL")
 
+# Unified multi-domain retriever; leave unset to use the per-domain services above
+RETRIEVER_URL = os.getenv("RETRIEVER_URL", "")
+DOMAIN_DB_URLS = {
+    "nutrition": NUTRITION_DB_URL,
+    "strength": STRENGTH_DB_URL,
+    "mindset": MINDSET_DB_URL
+}
+
+# Concurrent retrieval settings
+RETRIEVAL_CONCURRENT = os.getenv("RETRIEVAL_CONCURRENT", "true").lower() == "true"
+RETRIEVAL_MAX_WORKERS = int(os.getenv("RETRIEVAL_MAX_WORKERS", "6"))
+RETRIEVAL_BRANCH_TIMEOUT = float(os.getenv("RETRIEVAL_BRANCH_TIMEOUT", "30"))
+
+# Use the single-call query planner instead of relevance analysis plus per-domain rewrites
+QUERY_PLANNER = os.getenv("QUERY_PLANNER", "true").lower() == "true"
+
+# Retrieved chunks are deduplicated and packed into a token budget before merging
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.9"))
+
+tokenizer = tiktoken.get_encoding("cl100k_base")
+context_assembler = ContextAssembler(
+    lambda text: len(tokenizer.encode(text)),
+    token_budget=CONTEXT_TOKEN_BUDGET,
+    near_duplicate_threshold=CONTEXT_DEDUP_THRESHOLD
+)
+
+# Shared bounded pool so concurrent chat requests cannot spawn unbounded threads
+retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_MAX_WORKERS, thread_name_prefix="retrieval")
+
+def embed_query(query: str) -> List[float]:
+    """Embed a user query with the local embedding model."""
+    return query_embeddings.embed_query(query)
+
 # Define the vector search functions
-def search_nutrition_vector(query: str) -> List[str]:
-    """Perform a local vector search using the nutrition embeddings API."""
+def search_domain(domain: str, search_query: str, timeout: float = 10) -> List[str]:
+    """Query one per-domain embedding service."""
+    try:
+        response = requests.post(
+            DOMAIN_DB_URLS[domain], json={"query_text": search_query},
+            headers={"Content-Type": "application/json"}, timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as e:
+        print(f"Error querying {domain} vector search: {e}")
+        return []
+
+def search_domains(queries: Dict[str, str], timeout: float = None) -> Dict[str, List[str]]:
+    """Search several domains at once, mapping each domain to its search string.
+
+    With RETRIEVER_URL set this is a single request, in which the retriever embeds
+    identical texts once and searches the collections concurrently, reporting failed
+    domains individually. Otherwise the per-domain services are queried in parallel
+    on the retrieval pool. A domain not answered within ``timeout`` seconds comes
+    back empty.
+    """
+    if not queries:
+        return {}
+    headers = {"Content-Type": "application/json"}
+    request_timeout = min(10, timeout) if timeout is not None else 10
+    
+    if not RETRIEVER_URL:
+        if len(queries) == 1:
+            domain, search_query = next(iter(queries.items()))
+            return {domain: search_domain(domain, search_query, request_timeout)}
+        futures = {
+            domain: retrieval_executor.submit(search_domain, domain, search_query, request_timeout)
+            for domain, search_query in queries.items()
+        }
+        results = {domain: [] for domain in queries}
+        results.update(collect_branches(futures, timeout))
+        return results
+    
+    try:
+        payload = {"domains": list(queries), "queries": queries}
+        response = requests.post(RETRIEVER_URL, json=payload, headers=headers, timeout=request_timeout)
+        response.raise_for_status()
+        body = response.json()
+    except requests.RequestException as e:
+        print(f"Error querying vector search: {e}")
+        return {domain: [] for domain in queries}
+    
+    # Failed domains come back empty; the others are used as usual
+    for domain, error in body.get("errors", {}).items():
+        print(f"Error querying {domain} vector search: {error}")
+    results = body.get("results", {})
+    return {domain: results.get(domain, []) for domain in queries}
+
+def rewrite_nutrition_query(query: str) -> str:
+    """Rewrite a user query into a nutrition-focused search string."""
     # Add nutrition-specific prompt template
     nutrition_prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a nutrition expert. Extract a search query focused on nutrition, diet, 
@@ -61,23 +171,18 @@ def search_nutrition_vector(query: str) -> List[str]:
     # Create query chain
     nutrition_query_chain = nutrition_prompt | model_local | StrOutputParser()
     
-    try:
-        # Generate specialized nutrition query
-        search_query = nutrition_query_chain.invoke({"input": query}).strip()
-        print(f"Nutrition search query: {search_query}")
-        
-        headers = {"Content-Type": "application/json"}
-        payload = {"query_text": search_query}
-        
-        response = requests.post(NUTRITION_DB_URL, json=payload, headers=headers, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        print(f"Error querying nutrition vector search: {e}")
-        return []
+    return nutrition_query_chain.invoke({"input": query}).strip()
 
-def search_strength_vector(query: str) -> List[str]:
-    """Perform a local vector search using the strength training embeddings API."""
+def search_nutrition_vector(query: str, rewrite: bool = True) -> List[str]:
+    """Perform a local vector search using the nutrition embeddings API."""
+    # Generate specialized nutrition query unless the planner already produced one
+    search_query = rewrite_nutrition_query(query) if rewrite else query
+    print(f"Nutrition search query: {search_query}")
+    
+    return search_domains({"nutrition": search_query})["nutrition"]
+
+def rewrite_strength_query(query: str) -> str:
+    """Rewrite a user query into a strength-focused search string."""
     # Add strength-specific prompt template
     strength_prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a strength and conditioning expert. Extract a search query focused on:
@@ -92,23 +197,18 @@ def search_strength_vector(query: str) -> List[str]:
     # Create query chain
     strength_query_chain = strength_prompt | model_local | StrOutputParser()
     
-    try:
-        # Generate specialized strength query
-        search_query = strength_query_chain.invoke({"input": query}).strip()
-        print(f"Strength search query: {search_query}")
-        
-        headers = {"Content-Type": "application/json"}
-        payload = {"query_text": search_query}
-        
-        response = requests.post(STRENGTH_DB_URL, json=payload, headers=headers, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        print(f"Error querying strength training vector search: {e}")
-        return []
+    return strength_query_chain.invoke({"input": query}).strip()
 
-def search_mindset_vector(query: str) -> List[str]:
-    """Perform a local vector search using the mindset and psychology embeddings API."""
+def search_strength_vector(query: str, rewrite: bool = True) -> List[str]:
+    """Perform a local vector search using the strength training embeddings API."""
+    # Generate specialized strength query unless the planner already produced one
+    search_query = rewrite_strength_query(query) if rewrite else query
+    print(f"Strength search query: {search_query}")
+    
+    return search_domains({"strength": search_query})["strength"]
+
+def rewrite_mindset_query(query: str) -> str:
+    """Rewrite a user query into a mindset-focused search string."""
     # Add mindset-specific prompt template
     mindset_prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a sports psychology and mindset expert. Extract a search query focused on:
@@ -123,20 +223,108 @@ def search_mindset_vector(query: str) -> List[str]:
     # Create query chain
     mindset_query_chain = mindset_prompt | model_local | StrOutputParser()
     
-    try:
-        # Generate specialized mindset query
-        search_query = mindset_query_chain.invoke({"input": query}).strip()
-        print(f"Mindset search query: {search_query}")
-        
-        headers = {"Content-Type": "application/json"}
-        payload = {"query_text": search_query}
-        
-        response = requests.post(MINDSET_DB_URL, json=payload, headers=headers, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        print(f"Error querying mindset vector search: {e}")
-        return []
+    return mindset_query_chain.invoke({"input": query}).strip()
+
+def search_mindset_vector(query: str, rewrite: bool = True) -> List[str]:
+    """Perform a local vector search using the mindset and psychology embeddings API."""
+    # Generate specialized mindset query unless the planner already produced one
+    search_query = rewrite_mindset_query(query) if rewrite else query
+    print(f"Mindset search query: {search_query}")
+    
+    return search_domains({"mindset": search_query})["mindset"]
+
+DOMAIN_QUERY_REWRITERS = {
+    "nutrition": rewrite_nutrition_query,
+    "strength": rewrite_strength_query,
+    "mindset": rewrite_mindset_query
+}
+
+def build_domain_query(domain: str, query: str, whoop_data: dict = None,
+                       planned_query: str = None) -> str:
+    """Produce one branch's search string: specialize the query, then rewrite it.
+
+    A ``planned_query`` from the query planner is used as-is, skipping both rewrites.
+    """
+    if planned_query:
+        return planned_query
+    specialized_query = generate_specialized_query(domain, query, whoop_data)
+    return DOMAIN_QUERY_REWRITERS[domain](specialized_query)
+
+def run_domain_search(domain: str, query: str, whoop_data: dict = None,
+                      planned_query: str = None, deadline: float = None) -> List[str]:
+    """Run one retrieval branch against its per-domain service: build its search string, then search.
+
+    Runs on the retrieval pool, so it queries the service directly rather than
+    submitting more work to the pool. The HTTP call is bounded by the time left
+    until ``deadline`` (a ``time.monotonic()`` value), so abandoned branches free
+    their worker soon after the caller gives up on them.
+    """
+    search_query = build_domain_query(domain, query, whoop_data, planned_query)
+    timeout = 10
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            return []
+    return search_domain(domain, search_query, timeout)
+
+def collect_branches(futures: dict, timeout: float = None) -> dict:
+    """Wait for per-domain futures under one shared deadline of ``timeout`` seconds.
+
+    Branches that miss the deadline or raise are logged and left out of the result
+    instead of failing the turn.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    results = {}
+    for domain, future in futures.items():
+        try:
+            remaining = max(0, deadline - time.monotonic()) if deadline is not None else None
+            results[domain] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            # A running thread cannot be cancelled; its late result is dropped
+            future.cancel()
+            print(f"{domain.capitalize()} search timed out after {timeout}s")
+        except Exception as e:
+            print(f"Error in {domain} search branch: {e}")
+    return results
+
+def run_domain_searches_concurrently(query: str, whoop_data: dict, domains: List[str],
+                                     timeout: float = None, planned_queries: dict = None) -> dict:
+    """Run the relevant domain branches on the retrieval pool under one shared deadline.
+
+    Each branch covers the query rewrite and the search. Without RETRIEVER_URL every
+    branch is one future (rewrite plus per-domain search); with it the rewrites run
+    as futures and the unified search gets whatever time remains. A branch that
+    misses the ``timeout`` deadline or raises comes back empty instead of failing the turn.
+    """
+    if timeout is None:
+        timeout = RETRIEVAL_BRANCH_TIMEOUT
+    deadline = time.monotonic() + timeout
+    planned_queries = planned_queries or {}
+    results = {domain: [] for domain in domains}
+    
+    if not RETRIEVER_URL:
+        futures = {
+            domain: retrieval_executor.submit(
+                run_domain_search, domain, query, whoop_data, planned_queries.get(domain), deadline
+            )
+            for domain in domains
+        }
+        results.update(collect_branches(futures, timeout))
+        return results
+    
+    queries = {domain: planned_queries[domain] for domain in domains if planned_queries.get(domain)}
+    futures = {
+        domain: retrieval_executor.submit(build_domain_query, domain, query, whoop_data)
+        for domain in domains if domain not in queries
+    }
+    queries.update(collect_branches(futures, timeout))
+    
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        print(f"Vector search skipped: retrieval deadline of {timeout}s passed during query rewrites")
+        return results
+    results.update(search_domains(queries, timeout=remaining))
+    return results
 
 # Define InterviewState class
 class InterviewState:
@@ -144,11 +332,36 @@ class InterviewState:
         self.messages = messages
 
 # Function to perform all three searches and combine contexts
-def perform_combined_vector_searches(query: str, whoop_data: dict = None) -> dict:
-    """Perform intelligent domain-specific searches based on query relevance."""
+def perform_combined_vector_searches(query: str, whoop_data: dict = None, concurrent: bool = None) -> dict:
+    """Perform intelligent domain-specific searches based on query relevance.
+
+    When ``concurrent`` is true (default from RETRIEVAL_CONCURRENT) the relevant
+    domain branches run in parallel on the shared retrieval pool. With QUERY_PLANNER
+    enabled, relevance and search strings come from a single planner call.
+    """
+    result = None
+    for event, payload in iter_combined_vector_searches(query, whoop_data, concurrent):
+        if event == "result":
+            result = payload
+    return result
+
+def iter_combined_vector_searches(query: str, whoop_data: dict = None, concurrent: bool = None):
+    """Generator form of perform_combined_vector_searches.
+
+    Yields ``(event, payload)`` progress tuples as each stage finishes and ends with
+    ``("result", combined_result)``, so callers can stream progress to the client.
+    """
     try:
-        # Analyze domain relevance
-        relevance_scores = analyze_query_relevance(query, whoop_data or {})
+        # Analyze domain relevance and plan the search strings
+        yield "planning", {}
+        planned_queries = None
+        if QUERY_PLANNER:
+            plan = plan_query(query, whoop_data or {})
+            relevance_scores = {domain: plan[domain]["relevance"] for domain in plan}
+            planned_queries = {domain: plan[domain]["search_query"] for domain in plan}
+        else:
+            relevance_scores = analyze_query_relevance(query, whoop_data or {})
+        yield "planned", {"domain_relevance": relevance_scores}
         
         # Initialize results
         results = {
@@ -158,19 +371,27 @@ def perform_combined_vector_searches(query: str, whoop_data: dict = None) -> dic
         }
         
         # Process each domain based on relevance
-        if relevance_scores["nutrition"] > 0.3:
-            specialized_query = generate_specialized_query("nutrition", query, whoop_data)
-            results["nutrition"] = search_nutrition_vector(specialized_query)
-            
-        if relevance_scores["strength"] > 0.3:
-            specialized_query = generate_specialized_query("strength", query, whoop_data)
-            results["strength"] = search_strength_vector(specialized_query)
-            
-        if relevance_scores["mindset"] > 0.3:
-            specialized_query = generate_specialized_query("mindset", query, whoop_data)
-            results["mindset"] = search_mindset_vector(specialized_query)
+        relevant_domains = [domain for domain in results if relevance_scores[domain] > 0.3]
+        yield "retrieving", {"domains": relevant_domains}
+        if concurrent is None:
+            concurrent = RETRIEVAL_CONCURRENT
+        if concurrent:
+            results.update(run_domain_searches_concurrently(
+                query, whoop_data, relevant_domains, planned_queries=planned_queries
+            ))
+        else:
+            results.update(search_domains({
+                domain: build_domain_query(domain, query, whoop_data, (planned_queries or {}).get(domain))
+                for domain in relevant_domains
+            }))
+        yield "retrieved", {"result_counts": {domain: len(results[domain]) for domain in results}}
+        
+        # Deduplicate across domains and fit the chunks into the context budget
+        results, context_stats = context_assembler.assemble(results, relevance_scores)
+        yield "assembled", {"context_stats": context_stats}
         
         # Merge and analyze results with enhanced context
+        yield "merging", {}
         merged_response = merge_and_analyze_results(
             query,
             results["nutrition"],
@@ -179,23 +400,15 @@ def perform_combined_vector_searches(query: str, whoop_data: dict = None) -> dic
             whoop_data
         )
         
-        # Generate personalized follow-up questions
-        follow_up_questions = generate_follow_up_questions(merged_response)
-        
-        return {
+        yield "result", {
             "response": merged_response,
-            "follow_up_questions": follow_up_questions,
-            "domain_relevance": relevance_scores
+            "domain_relevance": relevance_scores,
+            "context_stats": context_stats
         }
     except Exception as e:
         print(f"Error in combined search: {e}")
-        return {
+        yield "result", {
             "response": "Error performing combined search and analysis.",
-            "follow_up_questions": [
-                "Would you like to try a different question?",
-                "Can I help clarify anything specific?",
-                "What other aspects would you like to explore?"
-            ],
             "domain_relevance": {"nutrition": 0, "strength": 0, "mindset": 0}
         }
 
@@ -255,10 +468,7 @@ def merge_and_analyze_results(query: str, nutrition_results: List[str],
         print(f"Error merging results: {e}")
         return "Error generating integrated response."
 
-# Add this new function to k4-test.py
-def process_rag_response(user_query, context):
-    """Process a user query with the given context using the RAG chain."""
-    after_rag_template = """You are a personal AI fitness and wellness coach analyzing the user's Whoop data. 
+AFTER_RAG_TEMPLATE = """You are a personal AI fitness and wellness coach analyzing the user's Whoop data. 
 
     Instructions for data analysis:
     1. The Whoop data is provided in JSON format - parse it carefully and analyze ALL available days
@@ -290,10 +500,11 @@ def process_rag_response(user_query, context):
     - Support your insights with specific data points from multiple days
     - Provide actionable recommendations based on the full picture"""
 
-    after_rag_prompt = ChatPromptTemplate.from_template(after_rag_template)
+def build_rag_chain(context):
+    """Build the final answer chain for the given context."""
+    after_rag_prompt = ChatPromptTemplate.from_template(AFTER_RAG_TEMPLATE)
     
-    # Set up the RAG chain
-    after_rag_chain = (
+    return (
         {
             "context": lambda x: context,
             "question4": lambda x: x
@@ -302,17 +513,34 @@ def process_rag_response(user_query, context):
         | model_local
         | StrOutputParser()
     )
+
+# Add this new function to k4-test.py
+def process_rag_response(user_query, context, include_follow_ups=True):
+    """Process a user query with the given context using the RAG chain.
+
+    Pass ``include_follow_ups=False`` when follow-up questions are generated
+    off the request path; the result then carries an empty list.
+    """
+    after_rag_chain = build_rag_chain(context)
     
     response = after_rag_chain.invoke(user_query)
     
     # Generate follow-up questions based on the response
-    follow_up_questions = generate_follow_up_questions(response)
+    follow_up_questions = generate_follow_up_questions(response) if include_follow_ups else []
     
     return {
         "response": response,
         "follow_up_questions": follow_up_questions
     }
 
+def stream_rag_response(user_query, context):
+    """Yield the RAG answer token by token as model_local streams it."""
+    after_rag_chain = build_rag_chain(context)
+    
+    for chunk in after_rag_chain.stream(user_query):
+        if chunk:
+            yield chunk
+
 def generate_follow_up_questions(response: str) -> list:
     """Generate 3 potential user questions based on the AI's response content."""
     
@@ -372,6 +600,29 @@ def generate_follow_up_questions(response: str) -> list:
             "How can I implement these suggestions?"
         ]
 
+def summarize_conversation(previous_summary: str, transcript: str) -> str:
+    """Fold older conversation turns into a short running summary."""
+    
+    summary_prompt = ChatPromptTemplate.from_messages([
+        ("system", """You maintain a running summary of a conversation between a user and their AI fitness coach.
+        
+        Update the existing summary with the new messages. Keep the user's goals, questions,
+        constraints and any recommendations the coach made, including specific numbers.
+        Drop greetings and repetition. Write at most 150 words of plain prose."""),
+        ("user", "Existing summary:\n{summary}\n\nNew messages:\n{transcript}\n\nUpdated summary:")
+    ])
+    
+    summary_chain = summary_prompt | model_local | StrOutputParser()
+    
+    try:
+        return summary_chain.invoke({
+            "summary": previous_summary or "(none)",
+            "transcript": transcript
+        }).strip()
+    except Exception as e:
+        print(f"Error summarizing conversation: {e}")
+        return previous_summary
+
 # Add these new functions after the existing imports
 
 def analyze_query_relevance(query: str, whoop_data: dict) -> dict:
@@ -441,6 +692,90 @@ def analyze_query_relevance(query: str, whoop_data: dict) -> dict:
         print(f"Full error: {str(e)}")
         return {"nutrition": 0.5, "strength": 0.5, "mindset": 0.5}
 
+def default_query_plan(query: str) -> dict:
+    """Fallback plan: search every domain with the original query."""
+    return {
+        domain: {"relevance": 0.5, "search_query": query}
+        for domain in ("nutrition", "strength", "mindset")
+    }
+
+def validate_query_plan(raw_plan: dict, query: str) -> dict:
+    """Validate planner output, clamping scores and filling gaps from the defaults."""
+    plan = QueryPlan(**raw_plan)
+    validated = {}
+    for domain in ("nutrition", "strength", "mindset"):
+        domain_plan = getattr(plan, domain)
+        search_query = domain_plan.search_query.strip()
+        validated[domain] = {
+            "relevance": min(max(float(domain_plan.relevance), 0), 1),
+            "search_query": search_query or query
+        }
+    return validated
+
+def plan_query(query: str, whoop_data: dict) -> dict:
+    """Score domain relevance and write each domain's search query in one LLM call."""
+    
+    planner_prompt = ChatPromptTemplate.from_messages([
+        ("system", """You are a search planner for a fitness and wellness coach.
+        For each domain (nutrition, strength, mindset) decide how relevant it is to the
+        user's query and Whoop data, and write a concise keyword search query for it.
+        
+        Domain focus:
+        - nutrition: macronutrients and micronutrients, meal timing and composition,
+          dietary restrictions, supplement recommendations
+        - strength: exercise technique and form, programming and periodization,
+          recovery and injury prevention, performance optimization
+        - mindset: mental preparation and focus, motivation and goal setting,
+          stress management and anxiety, behavioral change and habit formation
+        
+        Example:
+        Original: "How can I improve recovery?"
+        Nutrition: "nutrition strategies optimal recovery athletes hydration protein timing"
+        Strength: "workout recovery techniques active recovery training load management"
+        Mindset: "mental recovery strategies stress management sleep optimization"
+        
+        You must respond with ONLY a valid JSON object in this exact format:
+        {{
+            "nutrition": {{"relevance": 0.5, "search_query": "..."}},
+            "strength": {{"relevance": 0.5, "search_query": "..."}},
+            "mindset": {{"relevance": 0.5, "search_query": "..."}}
+        }}
+        
+        - Each relevance must be a number between 0 and 1
+        - Do not include any other text or explanation"""),
+        ("user", """Query: {query}
+        Whoop Data: {whoop_data}
+        
+        Return the search plan as JSON.""")
+    ])
+    
+    # Create planner chain
+    planner_chain = planner_prompt | planner_model | StrOutputParser()
+    
+    try:
+        response = planner_chain.invoke({
+            "query": query,
+            "whoop_data": json.dumps(whoop_data)
+        }).strip()
+        
+        json_start = response.find('{')
+        json_end = response.rfind('}') + 1
+        if json_start >= 0 and json_end > json_start:
+            try:
+                plan = validate_query_plan(json.loads(response[json_start:json_end]), query)
+                print(f"Query plan: {plan}")
+                return plan
+            except (json.JSONDecodeError, ValidationError, ValueError, TypeError) as e:
+                print(f"Error validating query plan: {e}")
+                print(f"Raw response: {response}")
+        else:
+            print(f"Could not find valid JSON in planner response: {response}")
+        
+        return default_query_plan(query)
+    except Exception as e:
+        print(f"Error planning query: {e}")
+        return default_query_plan(query)
+
 def generate_specialized_query(domain: str, query: str, whoop_insights: dict) -> str:
     """Generate a specialized query for a specific domain incorporating Whoop insights."""
     
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def hash_payload(payload: Any) -> str:
+    """Content hash of a JSON payload, independent of key order."""
+    serialized = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(serialized.encode('utf-8'), digest_size=20).hexdigest()
+
+
+class ProcessedDataCache:
+    """LRU cache of processed Whoop data and its prompt serialization, keyed by content hash.
+
+    The frontend re-posts the same ``whoopData`` every chat turn; a hit costs one
+    hash of the payload instead of reprocessing and re-serializing it. Cached
+    values are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, process_fn: Callable[[List[Dict[str, Any]]], Dict[str, Any]], max_entries: int = 64):
+        self.process_fn = process_fn
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, whoop_data: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], str, str]:
+        """Return ``(processed_data, prompt_context, digest)`` for a Whoop payload."""
+        digest = hash_payload(whoop_data)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                self.bytes_saved += len(entry[1])
+                return entry[0], entry[1], digest
+            self.misses += 1
+
+        processed = self.process_fn(whoop_data)
+        context = json.dumps(processed, indent=2)
+        with self._lock:
+            self._entries[digest] = (processed, context)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return processed, context, digest
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "entries": len(self._entries)
+            }
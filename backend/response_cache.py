@@ -0,0 +1,200 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def hash_whoop_data(processed_whoop_data: Any) -> str:
+    """Stable content hash of the processed Whoop data used to partition the cache."""
+    payload = json.dumps(processed_whoop_data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class InMemoryCacheBackend:
+    """LRU-ordered cache entries held in process memory."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._next_id = 0
+
+    def candidates(self, data_hash: str) -> List[Tuple[int, np.ndarray, Any, float]]:
+        return [
+            (entry_id, embedding, value, created)
+            for entry_id, (entry_hash, embedding, value, created) in self._entries.items()
+            if entry_hash == data_hash
+        ]
+
+    def add(self, data_hash: str, embedding: np.ndarray, value: Any, created: float) -> int:
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (data_hash, embedding, value, created)
+        return entry_id
+
+    def touch(self, entry_id: int):
+        self._entries.move_to_end(entry_id)
+
+    def remove(self, entry_id: int):
+        self._entries.pop(entry_id, None)
+
+    def remove_expired(self, cutoff: float) -> int:
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry[3] < cutoff]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        return len(expired)
+
+    def remove_oldest(self, keep: int) -> int:
+        removed = 0
+        while len(self._entries) > keep:
+            self._entries.popitem(last=False)
+            removed += 1
+        return removed
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """Cache entries persisted in SQLite so they survive restarts."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS response_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_hash ON response_cache (data_hash)")
+        self._conn.commit()
+
+    def candidates(self, data_hash: str) -> List[Tuple[int, np.ndarray, Any, float]]:
+        rows = self._conn.execute(
+            "SELECT id, embedding, value, created FROM response_cache WHERE data_hash = ?",
+            (data_hash,)
+        ).fetchall()
+        return [
+            (entry_id, np.frombuffer(embedding, dtype=np.float32), json.loads(value), created)
+            for entry_id, embedding, value, created in rows
+        ]
+
+    def add(self, data_hash: str, embedding: np.ndarray, value: Any, created: float) -> int:
+        cursor = self._conn.execute(
+            "INSERT INTO response_cache (data_hash, embedding, value, created, last_access) VALUES (?, ?, ?, ?, ?)",
+            (data_hash, embedding.astype(np.float32).tobytes(), json.dumps(value), created, created)
+        )
+        self._conn.commit()
+        return cursor.lastrowid
+
+    def touch(self, entry_id: int):
+        self._conn.execute("UPDATE response_cache SET last_access = ? WHERE id = ?", (time.time(), entry_id))
+        self._conn.commit()
+
+    def remove(self, entry_id: int):
+        self._conn.execute("DELETE FROM response_cache WHERE id = ?", (entry_id,))
+        self._conn.commit()
+
+    def remove_expired(self, cutoff: float) -> int:
+        cursor = self._conn.execute("DELETE FROM response_cache WHERE created < ?", (cutoff,))
+        self._conn.commit()
+        return cursor.rowcount
+
+    def remove_oldest(self, keep: int) -> int:
+        cursor = self._conn.execute(
+            """DELETE FROM response_cache WHERE id NOT IN (
+                SELECT id FROM response_cache ORDER BY last_access DESC LIMIT ?
+            )""",
+            (keep,)
+        )
+        self._conn.commit()
+        return cursor.rowcount
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class SemanticResponseCache:
+    """Response cache matched on Whoop data hash plus query-embedding similarity.
+
+    A lookup hits when a cached query for the same processed Whoop data has cosine
+    similarity of at least ``threshold`` with the new query. Entries expire after
+    ``ttl_seconds`` and the least recently used are evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, embed_fn: Callable[[str], List[float]], backend=None,
+                 threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 512):
+        self.embed_fn = embed_fn
+        self.backend = backend if backend is not None else InMemoryCacheBackend()
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def embed(self, query: str) -> Optional[np.ndarray]:
+        """Embed a query, returning None when the embedding service is unavailable."""
+        try:
+            return _normalize(self.embed_fn(query))
+        except Exception as e:
+            print(f"Error embedding query for response cache: {e}")
+            return None
+
+    def lookup(self, query_embedding: Optional[np.ndarray], data_hash: str) -> Optional[Any]:
+        """Return the cached value for the closest matching query, or None on a miss."""
+        if query_embedding is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.evictions += self.backend.remove_expired(time.time() - self.ttl_seconds)
+            best_id, best_value, best_score = None, None, -1.0
+            for entry_id, embedding, value, _ in self.backend.candidates(data_hash):
+                if embedding.shape != query_embedding.shape:
+                    continue
+                score = float(np.dot(embedding, query_embedding))
+                if score > best_score:
+                    best_id, best_value, best_score = entry_id, value, score
+
+            if best_id is not None and best_score >= self.threshold:
+                self.backend.touch(best_id)
+                self.hits += 1
+                return best_value
+            self.misses += 1
+            return None
+
+    def store(self, query_embedding: Optional[np.ndarray], data_hash: str, value: Any):
+        """Cache a value under the query embedding; skipped when embedding failed."""
+        if query_embedding is None:
+            return
+        with self._lock:
+            self.backend.add(data_hash, query_embedding, value, time.time())
+            self.evictions += self.backend.remove_oldest(self.max_entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self.backend),
+                "threshold": self.threshold
+            }
@@ -0,0 +1,97 @@
+import atexit
+import json
+import logging
+import queue
+import random
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Callable, Dict
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Formats dict log messages as compact single-line JSON.
+
+    Callable values are evaluated here, on the listener thread, so expensive
+    fields such as preprocessed data never run on the request thread.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = record.msg if isinstance(record.msg, dict) else {"message": record.getMessage()}
+        line = {"timestamp": datetime.fromtimestamp(record.created).isoformat(timespec="seconds")}
+        for key, value in payload.items():
+            line[key] = value() if callable(value) else value
+        return json.dumps(line, separators=(",", ":"), default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SummaryLogger:
+    """Background, size-rotated JSON-lines log of generated Whoop summaries.
+
+    Records are sampled at ``sample_rate`` and handed to a bounded queue; a
+    listener thread serializes and writes them, so logging adds no file I/O or
+    serialization to the request.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3,
+                 queue_size: int = 256, sample_rate: float = 1.0, include_processed: bool = False):
+        self.sample_rate = sample_rate
+        self.include_processed = include_processed
+
+        file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        file_handler.setFormatter(JsonLineFormatter())
+        self.queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        self.listener = QueueListener(self.queue_handler.queue, file_handler)
+
+        self.logger = logging.getLogger('whoop_summary')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(self.queue_handler)
+
+        self.listener.start()
+        self._running = True
+        atexit.register(self.stop)
+
+    def log_summary(self, start_date, end_date, summary: list,
+                    process_fn: Callable[[list], Dict[str, Any]] = None) -> bool:
+        """Queue a summary record; returns False when it was sampled out."""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+
+        record = {
+            "event": "whoop_summary",
+            "start_date": start_date,
+            "end_date": end_date,
+            "days": len(summary),
+            "summary": summary
+        }
+        if self.include_processed and process_fn is not None:
+            record["processed"] = lambda: process_fn(summary)
+        self.logger.info(record)
+        return True
+
+    @property
+    def dropped(self) -> int:
+        return self.queue_handler.dropped
+
+    def stop(self):
+        """Flush queued records and stop the listener thread."""
+        if self._running:
+            self._running = False
+            self.listener.stop()
@@ -0,0 +1,64 @@
+"""The retrieval stats returned by the combined search stay out of the chat prompt."""
+import pytest
+
+from benchmark_whoop_fetch import load_service
+
+COMBINED = {
+    'response': 'Eat more protein after strength sessions.',
+    'domain_relevance': {'nutrition': 0.9, 'strength': 0.6, 'mindset': 0.1},
+    'context_stats': {'chunks_in': 12, 'chunks_kept': 7, 'duplicates_dropped': 2}
+}
+
+
+@pytest.fixture
+def chat_app(monkeypatch):
+    load_service()
+    import app
+    prompts = []
+
+    def fake_rag_response(query, context, include_follow_ups=True):
+        prompts.append(context)
+        return {'response': 'answer', 'follow_up_questions': []}
+
+    def fake_stream_rag_response(query, context):
+        prompts.append(context)
+        yield 'answer'
+
+    def fake_combined_searches(query, whoop_data=None, concurrent=None):
+        yield 'result', dict(COMBINED)
+
+    monkeypatch.setattr(app, 'response_cache', None)
+    monkeypatch.setattr(app, 'perform_combined_vector_searches', lambda query, whoop_data=None: dict(COMBINED))
+    monkeypatch.setattr(app, 'iter_combined_vector_searches', fake_combined_searches)
+    monkeypatch.setattr(app, 'process_rag_response', fake_rag_response)
+    monkeypatch.setattr(app, 'stream_rag_response', fake_stream_rag_response)
+    monkeypatch.setattr(app, 'generate_follow_up_questions', lambda answer: [])
+    monkeypatch.setattr(app.follow_up_store, 'submit', lambda answer: 'turn')
+    return app.app.test_client(), prompts
+
+
+def assert_prompt_has_answer_only(prompt):
+    assert COMBINED['response'] in prompt
+    assert 'context_stats' not in prompt and 'chunks_kept' not in prompt
+    assert 'domain_relevance' not in prompt
+
+
+def test_chat_prompt_has_combined_answer_only(chat_app):
+    client, prompts = chat_app
+    response = client.post('/api/chat', json={'query': 'What should I eat?'})
+
+    assert response.status_code == 200
+    assert_prompt_has_answer_only(prompts[0])
+    body = response.get_json()['response']
+    assert body['context_stats'] == COMBINED['context_stats']
+    assert body['domain_relevance'] == COMBINED['domain_relevance']
+
+
+def test_stream_prompt_has_combined_answer_only(chat_app):
+    client, prompts = chat_app
+    response = client.post('/api/chat/stream', json={'query': 'What should I eat?'})
+    events = [line for line in response.get_data(as_text=True).splitlines() if line.startswith('event: ')]
+
+    assert 'event: error' not in events
+    assert events[-1] == 'event: done'
+    assert_prompt_has_answer_only(prompts[0])
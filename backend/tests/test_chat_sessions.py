@@ -0,0 +1,42 @@
+"""Concurrent updates to one chat session through SessionStore.update."""
+import threading
+import time
+
+import pytest
+
+from chat_sessions import InMemorySessionStore, SQLiteSessionStore, append_message, new_session
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    return InMemorySessionStore()
+
+
+def test_concurrent_turns_are_all_recorded(store):
+    session_id = store.create(new_session([], None, '', None))
+    threads, turns = 8, 10
+
+    def record_turns(thread):
+        for turn in range(turns):
+            def append_turn(session):
+                # Widen the window between load and save
+                time.sleep(0.001)
+                append_message(session, {'type': 'user', 'text': f'{thread}-{turn}'})
+            store.update(session_id, append_turn)
+
+    workers = [threading.Thread(target=record_turns, args=(thread,)) for thread in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    history = store.get(session_id)['history']
+    assert len(history) == threads * turns
+    assert {message['text'] for message in history} == {f'{t}-{n}' for t in range(threads) for n in range(turns)}
+    assert store._session_locks._locks == {}
+
+
+def test_update_of_unknown_session_returns_none(store):
+    assert store.update('missing', lambda session: session.clear()) is None
@@ -0,0 +1,17 @@
+"""calculate_daily_sleep against the row-by-row implementation it replaced."""
+import pytest
+
+from benchmark_aggregation import compare, legacy_calculate_daily_sleep, synthetic_sleeps
+from whoop_aggregation import calculate_daily_sleep
+
+
+@pytest.mark.parametrize('missing_score_rate', [0.0, 0.1])
+@pytest.mark.parametrize('seed', range(10))
+def test_matches_row_by_row_implementation(seed, missing_score_rate):
+    sleep_df = synthetic_sleeps(60, seed, missing_score_rate)
+    assert compare(legacy_calculate_daily_sleep(sleep_df), calculate_daily_sleep(sleep_df)) == []
+
+
+def test_matches_row_by_row_implementation_without_scores():
+    sleep_df = synthetic_sleeps(14, seed=1, missing_score_rate=1.0)
+    assert compare(legacy_calculate_daily_sleep(sleep_df), calculate_daily_sleep(sleep_df)) == []
@@ -0,0 +1,70 @@
+"""WhoopService.fetch_collections against the mock client from benchmark_whoop_fetch."""
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from benchmark_whoop_fetch import COLLECTIONS, load_service
+
+END_DATE = date(2024, 6, 8)
+START_DATE = END_DATE - timedelta(days=7)
+
+
+@pytest.fixture(scope="module")
+def service():
+    return load_service()
+
+
+@pytest.fixture
+def whoop(service):
+    client = service.client
+    client.latencies = {}
+    client.fail_once = set()
+    client.reset()
+    saved = service.fetch_timeout, service.fetch_retries, service.fetch_backoff
+    service.fetch_backoff = 0.01
+    yield service
+    service.fetch_timeout, service.fetch_retries, service.fetch_backoff = saved
+
+
+def test_collections_are_fetched_concurrently(whoop):
+    whoop.client.latencies = {collection: 0.2 for collection in COLLECTIONS}
+    start = time.perf_counter()
+    collections = whoop.fetch_collections(START_DATE, END_DATE)
+    elapsed = time.perf_counter() - start
+
+    assert sorted(collections) == sorted(COLLECTIONS)
+    assert all(len(records) == 7 for records in collections.values())
+    # One after another would take 0.8s
+    assert elapsed < 0.4
+
+
+def test_failed_collection_is_retried(whoop):
+    whoop.client.fail_once = {'sleep'}
+    collections = whoop.fetch_collections(START_DATE, END_DATE)
+
+    assert len(collections['sleep']) == 7
+    assert whoop.client.calls == len(COLLECTIONS) + 1
+
+
+def test_error_is_raised_once_retries_are_exhausted(whoop):
+    whoop.fetch_retries = 0
+    whoop.client.fail_once = {'workout'}
+    with pytest.raises(ConnectionError):
+        whoop.fetch_collections(START_DATE, END_DATE)
+
+
+def test_slow_collection_times_out(whoop):
+    whoop.fetch_retries = 0
+    whoop.fetch_timeout = 0.05
+    whoop.client.latencies = {'cycle': 0.3}
+    with pytest.raises(TimeoutError):
+        whoop.fetch_collections(START_DATE, END_DATE)
+
+
+def test_summary_covers_every_requested_day(whoop):
+    summary = whoop.get_last_7_days_summary(START_DATE)
+
+    assert [day['date'] for day in summary] == [
+        (END_DATE - timedelta(days=offset)).isoformat() for offset in range(1, 8)
+    ]
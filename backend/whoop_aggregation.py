@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+SLEEP_SUMMARY_COLUMNS = [
+    'date', 'sleep_duration', 'disturbance_count', 'efficiency_percentage', 'awake_time',
+    'light_sleep_time', 'slow_wave_sleep_time', 'rem_sleep_time', 'sleep_cycle_count'
+]
+
+# Summed per-day sleep metrics: output column -> (Whoop field, divisor)
+SLEEP_SUM_METRICS = {
+    'disturbance_count': ('score.stage_summary.disturbance_count', 1),
+    'awake_time': ('score.stage_summary.total_awake_time_milli', 60000),
+    'light_sleep_time': ('score.stage_summary.total_light_sleep_time_milli', 60000),
+    'slow_wave_sleep_time': ('score.stage_summary.total_slow_wave_sleep_time_milli', 60000),
+    'rem_sleep_time': ('score.stage_summary.total_rem_sleep_time_milli', 60000),
+    'sleep_cycle_count': ('score.stage_summary.sleep_cycle_count', 1)
+}
+
+
+def _to_utc_ns(series: pd.Series) -> np.ndarray:
+    """Convert a tz-aware datetime series to int64 UTC nanoseconds."""
+    return series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy('datetime64[ns]').astype(np.int64)
+
+
+def calculate_daily_sleep(sleep_df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate sleeps into per-day duration and stage metrics.
+
+    Sleeps are grouped by their local start ``date``. Overlapping sleeps within a
+    day are merged (sort once, running max of end times) so their union is
+    counted, and the part of a sleep from the previous day that runs past local
+    midnight is added to the day it ends on. Stage metrics are summed per day,
+    with a missing value making the day's sum missing; efficiency is the day's
+    maximum.
+    """
+    if sleep_df.empty:
+        return pd.DataFrame(columns=SLEEP_SUMMARY_COLUMNS)
+
+    sleeps = sleep_df.sort_values(['date', 'start_time'], kind='mergesort').reset_index(drop=True)
+    dates = sleeps['date']
+    start_ns = _to_utc_ns(sleeps['start_time'])
+    end_ns = _to_utc_ns(sleeps['end_time'])
+
+    # Interval merge: each sleep only adds the part past the latest earlier end that day
+    running_end = pd.Series(end_ns).groupby(dates).cummax().to_numpy()
+    first_of_day = (dates != dates.shift(1)).to_numpy()
+    previous_end = np.roll(running_end, 1)
+    starts_fresh = first_of_day | (start_ns > previous_end)
+    contribution_ns = np.where(
+        starts_fresh,
+        end_ns - start_ns,
+        np.maximum(end_ns - previous_end, 0)
+    )
+    merged_minutes = pd.Series(contribution_ns / 60e9).groupby(dates).sum()
+
+    # Carry-over: minutes after local midnight of sleeps that started the previous day
+    end_dates = sleeps['end_time'].dt.date
+    day_gap = (pd.to_datetime(end_dates) - pd.to_datetime(dates)).dt.days
+    crosses_midnight = (day_gap == 1).to_numpy()
+    after_midnight = (sleeps['end_time'] - sleeps['end_time'].dt.normalize()).dt.total_seconds() / 60
+    carry_over = after_midnight[crosses_midnight].groupby(end_dates[crosses_midnight]).sum()
+
+    summary = pd.DataFrame({'date': merged_minutes.index})
+    summary['sleep_duration'] = (
+        merged_minutes.to_numpy() + carry_over.reindex(merged_minutes.index, fill_value=0).to_numpy()
+    )
+
+    grouped_index = merged_minutes.index
+    for column, (field, divisor) in SLEEP_SUM_METRICS.items():
+        if field not in sleeps.columns:
+            summary[column] = 0
+            continue
+        values = sleeps[field] / divisor if divisor != 1 else sleeps[field]
+        sums = values.groupby(dates).sum()
+        has_missing = values.isna().groupby(dates).any()
+        summary[column] = sums.mask(has_missing).reindex(grouped_index).to_numpy()
+
+    efficiency_field = 'score.sleep_efficiency_percentage'
+    if efficiency_field in sleeps.columns:
+        efficiency = sleeps[efficiency_field].groupby(dates).max().reindex(grouped_index)
+        summary['efficiency_percentage'] = efficiency.fillna(0).clip(lower=0).to_numpy()
+    else:
+        summary['efficiency_percentage'] = 0
+
+    return summary[SLEEP_SUMMARY_COLUMNS]
+
+
+ZONE_DURATION_FIELDS = [
+    'zone_zero_milli', 'zone_one_milli', 'zone_two_milli',
+    'zone_three_milli', 'zone_four_milli', 'zone_five_milli'
+]
+
+
+def _column_values(df: pd.DataFrame, field: str, default=None) -> list:
+    """Return a column as Python values, or ``default`` for every row if it is absent."""
+    if field in df.columns:
+        return df[field].tolist()
+    return [default] * len(df)
+
+
+def _nullable_values(df: pd.DataFrame, field: str) -> list:
+    """Return a column as Python values with missing entries as None."""
+    if field not in df.columns:
+        return [None] * len(df)
+    column = df[field]
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+def aggregate_workouts(workout_df: pd.DataFrame, sport_names: dict) -> pd.DataFrame:
+    """Build the per-day list of workout summaries with whole-column operations.
+
+    Durations, sport names, rounded strain and heart-rate fields are computed per
+    column; the per-day lists are assembled in a single pass at the end. Returns
+    a frame with ``date`` and ``workouts`` columns, one row per day.
+    """
+    if workout_df.empty:
+        return pd.DataFrame(columns=['date', 'workouts'])
+
+    start_time = workout_df['start_time'] if 'start_time' in workout_df.columns else pd.Series(pd.NaT, index=workout_df.index)
+    end_time = workout_df['end_time'] if 'end_time' in workout_df.columns else pd.Series(pd.NaT, index=workout_df.index)
+    duration = (end_time - start_time).dt.total_seconds() / 60
+    has_duration = (start_time.notna() & end_time.notna()).tolist()
+    durations = [
+        round(minutes) if valid else None
+        for minutes, valid in zip(duration.tolist(), has_duration)
+    ]
+
+    if 'sport_id' in workout_df.columns:
+        sports = workout_df['sport_id'].map(sport_names).fillna('Unknown').tolist()
+    else:
+        sports = [sport_names.get(-1, 'Unknown')] * len(workout_df)
+
+    if 'score.strain' in workout_df.columns:
+        strain = workout_df['score.strain'].round(2)
+        strains = strain.astype(object).where(strain.notna(), None).tolist()
+    else:
+        strains = [None] * len(workout_df)
+
+    average_hr = _nullable_values(workout_df, 'score.average_heart_rate')
+    max_hr = _nullable_values(workout_df, 'score.max_heart_rate')
+    zones = [_column_values(workout_df, f'score.zone_duration.{zone}') for zone in ZONE_DURATION_FIELDS]
+
+    workouts_by_date = {}
+    for i, day in enumerate(workout_df['date'].tolist()):
+        workouts_by_date.setdefault(day, []).append({
+            'sport': sports[i],
+            'strain': strains[i],
+            'average_hr': average_hr[i],
+            'max_hr': max_hr[i],
+            'duration': durations[i],
+            'zone_duration': {zone: zones[j][i] for j, zone in enumerate(ZONE_DURATION_FIELDS)}
+        })
+
+    days = sorted(workouts_by_date)
+    return pd.DataFrame({'date': days, 'workouts': [workouts_by_date[day] for day in days]})
@@ -1,29 +1,35 @@
+from collections import Counter
 from typing import List, Dict, Any
 import numpy as np
-from datetime import datetime
-import pandas as pd
+
+# Per-day metrics extracted from the Whoop summary in a single pass
+DAY_METRICS = (
+    'recovery', 'sleep_duration', 'sleep_efficiency', 'rem_sleep',
+    'deep_sleep', 'light_sleep', 'day_strain'
+)
 
 class WhoopDataProcessor:
     def __init__(self, whoop_data: List[Dict[str, Any]]):
         self.raw_data = whoop_data
         self.processed_data = None
         self.summary_stats = None
-        
+
     def process_data(self) -> Dict[str, Any]:
         """Main processing method that coordinates all preprocessing steps."""
-        # Convert to pandas DataFrame for easier analysis
-        df = pd.DataFrame(self.raw_data)
+        # Extract every metric once into aligned arrays (NaN marks missing days)
+        self._extract_metrics()
         
         # Process each component
-        recovery_stats = self._analyze_recovery(df)
-        sleep_stats = self._analyze_sleep(df)
-        strain_stats = self._analyze_strain(df)
-        workout_stats = self._analyze_workouts(df)
+        recovery_stats = self._analyze_recovery()
+        sleep_stats = self._analyze_sleep()
+        strain_stats = self._analyze_strain()
+        workout_stats = self._analyze_workouts()
         
         # Identify trends and patterns
-        trends = self._identify_trends(df)
+        trends = self._identify_trends()
         
         # Compile processed data
+        dates = [date for date in self.dates if date is not None]
         self.processed_data = {
             "summary_metrics": {
                 "recovery": recovery_stats,
@@ -33,85 +39,100 @@ class WhoopDataProcessor:
             },
             "trends_and_patterns": trends,
             "time_period": {
-                "start_date": df['date'].min(),
-                "end_date": df['date'].max(),
-                "total_days": len(df)
+                "start_date": min(dates) if dates else None,
+                "end_date": max(dates) if dates else None,
+                "total_days": len(self.raw_data)
             }
         }
         
         return self.processed_data
 
-    def _analyze_recovery(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _extract_metrics(self):
+        """Walk the raw data once, filling per-day metric arrays and the flat workout list."""
+        values = {name: [] for name in DAY_METRICS}
+        self.dates = []
+        self.workouts = []
+        
+        for day in self.raw_data:
+            sleep_data = day.get('sleep_data') or {}
+            metrics = sleep_data.get('metrics') or {}
+            strain_data = day.get('strain_data') or {}
+        
+            self.dates.append(day.get('date'))
+            values['recovery'].append(day.get('recovery_score'))
+            values['sleep_duration'].append(sleep_data.get('duration'))
+            values['sleep_efficiency'].append(metrics.get('efficiency_percentage'))
+            values['rem_sleep'].append(metrics.get('rem_sleep_time'))
+            values['deep_sleep'].append(metrics.get('slow_wave_sleep_time'))
+            values['light_sleep'].append(metrics.get('light_sleep_time'))
+            values['day_strain'].append(strain_data.get('day_strain'))
+            if strain_data.get('workouts'):
+                self.workouts.extend(strain_data['workouts'])
+        
+        # Original values keep their Python types for sums; floats feed the vectorized stats
+        self.values = {name: np.array(column, dtype=object) for name, column in values.items()}
+        self.arrays = {
+            name: np.array([np.nan if v is None else v for v in column], dtype=float)
+            for name, column in values.items()
+        }
+        self.valid = {name: ~np.isnan(array) for name, array in self.arrays.items()}
+        
+        # Strain statistics skip zero-strain days, correlations and patterns keep them
+        self.valid['day_strain_nonzero'] = self.valid['day_strain'] & (self.arrays['day_strain'] != 0)
+
+    def _series(self, name: str, mask: str = None) -> np.ndarray:
+        """Float values of a metric on the days where it is present."""
+        return self.arrays[name][self.valid[mask or name]]
+
+    def _original(self, name: str, mask: str = None) -> list:
+        """Original (Python-typed) values of a metric on the days where it is present."""
+        return self.values[name][self.valid[mask or name]].tolist()
+
+    def _analyze_recovery(self) -> Dict[str, Any]:
         """Analyze recovery scores and patterns."""
-        recovery_scores = [day.get('recovery_score') for day in self.raw_data]
-        valid_scores = [score for score in recovery_scores if score is not None]
+        valid_scores = self._series('recovery')
         
-        if not valid_scores:
+        if not len(valid_scores):
             return {"error": "No valid recovery data available"}
         
         return {
             "average_recovery": np.mean(valid_scores),
             "recovery_trend": self._calculate_trend(valid_scores),
             "consistency": self._calculate_consistency(valid_scores),
-            "days_below_33": sum(1 for score in valid_scores if score < 33),
-            "days_above_66": sum(1 for score in valid_scores if score > 66)
+            "days_below_33": int(np.count_nonzero(valid_scores < 33)),
+            "days_above_66": int(np.count_nonzero(valid_scores > 66))
         }
 
-    def _analyze_sleep(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_sleep(self) -> Dict[str, Any]:
         """Analyze sleep patterns and quality."""
-        sleep_data = []
-        sleep_efficiency = []
-        
-        for day in self.raw_data:
-            if day.get('sleep_data'):
-                sleep_data.append(day['sleep_data'].get('duration'))
-                if day['sleep_data'].get('metrics'):
-                    sleep_efficiency.append(day['sleep_data']['metrics'].get('efficiency_percentage'))
-        
-        valid_sleep = [s for s in sleep_data if s is not None]
-        valid_efficiency = [e for e in sleep_efficiency if e is not None]
+        valid_sleep = self._series('sleep_duration')
+        valid_efficiency = self._series('sleep_efficiency')
         
         return {
-            "average_duration": np.mean(valid_sleep) if valid_sleep else None,
-            "average_efficiency": np.mean(valid_efficiency) if valid_efficiency else None,
+            "average_duration": np.mean(valid_sleep) if len(valid_sleep) else None,
+            "average_efficiency": np.mean(valid_efficiency) if len(valid_efficiency) else None,
             "sleep_consistency": self._calculate_consistency(valid_sleep),
-            "sleep_debt": self._calculate_sleep_debt(valid_sleep),
-            "quality_metrics": self._analyze_sleep_quality(self.raw_data)
+            "sleep_debt": self._calculate_sleep_debt(self._original('sleep_duration')),
+            "quality_metrics": self._analyze_sleep_quality()
         }
 
-    def _analyze_strain(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_strain(self) -> Dict[str, Any]:
         """Analyze strain patterns and intensity."""
-        daily_strains = []
-        
-        for day in self.raw_data:
-            if day.get('strain_data') and day['strain_data'].get('day_strain'):
-                daily_strains.append(day['strain_data']['day_strain'])
-        
-        valid_strains = [s for s in daily_strains if s is not None]
+        valid_strains = self._series('day_strain', 'day_strain_nonzero')
+        has_strains = len(valid_strains) > 0
         
         return {
-            "average_strain": np.mean(valid_strains) if valid_strains else None,
-            "strain_distribution": self._calculate_strain_distribution(valid_strains) if valid_strains else None,
-            "strain_variability": np.std(valid_strains) if valid_strains else None,
-            "peak_strain_day": max(valid_strains) if valid_strains else None
+            "average_strain": np.mean(valid_strains) if has_strains else None,
+            "strain_distribution": self._calculate_strain_distribution(valid_strains) if has_strains else None,
+            "strain_variability": np.std(valid_strains) if has_strains else None,
+            "peak_strain_day": max(self._original('day_strain', 'day_strain_nonzero')) if has_strains else None
         }
 
-    def _analyze_workouts(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_workouts(self) -> Dict[str, Any]:
         """Analyze workout patterns and intensity."""
-        all_workouts = []
-        workout_types = {}
-        total_duration = 0
-        
-        for day in self.raw_data:
-            if day.get('strain_data') and day['strain_data'].get('workouts'):
-                workouts = day['strain_data']['workouts']
-                all_workouts.extend(workouts)
-                
-                for workout in workouts:
-                    workout_type = workout.get('sport')
-                    if workout_type:
-                        workout_types[workout_type] = workout_types.get(workout_type, 0) + 1
-                    total_duration += workout.get('duration', 0)
+        all_workouts = self.workouts
+        workout_types = dict(Counter(workout.get('sport') for workout in all_workouts if workout.get('sport')))
+        total_duration = sum(workout.get('duration') or 0 for workout in all_workouts)
         
         return {
             "total_workouts": len(all_workouts),
@@ -122,7 +143,7 @@ class WhoopDataProcessor:
             "intensity_distribution": self._analyze_workout_intensity(all_workouts)
         }
 
-    def _identify_trends(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _identify_trends(self) -> Dict[str, Any]:
         """Identify significant trends and patterns in the data."""
         recovery_strain_correlation = self._calculate_recovery_strain_correlation()
         sleep_recovery_correlation = self._calculate_sleep_recovery_correlation()
@@ -140,7 +161,7 @@ class WhoopDataProcessor:
         """Calculate if a metric is trending up, down, or stable."""
         if len(values) < 2:
             return "insufficient_data"
-            
+        
         slope = np.polyfit(range(len(values)), values, 1)[0]
         if slope > 0.1:
             return "improving"
@@ -152,9 +173,9 @@ class WhoopDataProcessor:
         """Calculate consistency score based on day-to-day variations."""
         if len(values) < 2:
             return 0
-            
+        
         variations = np.diff(values)
-        consistency = 1 - (np.std(variations) / (max(values) - min(values)))
+        consistency = 1 - (np.std(variations) / (np.max(values) - np.min(values)))
         return max(0, min(1, consistency))
 
     def _calculate_sleep_debt(self, sleep_durations: List[float]) -> float:
@@ -162,35 +183,26 @@ class WhoopDataProcessor:
         target_sleep = 480  # 8 hours in minutes
         return sum(max(0, target_sleep - duration) for duration in sleep_durations)
 
-    def _analyze_sleep_quality(self, raw_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_sleep_quality(self) -> Dict[str, Any]:
         """Analyze detailed sleep quality metrics."""
-        rem_sleep = []
-        deep_sleep = []
-        light_sleep = []
-        
-        for day in raw_data:
-            if day.get('sleep_data') and day['sleep_data'].get('metrics'):
-                metrics = day['sleep_data']['metrics']
-                rem_sleep.append(metrics.get('rem_sleep_time'))
-                deep_sleep.append(metrics.get('slow_wave_sleep_time'))
-                light_sleep.append(metrics.get('light_sleep_time'))
-        
-        valid_rem = [x for x in rem_sleep if x is not None]
-        valid_deep = [x for x in deep_sleep if x is not None]
-        valid_light = [x for x in light_sleep if x is not None]
+        valid_rem = self._series('rem_sleep')
+        valid_deep = self._series('deep_sleep')
+        valid_light = self._series('light_sleep')
         
         return {
-            "average_rem": np.mean(valid_rem) if valid_rem else None,
-            "average_deep": np.mean(valid_deep) if valid_deep else None,
-            "average_light": np.mean(valid_light) if valid_light else None,
-            "sleep_quality_score": self._calculate_sleep_quality_score(valid_rem, valid_deep, valid_light)
+            "average_rem": np.mean(valid_rem) if len(valid_rem) else None,
+            "average_deep": np.mean(valid_deep) if len(valid_deep) else None,
+            "average_light": np.mean(valid_light) if len(valid_light) else None,
+            "sleep_quality_score": self._calculate_sleep_quality_score(
+                self._original('rem_sleep'), self._original('deep_sleep'), self._original('light_sleep')
+            )
         }
 
     def _calculate_sleep_quality_score(self, rem: List[float], deep: List[float], light: List[float]) -> float:
         """Calculate overall sleep quality score based on sleep stage distributions."""
         if not (rem and deep and light):
             return None
-            
+        
         # Ideal proportions (approximate targets)
         ideal_rem_percent = 0.25    # 25% REM
         ideal_deep_percent = 0.20   # 20% Deep
@@ -200,7 +212,7 @@ class WhoopDataProcessor:
         total_sleep = sum(rem) + sum(deep) + sum(light)
         if total_sleep == 0:
             return None
-            
+        
         actual_rem_percent = sum(rem) / total_sleep
         actual_deep_percent = sum(deep) / total_sleep
         actual_light_percent = sum(light) / total_sleep
@@ -215,82 +227,61 @@ class WhoopDataProcessor:
         
         return round(weighted_score, 2)
 
-    def _calculate_strain_distribution(self, strains: List[float]) -> Dict[str, int]:
+    def _calculate_strain_distribution(self, strains: np.ndarray) -> Dict[str, int]:
         """Calculate distribution of strain levels."""
-        if not strains:
+        if not len(strains):
             return None
-            
+        
         return {
-            "low": sum(1 for s in strains if s < 8),
-            "moderate": sum(1 for s in strains if 8 <= s < 14),
-            "high": sum(1 for s in strains if s >= 14)
+            "low": int(np.count_nonzero(strains < 8)),
+            "moderate": int(np.count_nonzero((strains >= 8) & (strains < 14))),
+            "high": int(np.count_nonzero(strains >= 14))
         }
 
     def _analyze_workout_intensity(self, workouts: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze workout intensity distribution."""
         if not workouts:
             return None
-            
-        intensities = {
-            "low": 0,
-            "moderate": 0,
-            "high": 0
+        
+        # Unscored workouts (strain None) count as low intensity
+        strains = np.array([workout.get('strain') or 0 for workout in workouts], dtype=float)
+        return {
+            "low": int(np.count_nonzero(strains < 8)),
+            "moderate": int(np.count_nonzero((strains >= 8) & (strains < 14))),
+            "high": int(np.count_nonzero(strains >= 14))
         }
+
+    def _calculate_correlation(self, first: str, second: str) -> float:
+        """Pearson correlation between two metrics over the days both are present."""
+        both = self.valid[first] & self.valid[second]
+        if np.count_nonzero(both) < 2:
+            return None
         
-        for workout in workouts:
-            strain = workout.get('strain', 0)
-            if strain < 8:
-                intensities["low"] += 1
-            elif strain < 14:
-                intensities["moderate"] += 1
-            else:
-                intensities["high"] += 1
-                
-        return intensities
+        return float(np.corrcoef(self.arrays[first][both], self.arrays[second][both])[0, 1])
 
     def _calculate_recovery_strain_correlation(self) -> float:
         """Calculate correlation between recovery and strain."""
-        recovery_scores = []
-        strain_scores = []
-        
-        for day in self.raw_data:
-            recovery = day.get('recovery_score')
-            strain = day.get('strain_data', {}).get('day_strain')
-            
-            if recovery is not None and strain is not None:
-                recovery_scores.append(recovery)
-                strain_scores.append(strain)
-        
-        if len(recovery_scores) < 2:
-            return None
-            
-        return float(np.corrcoef(recovery_scores, strain_scores)[0, 1])
+        return self._calculate_correlation('recovery', 'day_strain')
 
     def _calculate_sleep_recovery_correlation(self) -> float:
         """Calculate correlation between sleep duration and recovery."""
-        sleep_durations = []
-        recovery_scores = []
-        
-        for day in self.raw_data:
-            sleep = day.get('sleep_data', {}).get('duration')
-            recovery = day.get('recovery_score')
-            
-            if sleep is not None and recovery is not None:
-                sleep_durations.append(sleep)
-                recovery_scores.append(recovery)
-        
-        if len(sleep_durations) < 2:
-            return None
-            
-        return float(np.corrcoef(sleep_durations, recovery_scores)[0, 1])
+        return self._calculate_correlation('sleep_duration', 'recovery')
+
+    def _longest_run(self, condition: np.ndarray) -> int:
+        """Length of the longest run of consecutive True values."""
+        if not condition.any():
+            return 0
+        padded = np.concatenate(([0], condition.astype(np.int8), [0]))
+        edges = np.flatnonzero(np.diff(padded))
+        return int((edges[1::2] - edges[::2]).max())
 
     def _identify_significant_patterns(self) -> List[str]:
         """Identify significant patterns in the data."""
         patterns = []
         
         # Analyze recovery patterns
-        recovery_scores = [day.get('recovery_score') for day in self.raw_data if day.get('recovery_score') is not None]
-        if recovery_scores:
+        recovery_scores = self._series('recovery')
+        if len(recovery_scores):
             avg_recovery = np.mean(recovery_scores)
             if avg_recovery < 33:
                 patterns.append("Consistently low recovery scores indicate potential overtraining")
@@ -298,24 +289,16 @@ class WhoopDataProcessor:
                 patterns.append("Strong recovery pattern indicates good adaptation to training load")
         
         # Analyze sleep patterns
-        sleep_durations = [day.get('sleep_data', {}).get('duration') for day in self.raw_data if day.get('sleep_data', {}).get('duration') is not None]
-        if sleep_durations:
+        sleep_durations = self._series('sleep_duration')
+        if len(sleep_durations):
             avg_sleep = np.mean(sleep_durations)
             if avg_sleep < 420:  # Less than 7 hours
                 patterns.append("Consistent sleep deficit may be impacting recovery")
-            
+        
         # Analyze strain patterns
-        strain_scores = [day.get('strain_data', {}).get('day_strain') for day in self.raw_data if day.get('strain_data', {}).get('day_strain') is not None]
-        if strain_scores:
-            consecutive_high_strain = 0
-            for strain in strain_scores:
-                if strain > 15:
-                    consecutive_high_strain += 1
-                else:
-                    consecutive_high_strain = 0
-                if consecutive_high_strain >= 3:
-                    patterns.append("Multiple consecutive days of high strain detected")
-                    break
+        strain_scores = self._series('day_strain')
+        if self._longest_run(strain_scores > 15) >= 3:
+            patterns.append("Multiple consecutive days of high strain detected")
         
         return patterns
 
@@ -324,19 +307,19 @@ class WhoopDataProcessor:
         focus_areas = []
         
         # Analyze recovery scores
-        recovery_scores = [day.get('recovery_score') for day in self.raw_data if day.get('recovery_score') is not None]
-        if recovery_scores and np.mean(recovery_scores) < 50:
+        recovery_scores = self._series('recovery')
+        if len(recovery_scores) and np.mean(recovery_scores) < 50:
             focus_areas.append("Prioritize recovery strategies and rest")
         
         # Analyze sleep patterns
-        sleep_durations = [day.get('sleep_data', {}).get('duration') for day in self.raw_data if day.get('sleep_data', {}).get('duration') is not None]
-        if sleep_durations and np.mean(sleep_durations) < 420:
+        sleep_durations = self._series('sleep_duration')
+        if len(sleep_durations) and np.mean(sleep_durations) < 420:
             focus_areas.append("Increase sleep duration to improve recovery")
         
         # Analyze strain balance
-        strain_scores = [day.get('strain_data', {}).get('day_strain') for day in self.raw_data if day.get('strain_data', {}).get('day_strain') is not None]
-        if strain_scores:
-            high_strain_days = sum(1 for s in strain_scores if s > 15)
+        strain_scores = self._series('day_strain')
+        if len(strain_scores):
+            high_strain_days = np.count_nonzero(strain_scores > 15)
             if high_strain_days > len(strain_scores) / 2:
                 focus_areas.append("Consider incorporating more low-intensity recovery days")
         
@@ -346,4 +329,372 @@ class WhoopDataProcessor:
         """Return processed data, processing it first if necessary."""
         if self.processed_data is None:
             self.process_data()
-        return self.processed_data
\ No newline at end of file
+        return self.processed_data
+
+
+class _RunningMetric:
+    """Welford mean/variance plus the order-dependent trend and consistency terms.
+
+    Values arrive in chronological order; ``index`` is the position among valid
+    values so the least-squares slope can be kept with running sums.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.peak = None
+        self.last = None
+        self.sum_index = 0.0
+        self.sum_index_sq = 0.0
+        self.sum_value = 0.0
+        self.sum_index_value = 0.0
+        self.diff_n = 0
+        self.diff_mean = 0.0
+        self.diff_m2 = 0.0
+
+    def update(self, value):
+        as_float = float(value)
+        index = self.n
+        self.n += 1
+        delta = as_float - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (as_float - self.mean)
+        self.total += value
+        self.min = as_float if self.min is None else min(self.min, as_float)
+        self.max = as_float if self.max is None else max(self.max, as_float)
+        self.peak = value if self.peak is None or value > self.peak else self.peak
+        
+        self.sum_index += index
+        self.sum_index_sq += index * index
+        self.sum_value += as_float
+        self.sum_index_value += index * as_float
+        
+        if self.last is not None:
+            diff = as_float - self.last
+            self.diff_n += 1
+            diff_delta = diff - self.diff_mean
+            self.diff_mean += diff_delta / self.diff_n
+            self.diff_m2 += diff_delta * (diff - self.diff_mean)
+        self.last = as_float
+
+    def std(self) -> float:
+        return (self.m2 / self.n) ** 0.5 if self.n else None
+
+    def trend(self) -> str:
+        """Trend label matching WhoopDataProcessor on a newest-first list."""
+        if self.n < 2:
+            return "insufficient_data"
+        denominator = self.n * self.sum_index_sq - self.sum_index ** 2
+        # Chronological slope, negated because the batch processor sees newest days first
+        slope = -(self.n * self.sum_index_value - self.sum_index * self.sum_value) / denominator
+        if slope > 0.1:
+            return "improving"
+        elif slope < -0.1:
+            return "declining"
+        return "stable"
+
+    def consistency(self) -> float:
+        if self.n < 2:
+            return 0
+        value_range = self.max - self.min
+        if value_range == 0:
+            return 1
+        consistency = 1 - ((self.diff_m2 / self.diff_n) ** 0.5 / value_range)
+        return max(0, min(1, consistency))
+
+
+class _RunningCovariance:
+    """Online co-moment for the Pearson correlation of paired values."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def update(self, x, y):
+        x, y = float(x), float(y)
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.c_xy += dx * (y - self.mean_y)
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+
+    def correlation(self) -> float:
+        if self.n < 2:
+            return None
+        denominator = (self.m2_x * self.m2_y) ** 0.5
+        return self.c_xy / denominator if denominator else float('nan')
+
+
+class IncrementalWhoopProcessor:
+    """Keeps running accumulators so single-day updates do not reprocess history.
+
+    Days are fed in chronological order. ``get_processed_data()`` has the same
+    shape as WhoopDataProcessor on the usual newest-first summary list, equal up
+    to floating-point rounding. Appending a newer day or replacing the latest day
+    is O(1); replacing an older day rebuilds from the stored days.
+    ``snapshot()``/``restore()`` move the state through JSON between requests.
+    """
+
+    METRICS = ('recovery', 'sleep_duration', 'sleep_efficiency', 'rem_sleep',
+               'deep_sleep', 'light_sleep', 'day_strain', 'day_strain_nonzero')
+    COUNTERS = ('recovery_below_33', 'recovery_above_66', 'strain_low', 'strain_moderate',
+                'strain_high', 'strain_above_15', 'high_strain_run', 'longest_high_strain_run',
+                'sleep_debt', 'total_workouts', 'workout_duration', 'intensity_low',
+                'intensity_moderate', 'intensity_high', 'days')
+
+    def __init__(self, whoop_data: List[Dict[str, Any]] = None):
+        self.days = {}
+        self.processed_data = None
+        self._reset()
+        for day in sorted(whoop_data or [], key=lambda d: d.get('date') or ''):
+            self.update_day(day)
+
+    def _reset(self):
+        self.metrics = {name: _RunningMetric() for name in self.METRICS}
+        self.recovery_strain = _RunningCovariance()
+        self.sleep_recovery = _RunningCovariance()
+        self.counters = {name: 0 for name in self.COUNTERS}
+        # sport -> [count, latest day it appeared on, its first index within that day]
+        self.workout_types = {}
+        self.latest_date = None
+        self.checkpoint = None
+
+    def update_day(self, day: Dict[str, Any]):
+        """Append a new day or replace an existing one, keyed by its date."""
+        date = day.get('date')
+        if self.latest_date is None or date > self.latest_date:
+            self.checkpoint = self._state()
+            self.days[date] = day
+            self._apply(day)
+            self.latest_date = date
+        elif date == self.latest_date and self.checkpoint is not None:
+            self._load_state(self.checkpoint)
+            self.days[date] = day
+            self._apply(day)
+            self.latest_date = date
+        else:
+            self.days[date] = day
+            self._rebuild()
+        self.processed_data = None
+
+    def _rebuild(self):
+        days = [self.days[date] for date in sorted(self.days)]
+        self._reset()
+        for day in days:
+            self.checkpoint = self._state()
+            self._apply(day)
+            self.latest_date = day.get('date')
+
+    def _apply(self, day: Dict[str, Any]):
+        sleep_data = day.get('sleep_data') or {}
+        metrics = sleep_data.get('metrics') or {}
+        strain_data = day.get('strain_data') or {}
+        recovery = day.get('recovery_score')
+        duration = sleep_data.get('duration')
+        strain = strain_data.get('day_strain')
+        counters = self.counters
+        
+        if recovery is not None:
+            self.metrics['recovery'].update(recovery)
+            counters['recovery_below_33'] += recovery < 33
+            counters['recovery_above_66'] += recovery > 66
+        if duration is not None:
+            self.metrics['sleep_duration'].update(duration)
+            counters['sleep_debt'] += max(0, 480 - duration)
+        for name, field in (('sleep_efficiency', 'efficiency_percentage'), ('rem_sleep', 'rem_sleep_time'),
+                            ('deep_sleep', 'slow_wave_sleep_time'), ('light_sleep', 'light_sleep_time')):
+            if metrics.get(field) is not None:
+                self.metrics[name].update(metrics[field])
+        
+        if strain is not None:
+            self.metrics['day_strain'].update(strain)
+            counters['strain_above_15'] += strain > 15
+            counters['high_strain_run'] = counters['high_strain_run'] + 1 if strain > 15 else 0
+            counters['longest_high_strain_run'] = max(counters['longest_high_strain_run'], counters['high_strain_run'])
+            if strain:
+                self.metrics['day_strain_nonzero'].update(strain)
+                bucket = 'strain_low' if strain < 8 else 'strain_moderate' if strain < 14 else 'strain_high'
+                counters[bucket] += 1
+        
+        if recovery is not None and strain is not None:
+            self.recovery_strain.update(recovery, strain)
+        if duration is not None and recovery is not None:
+            self.sleep_recovery.update(duration, recovery)
+        
+        counters['days'] += 1
+        position = counters['days']
+        for index, workout in enumerate(strain_data.get('workouts') or []):
+            counters['total_workouts'] += 1
+            counters['workout_duration'] += workout.get('duration') or 0
+            workout_strain = workout.get('strain') or 0
+            bucket = 'intensity_low' if workout_strain < 8 else 'intensity_moderate' if workout_strain < 14 else 'intensity_high'
+            counters[bucket] += 1
+            sport = workout.get('sport')
+            if sport:
+                entry = self.workout_types.setdefault(sport, [0, None, None])
+                entry[0] += 1
+                if entry[1] != position:
+                    entry[1], entry[2] = position, index
+
+    def _state(self) -> Dict[str, Any]:
+        return {
+            "metrics": {name: dict(vars(metric)) for name, metric in self.metrics.items()},
+            "recovery_strain": dict(vars(self.recovery_strain)),
+            "sleep_recovery": dict(vars(self.sleep_recovery)),
+            "counters": dict(self.counters),
+            "workout_types": {sport: list(entry) for sport, entry in self.workout_types.items()},
+            "latest_date": self.latest_date
+        }
+
+    def _load_state(self, state: Dict[str, Any]):
+        for name, values in state["metrics"].items():
+            vars(self.metrics[name]).update(values)
+        vars(self.recovery_strain).update(state["recovery_strain"])
+        vars(self.sleep_recovery).update(state["sleep_recovery"])
+        self.counters = dict(state["counters"])
+        self.workout_types = {sport: list(entry) for sport, entry in state["workout_types"].items()}
+        self.latest_date = state["latest_date"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable copy of the processor state."""
+        return {"state": self._state(), "checkpoint": self.checkpoint, "days": self.days}
+
+    @classmethod
+    def restore(cls, snapshot: Dict[str, Any]) -> "IncrementalWhoopProcessor":
+        """Rebuild a processor from ``snapshot()`` output without replaying the days."""
+        processor = cls()
+        processor.days = dict(snapshot["days"])
+        processor._load_state(snapshot["state"])
+        processor.checkpoint = snapshot["checkpoint"]
+        return processor
+
+    def get_processed_data(self) -> Dict[str, Any]:
+        """Return processed data in the WhoopDataProcessor format."""
+        if self.processed_data is None:
+            self.processed_data = self._build_processed_data()
+        return self.processed_data
+
+    def _build_processed_data(self) -> Dict[str, Any]:
+        m = self.metrics
+        c = self.counters
+        total_days = len(self.days)
+        
+        recovery = m['recovery']
+        if recovery.n:
+            recovery_stats = {
+                "average_recovery": recovery.mean,
+                "recovery_trend": recovery.trend(),
+                "consistency": recovery.consistency(),
+                "days_below_33": c['recovery_below_33'],
+                "days_above_66": c['recovery_above_66']
+            }
+        else:
+            recovery_stats = {"error": "No valid recovery data available"}
+        
+        rem, deep, light = m['rem_sleep'], m['deep_sleep'], m['light_sleep']
+        quality_score = None
+        if rem.n and deep.n and light.n:
+            total_sleep = rem.total + deep.total + light.total
+            if total_sleep != 0:
+                rem_score = 1 - abs(0.25 - rem.total / total_sleep)
+                deep_score = 1 - abs(0.20 - deep.total / total_sleep)
+                light_score = 1 - abs(0.55 - light.total / total_sleep)
+                quality_score = round((rem_score * 0.35 + deep_score * 0.35 + light_score * 0.3) * 100, 2)
+        
+        sleep = m['sleep_duration']
+        sleep_stats = {
+            "average_duration": sleep.mean if sleep.n else None,
+            "average_efficiency": m['sleep_efficiency'].mean if m['sleep_efficiency'].n else None,
+            "sleep_consistency": sleep.consistency(),
+            "sleep_debt": c['sleep_debt'],
+            "quality_metrics": {
+                "average_rem": rem.mean if rem.n else None,
+                "average_deep": deep.mean if deep.n else None,
+                "average_light": light.mean if light.n else None,
+                "sleep_quality_score": quality_score
+            }
+        }
+        
+        strain = m['day_strain_nonzero']
+        strain_stats = {
+            "average_strain": strain.mean if strain.n else None,
+            "strain_distribution": {
+                "low": c['strain_low'],
+                "moderate": c['strain_moderate'],
+                "high": c['strain_high']
+            } if strain.n else None,
+            "strain_variability": strain.std(),
+            "peak_strain_day": strain.peak
+        }
+        
+        total_workouts = c['total_workouts']
+        # Newest-first order of first appearance, as the batch processor reports it
+        workout_types = {
+            sport: entry[0]
+            for sport, entry in sorted(self.workout_types.items(), key=lambda item: (-item[1][1], item[1][2]))
+        }
+        workout_stats = {
+            "total_workouts": total_workouts,
+            "workout_frequency": total_workouts / total_days if total_days else 0,
+            "workout_types": workout_types,
+            "total_duration": c['workout_duration'],
+            "average_duration": c['workout_duration'] / total_workouts if total_workouts else 0,
+            "intensity_distribution": {
+                "low": c['intensity_low'],
+                "moderate": c['intensity_moderate'],
+                "high": c['intensity_high']
+            } if total_workouts else None
+        }
+        
+        patterns = []
+        if recovery.n:
+            if recovery.mean < 33:
+                patterns.append("Consistently low recovery scores indicate potential overtraining")
+            elif recovery.mean > 66:
+                patterns.append("Strong recovery pattern indicates good adaptation to training load")
+        if sleep.n and sleep.mean < 420:
+            patterns.append("Consistent sleep deficit may be impacting recovery")
+        if c['longest_high_strain_run'] >= 3:
+            patterns.append("Multiple consecutive days of high strain detected")
+        
+        focus_areas = []
+        if recovery.n and recovery.mean < 50:
+            focus_areas.append("Prioritize recovery strategies and rest")
+        if sleep.n and sleep.mean < 420:
+            focus_areas.append("Increase sleep duration to improve recovery")
+        if m['day_strain'].n and c['strain_above_15'] > m['day_strain'].n / 2:
+            focus_areas.append("Consider incorporating more low-intensity recovery days")
+        
+        dates = [date for date in self.days if date is not None]
+        return {
+            "summary_metrics": {
+                "recovery": recovery_stats,
+                "sleep": sleep_stats,
+                "strain": strain_stats,
+                "workouts": workout_stats
+            },
+            "trends_and_patterns": {
+                "correlations": {
+                    "recovery_strain": self.recovery_strain.correlation(),
+                    "sleep_recovery": self.sleep_recovery.correlation()
+                },
+                "patterns": patterns,
+                "recommendations": focus_areas
+            },
+            "time_period": {
+                "start_date": min(dates) if dates else None,
+                "end_date": max(dates) if dates else None,
+                "total_days": total_days
+            }
+        }
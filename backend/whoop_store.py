@@ -0,0 +1,140 @@
+import json
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytz
+
+# Timestamp field that places a record of each collection on a (UTC) day
+COLLECTION_DAY_FIELDS = {
+    'recovery': 'created_at',
+    'sleep': 'start',
+    'cycle': 'start',
+    'workout': 'start'
+}
+
+
+def record_day(record: Dict[str, Any], collection: str) -> str:
+    """Return the UTC ISO day a raw Whoop record belongs to."""
+    timestamp = record.get(COLLECTION_DAY_FIELDS[collection]) or ''
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        if parsed.tzinfo:
+            parsed = parsed.astimezone(pytz.UTC)
+        return parsed.date().isoformat()
+    except (TypeError, ValueError):
+        return timestamp[:10]
+
+
+def record_key(record: Dict[str, Any]) -> str:
+    """Return a stable identifier for a raw Whoop record."""
+    for field in ('id', 'cycle_id', 'sleep_id'):
+        if record.get(field) is not None:
+            return str(record[field])
+    return json.dumps(record, sort_keys=True)
+
+
+def missing_day_runs(days: List[date], fetched: set) -> List[Tuple[date, date]]:
+    """Group days that still need fetching into contiguous ``[start, end)`` runs."""
+    runs = []
+    for day in days:
+        if day.isoformat() in fetched:
+            continue
+        if runs and runs[-1][1] == day:
+            runs[-1] = (runs[-1][0], day + timedelta(days=1))
+        else:
+            runs.append((day, day + timedelta(days=1)))
+    return runs
+
+
+class WhoopRecordStore:
+    """SQLite store of raw Whoop records per user, collection and day.
+
+    Days are marked as fetched once downloaded. Closed days are then served
+    locally; the most recent ``mutable_days`` are always refetched because
+    Whoop may still rescore them.
+    """
+
+    def __init__(self, path: str, mutable_days: int = 2):
+        self.mutable_days = mutable_days
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(
+                """CREATE TABLE IF NOT EXISTS whoop_records (
+                    user_id TEXT NOT NULL,
+                    collection TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    record_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (user_id, collection, record_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_whoop_records_day
+                    ON whoop_records (user_id, collection, day);
+                CREATE TABLE IF NOT EXISTS whoop_fetched_days (
+                    user_id TEXT NOT NULL,
+                    collection TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    PRIMARY KEY (user_id, collection, day)
+                );"""
+            )
+            self._conn.commit()
+
+    def fetched_days(self, user_id: str, collection: str, start: date, end: date) -> set:
+        """Days in ``[start, end)`` that are stored and no longer mutable."""
+        mutable_from = (datetime.now(pytz.UTC).date() - timedelta(days=self.mutable_days - 1)).isoformat()
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT day FROM whoop_fetched_days
+                   WHERE user_id = ? AND collection = ? AND day >= ? AND day < ? AND day < ?""",
+                (user_id, collection, start.isoformat(), end.isoformat(), mutable_from)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def save(self, user_id: str, collection: str, start: date, end: date, records: List[Dict[str, Any]]):
+        """Replace the stored records for ``[start, end)`` and mark those days fetched."""
+        fetched_at = datetime.now(pytz.UTC).isoformat()
+        days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days)]
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM whoop_records WHERE user_id = ? AND collection = ? AND day >= ? AND day < ?",
+                (user_id, collection, start.isoformat(), end.isoformat())
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO whoop_records VALUES (?, ?, ?, ?, ?)",
+                [
+                    (user_id, collection, record_day(record, collection), record_key(record), json.dumps(record))
+                    for record in records
+                ]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO whoop_fetched_days VALUES (?, ?, ?, ?)",
+                [(user_id, collection, day, fetched_at) for day in days]
+            )
+            self._conn.commit()
+
+    def load(self, user_id: str, collection: str, start: date, end: date) -> List[Dict[str, Any]]:
+        """Return stored records whose day falls in ``[start, end)``."""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT payload FROM whoop_records
+                   WHERE user_id = ? AND collection = ? AND day >= ? AND day < ?
+                   ORDER BY day""",
+                (user_id, collection, start.isoformat(), end.isoformat())
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_collection(self, user_id: str, collection: str, start: date, end: date,
+                       fetch: Callable[[str, str], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Return records for ``[start, end)``, fetching only missing or mutable days.
+
+        ``fetch`` takes ISO start/end dates, like the WhoopClient collection getters.
+        """
+        days = [start + timedelta(days=i) for i in range((end - start).days)]
+        fetched = self.fetched_days(user_id, collection, start, end)
+        for run_start, run_end in missing_day_runs(days, fetched):
+            records = fetch(run_start.isoformat(), run_end.isoformat())
+            self.save(user_id, collection, run_start, run_end, records or [])
+        return self.load(user_id, collection, start, end)
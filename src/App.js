@@ -1,13 +1,21 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import ChatInterface from './components/ChatInterface';
 import WhoopData from './components/WhoopData';
-import { sendMessage, fetchWhoopData } from './services/api';
+import {
+  fetchWhoopData,
+  fetchFollowUps,
+  createChatSession,
+  updateChatSession,
+  sendSessionMessage
+} from './services/api';
 import './styles/index.css';
 
 function App() {
   const [messages, setMessages] = useState([]);
   const [whoopData, setWhoopData] = useState([]);
   const [conversationHistory, setConversationHistory] = useState([]);
+  // Server-side chat session holding the Whoop data and history
+  const sessionIdRef = useRef(null);
   const [currentWeekStart, setCurrentWeekStart] = useState(() => {
     // Calculate initial start date (6 days ago)
     const today = new Date();
@@ -22,6 +30,30 @@ function App() {
       .catch(error => console.error('Error fetching Whoop data:', error));
   }, [currentWeekStart]);
 
+  useEffect(() => {
+    // Keep the session's Whoop data in sync with the selected week
+    if (sessionIdRef.current) {
+      updateChatSession(sessionIdRef.current, whoopData)
+        .catch(() => { sessionIdRef.current = null; });
+    }
+  }, [whoopData]);
+
+  const sendWithSession = async (query, priorHistory) => {
+    if (!sessionIdRef.current) {
+      sessionIdRef.current = await createChatSession(whoopData, priorHistory);
+    }
+    try {
+      return await sendSessionMessage(sessionIdRef.current, query);
+    } catch (error) {
+      if (error.status !== 404) {
+        throw error;
+      }
+      // Session expired on the server: recreate it from the local history and retry once
+      sessionIdRef.current = await createChatSession(whoopData, priorHistory);
+      return await sendSessionMessage(sessionIdRef.current, query);
+    }
+  };
+
   const handleWeekChange = (newDate) => {
     setCurrentWeekStart(newDate);
   };
@@ -37,7 +69,7 @@ function App() {
       const updatedHistory = [...conversationHistory, userMessage];
       setConversationHistory(updatedHistory);
 
-      const response = await sendMessage(messageData.query, messageData.whoopData, updatedHistory);
+      const response = await sendWithSession(messageData.query, conversationHistory);
       
       const aiMessage = {
         type: 'ai',
@@ -45,6 +77,18 @@ function App() {
       };
       setMessages(prev => [...prev, aiMessage]);
       setConversationHistory(prev => [...prev, aiMessage]);
+
+      // Follow-up questions are generated in the background after the answer returns
+      const turnId = response.response && response.response.turn_id;
+      if (turnId) {
+        fetchFollowUps(turnId)
+          .then(questions => setMessages(prev => prev.map(message => (
+            message === aiMessage
+              ? { ...message, response: { ...message.response, follow_up_questions: questions } }
+              : message
+          ))))
+          .catch(error => console.error('Error fetching follow-up questions:', error));
+      }
     } catch (error) {
       console.error('Error sending message:', error);
       const errorMessage = {
@@ -39,4 +39,200 @@ export const sendMessage = async (query, whoopData, conversationHistory) => {
     console.error('Error sending message:', error);
     throw error;
   }
-};
\ No newline at end of file
+};
+
+export const createChatSession = async (whoopData, conversationHistory = []) => {
+  try {
+    const response = await fetch(`${API_URL}/api/chat/session`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        whoopData,
+        conversationHistory
+      }),
+    });
+
+    if (!response.ok) {
+      throw new Error('Network response was not ok');
+    }
+
+    const data = await response.json();
+    return data.session_id;
+  } catch (error) {
+    console.error('Error creating chat session:', error);
+    throw error;
+  }
+};
+
+export const updateChatSession = async (sessionId, whoopData) => {
+  const response = await fetch(`${API_URL}/api/chat/session/${sessionId}`, {
+    method: 'PUT',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ whoopData }),
+  });
+
+  if (!response.ok) {
+    const error = new Error('Network response was not ok');
+    error.status = response.status;
+    throw error;
+  }
+};
+
+// Sends only the query; the Whoop data and history live in the server-side session.
+// Rejects with error.status === 404 when the session has expired.
+export const sendSessionMessage = async (sessionId, query) => {
+  const response = await fetch(`${API_URL}/api/chat`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({
+      sessionId,
+      query
+    }),
+  });
+
+  if (!response.ok) {
+    const error = new Error('Network response was not ok');
+    error.status = response.status;
+    throw error;
+  }
+
+  return await response.json();
+};
+
+export const fetchFollowUps = async (turnId, { wait = 20, attempts = 5 } = {}) => {
+  try {
+    for (let attempt = 0; attempt < attempts; attempt += 1) {
+      const response = await fetch(`${API_URL}/api/chat/${turnId}/followups?wait=${wait}`);
+      if (response.status === 202) {
+        continue;
+      }
+      if (!response.ok) {
+        throw new Error('Network response was not ok');
+      }
+      const data = await response.json();
+      return data.follow_up_questions || [];
+    }
+    return [];
+  } catch (error) {
+    console.error('Error fetching follow-up questions:', error);
+    throw error;
+  }
+};
+
+const parseSseEvent = (rawEvent) => {
+  let event = 'message';
+  const dataLines = [];
+  rawEvent.split('\n').forEach((line) => {
+    if (line.startsWith('event:')) {
+      event = line.slice(6).trim();
+    } else if (line.startsWith('data:')) {
+      dataLines.push(line.slice(5).trim());
+    }
+  });
+  return { event, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : null };
+};
+
+export const streamMessage = async (query, whoopData, conversationHistory, handlers = {}) => {
+  const { onStatus, onToken, onFollowUps, onError } = handlers;
+  try {
+    const response = await fetch(`${API_URL}/api/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        query,
+        whoopData,
+        conversationHistory
+      }),
+    });
+
+    if (!response.ok) {
+      throw new Error('Network response was not ok');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let followUpQuestions = [];
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const { event, data } = parseSseEvent(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        if (event === 'status' && onStatus) {
+          onStatus(data);
+        } else if (event === 'token') {
+          text += data.text;
+          if (onToken) onToken(data.text, text);
+        } else if (event === 'follow_up_questions') {
+          followUpQuestions = data.follow_up_questions;
+          if (onFollowUps) onFollowUps(followUpQuestions);
+        } else if (event === 'error') {
+          throw new Error(data.error);
+        }
+      }
+    }
+
+    return { response: { response: text, follow_up_questions: followUpQuestions } };
+  } catch (error) {
+    console.error('Error streaming message:', error);
+    if (onError) onError(error);
+    throw error;
+  }
+};
+
+export const streamWhoopSummary = async (startDate, endDate, onDay) => {
+  try {
+    const response = await fetch(
+      `${API_URL}/api/whoop/summary?start_date=${startDate}&end_date=${endDate}`
+    );
+    if (!response.ok) {
+      throw new Error('Network response was not ok');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const days = [];
+    let buffer = '';
+
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      const record = JSON.parse(line);
+      if (record.error) {
+        throw new Error(record.error);
+      }
+      days.push(record);
+      if (onDay) onDay(record);
+    };
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      lines.forEach(handleLine);
+    }
+    handleLine(buffer);
+
+    return days;
+  } catch (error) {
+    console.error('Error streaming Whoop summary:', error);
+    throw error;
+  }
+};